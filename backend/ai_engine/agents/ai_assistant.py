@@ -1,46 +1,137 @@
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from backend.ai_engine.rag.retriever import Retriever
-from dotenv import load_dotenv
-from langchain.schema import HumanMessage, SystemMessage
-import os
-import json
-
-load_dotenv()
-
-class AIAssistant:
-    def __init__(self, retriever: Retriever):
-        self.llm = ChatGroq(
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="mixtral-8x7b-32768",
-            temperature=0.5,
-            max_tokens=1024,
-        )
-        self.retriever = retriever
-
-    def answer_question(self, project_id: int, question: str) -> str:
-        project_context = self.retriever.get_project_context(project_id)
-        related_info = self.retriever.get_related_information(question)
-        
-        formatted_project_context = json.dumps(project_context, indent=2)
-        formatted_related_info = json.dumps(related_info, indent=2)
-        
-        system_message = SystemMessage(content="You are an AI assistant for a project management system. Answer the following question based on the provided context.")
-        human_message = HumanMessage(content=f"""
-            Project context: {formatted_project_context}
-            Related information: {formatted_related_info}
-            Question: {question}
-            Answer:
-            """)
-                
-        messages = [system_message, human_message]
-        
-        print(f"Sending to AI:\n{human_message.content}")  # Debug print
-        
-        try:
-            response = self.llm.invoke(messages)
-            print(f"AI response:\n{response.content}")  # Debug print
-            return response.content
-        except Exception as e:
-            print(f"Error in AI chat: {str(e)}")
-            return f"I'm sorry, but I encountered an error while trying to answer your question. Error: {str(e)}"
\ No newline at end of file
+from langchain.prompts import ChatPromptTemplate
+from backend.ai_engine.rag.retriever import Retriever
+from backend.ai_engine.llm.registry import llm_registry
+from backend.ai_engine.llm.semantic_cache import SemanticAnswerCache, semantic_answer_cache
+from backend.config import settings
+from dotenv import load_dotenv
+from langchain.schema import HumanMessage, SystemMessage
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Iterator, Optional
+
+load_dotenv()
+
+class AIAssistant:
+    def __init__(self, retriever: Retriever, answer_cache: Optional[SemanticAnswerCache] = None):
+        self.llm = llm_registry.get(settings.LLM_MODEL, temperature=0.5, max_tokens=1024)
+        self.retriever = retriever
+        self.answer_cache = answer_cache if answer_cache is not None else (semantic_answer_cache if settings.AI_CHAT_CACHE else None)
+
+    def answer_question(self, project_id: int, question: str, use_cache: bool = True) -> str:
+        """Answer from the project's data; with `use_cache=False` a fresh answer replaces any cached one."""
+        version, vector, cached = self._cached_answer(project_id, question, use_cache)
+        if cached is not None:
+            return cached
+        messages = self._messages(project_id, question)
+
+        try:
+            response = self.llm.invoke(messages)
+            logging.debug(f"AI response:\n{response.content}")
+            if vector is not None:
+                self.answer_cache.store(project_id, vector, response.content, version)
+            return response.content
+        except Exception as e:
+            print(f"Error in AI chat: {str(e)}")
+            return f"I'm sorry, but I encountered an error while trying to answer your question. Error: {str(e)}"
+
+    def stream_answer(self, project_id: int, question: str, use_cache: bool = True) -> Iterator[str]:
+        """Read the project's context now and return the answer's text pieces as the model writes them.
+
+        Errors from the model are raised while iterating.
+        """
+        version, vector, cached = self._cached_answer(project_id, question, use_cache)
+        if cached is not None:
+            return iter([cached])
+        return self._answer_chunks(project_id, self._messages(project_id, question), vector, version)
+
+    async def aanswer_question(self, project_id: int, question: str, use_cache: bool = True) -> str:
+        """`answer_question` for async callers: lookups run concurrently and the model call holds no thread."""
+        version, vector, cached = await asyncio.to_thread(self._cached_answer, project_id, question, use_cache)
+        if cached is not None:
+            return cached
+        messages = await self._amessages(project_id, question)
+
+        try:
+            response = await self.llm.ainvoke(messages)
+            logging.debug(f"AI response:\n{response.content}")
+            if vector is not None:
+                self.answer_cache.store(project_id, vector, response.content, version)
+            return response.content
+        except Exception as e:
+            print(f"Error in AI chat: {str(e)}")
+            return f"I'm sorry, but I encountered an error while trying to answer your question. Error: {str(e)}"
+
+    async def astream_answer(self, project_id: int, question: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """`stream_answer` for async callers."""
+        version, vector, cached = await asyncio.to_thread(self._cached_answer, project_id, question, use_cache)
+        if cached is not None:
+            return self._aconstant(cached)
+        return self._aanswer_chunks(project_id, await self._amessages(project_id, question), vector, version)
+
+    def _answer_chunks(self, project_id: int, messages, vector, version) -> Iterator[str]:
+        answer = []
+        for chunk in self.llm.stream(messages):
+            answer.append(chunk.content)
+            yield chunk.content
+        if vector is not None:
+            self.answer_cache.store(project_id, vector, "".join(answer), version)
+
+    async def _aanswer_chunks(self, project_id: int, messages, vector, version) -> AsyncIterator[str]:
+        answer = []
+        async for chunk in self.llm.astream(messages):
+            answer.append(chunk.content)
+            yield chunk.content
+        if vector is not None:
+            self.answer_cache.store(project_id, vector, "".join(answer), version)
+
+    @staticmethod
+    async def _aconstant(text: str) -> AsyncIterator[str]:
+        yield text
+
+    def _cached_answer(self, project_id: int, question: str, use_cache: bool):
+        # The version is taken before reading the project, so an answer raced by a write is not cached.
+        version = self.answer_cache.version(project_id) if self.answer_cache is not None else None
+        vector = self._question_vector(question)
+        if vector is not None and use_cache:
+            cached = self.answer_cache.lookup(project_id, vector)
+            if cached is not None:
+                logging.debug(f"Answer for project {project_id} served from the semantic cache")
+                return version, vector, cached
+        return version, vector, None
+
+    def _messages(self, project_id: int, question: str):
+        project_context = self.retriever.get_project_context(project_id)
+        related_info = self.retriever.get_related_information(question, project_id=project_id)
+        return self._prompt(project_context, related_info, question)
+
+    async def _amessages(self, project_id: int, question: str):
+        project_context, related_info = await asyncio.gather(
+            self.retriever.arun(self.retriever.get_project_context, project_id),
+            self.retriever.arun(self.retriever.get_related_information, question, project_id=project_id),
+        )
+        return self._prompt(project_context, related_info, question)
+
+    def _prompt(self, project_context, related_info, question: str):
+        formatted_project_context = json.dumps(project_context, indent=2)
+        formatted_related_info = json.dumps(related_info, indent=2)
+        
+        system_message = SystemMessage(content="You are an AI assistant for a project management system. Answer the following question based on the provided context.")
+        human_message = HumanMessage(content=f"""
+            Project context: {formatted_project_context}
+            Related information: {formatted_related_info}
+            Question: {question}
+            Answer:
+            """)
+        
+        logging.debug(f"Sending to AI:\n{human_message.content}")
+        return [system_message, human_message]
+
+    def _question_vector(self, question: str):
+        if self.answer_cache is None:
+            return None
+        try:
+            return self.answer_cache.embed(question)
+        except Exception as e:
+            print(f"Error embedding question for the answer cache: {e}")
+            return None
@@ -1,89 +1,209 @@
-# from langchain_community.chat_models import ChatOpenAI
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain.schema import HumanMessage, SystemMessage
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
-from backend.ai_engine.rag.retriever import Retriever
-from dotenv import load_dotenv
-import os
-import re
-import json
-from datetime import datetime
-
-load_dotenv()
-
-class ReportOutput(BaseModel):
-    summary: str = Field(description="Summary of the project status, including tasks and assigned team members")
-    key_metrics: Dict[str, float] = Field(description="Key metrics of the project")
-    risks: List[str] = Field(description="Identified risks in the project")
-    recommendations: List[str] = Field(description="List of recommendations for project improvement")
-
-class ReportAgent:
-    def __init__(self, retriever: Retriever, model_name: str = "gpt-3.5-turbo"):
-        self.llm = ChatGroq(
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model="mixtral-8x7b-32768",
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-        )
-        self.parser = PydanticOutputParser(pydantic_object=ReportOutput)
-        self.retriever = retriever
-        self.report_prompt = ChatPromptTemplate.from_template(
-            "Generate a project report based on the following information:\n"
-            "Tasks: {tasks}\n"
-            "Project context: {project_context}\n"
-            "Similar past projects: {similar_projects}\n"
-            "Please include in the summary section a list of tasks with their assigned team members (if available).\n"
-            "{format_instructions}"
-        )
-
-    def generate_report(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
-        if not tasks:
-            return {
-                "summary": "No tasks available for report generation.",
-                "key_metrics": {},
-                "risks": ["No tasks to analyze risks."],
-                "recommendations": ["Start by adding tasks to the project."]
-            }
-
-        project_id = tasks[0].get('project_id')
-        project_context = self.retriever.get_project_context(project_id) if project_id else {}
-        similar_projects = self.retriever.get_similar_projects(project_id) if project_id else []
-
-        # Convert datetime objects to strings
-        def json_serial(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Type {type(obj)} not serializable")
-
-        # Enhance task information with team members if available in project context
-        team_members = project_context.get('team_members', [])
-        for task in tasks:
-            task['assigned_to'] = team_members[task['id'] % len(team_members)] if team_members else "Unassigned"
-
-        system_message = SystemMessage(content="You are an AI assistant tasked with generating project reports.")
-        human_message = HumanMessage(content=self.report_prompt.format(
-            tasks=json.dumps(tasks, default=json_serial, indent=2),
-            project_context=json.dumps(project_context, default=json_serial, indent=2),
-            similar_projects=json.dumps(similar_projects, default=json_serial, indent=2),
-            format_instructions=self.parser.get_format_instructions()
-        ))
-
-        messages = [system_message, human_message]
-
-        try:
-            response = self.llm.invoke(messages)
-            report_info = self.parser.parse(response.content)
-            return report_info.dict()
-        except Exception as e:
-            print(f"Error in generate_report: {e}")
-            return {
-                "summary": "An error occurred while generating the report.",
-                "key_metrics": {},
-                "risks": ["Unable to analyze risks due to an error."],
-                "recommendations": ["Please try again or contact support if the issue persists."]
-            }
\ No newline at end of file
+# from langchain_community.chat_models import ChatOpenAI
+from langchain.prompts import ChatPromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from langchain.schema import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Iterator, AsyncIterator
+from langchain_core.utils.json import parse_json_markdown
+from backend.ai_engine.rag.retriever import Retriever
+from backend.ai_engine.llm.registry import llm_registry
+from backend.config import settings
+from dotenv import load_dotenv
+import re
+import asyncio
+import json
+from datetime import datetime
+
+load_dotenv()
+
+class ReportOutput(BaseModel):
+    summary: str = Field(description="Summary of the project status, including tasks and assigned team members")
+    key_metrics: Dict[str, float] = Field(description="Key metrics of the project")
+    risks: List[str] = Field(description="Identified risks in the project")
+    recommendations: List[str] = Field(description="List of recommendations for project improvement")
+
+SECTIONS = list(ReportOutput.__fields__)
+
+NO_TASKS_REPORT = {
+    "summary": "No tasks available for report generation.",
+    "key_metrics": {},
+    "risks": ["No tasks to analyze risks."],
+    "recommendations": ["Start by adding tasks to the project."]
+}
+
+ERROR_REPORT = {
+    "summary": "An error occurred while generating the report.",
+    "key_metrics": {},
+    "risks": ["Unable to analyze risks due to an error."],
+    "recommendations": ["Please try again or contact support if the issue persists."]
+}
+
+class ReportAgent:
+    parser = PydanticOutputParser(pydantic_object=ReportOutput)
+    report_prompt = ChatPromptTemplate.from_template(
+        "Generate a project report based on the following information:\n"
+        "Tasks: {tasks}\n"
+        "Project context: {project_context}\n"
+        "Project metrics: {project_metrics}\n"
+        "Similar past projects: {similar_projects}\n"
+        "Please include in the summary section a list of tasks with their assigned team members (if available).\n"
+        "{format_instructions}"
+    )
+
+    def __init__(self, retriever: Retriever, model_name: str = "gpt-3.5-turbo"):
+        self.llm = llm_registry.get(settings.LLM_MODEL, temperature=0, cache=True)
+        self.retriever = retriever
+
+    def generate_report(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not tasks:
+            return dict(NO_TASKS_REPORT)
+        messages = self._messages(tasks)
+
+        try:
+            response = self.llm.invoke(messages)
+            report_info = self.parser.parse(response.content)
+            return report_info.dict()
+        except Exception as e:
+            print(f"Error in generate_report: {e}")
+            return dict(ERROR_REPORT)
+
+    async def agenerate_report(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """`generate_report` for async callers: the lookups run concurrently and the model call holds no thread."""
+        if not tasks:
+            return dict(NO_TASKS_REPORT)
+        messages = await self._amessages(tasks)
+
+        try:
+            response = await self.llm.ainvoke(messages)
+            report_info = self.parser.parse(response.content)
+            return report_info.dict()
+        except Exception as e:
+            print(f"Error in generate_report: {e}")
+            return dict(ERROR_REPORT)
+
+    def stream_report(self, tasks: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Gather the report's context now and return its events as the model writes it.
+
+        Events are {"type": "token", "text"} for each piece of output, {"type": "section", "name",
+        "value"} as soon as a report field is complete, and a final {"type": "report", "report"}
+        holding the validated report (or the error report, after an {"type": "error"} event).
+        """
+        if not tasks:
+            return iter([{"type": "report", "report": dict(NO_TASKS_REPORT)}])
+        return self._report_events(self._messages(tasks))
+
+    async def astream_report(self, tasks: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """`stream_report` for async callers: the context is gathered when awaited, the events stream after."""
+        if not tasks:
+            return self._aconstant({"type": "report", "report": dict(NO_TASKS_REPORT)})
+        return self._areport_events(await self._amessages(tasks))
+
+    @staticmethod
+    async def _aconstant(event: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        yield event
+
+    async def _areport_events(self, messages) -> AsyncIterator[Dict[str, Any]]:
+        text, emitted = "", set()
+        try:
+            async for chunk in self.llm.astream(messages):
+                text += chunk.content
+                yield {"type": "token", "text": chunk.content}
+                for event in section_events(text, emitted):
+                    yield event
+            report = self.parser.parse(text).dict()
+        except Exception as e:
+            print(f"Error in stream_report: {e}")
+            yield {"type": "error", "detail": str(e)}
+            report = dict(ERROR_REPORT)
+        for event in final_events(report, emitted):
+            yield event
+
+    def _report_events(self, messages) -> Iterator[Dict[str, Any]]:
+        text, emitted = "", set()
+        try:
+            for chunk in self.llm.stream(messages):
+                text += chunk.content
+                yield {"type": "token", "text": chunk.content}
+                yield from section_events(text, emitted)
+            report = self.parser.parse(text).dict()
+        except Exception as e:
+            print(f"Error in stream_report: {e}")
+            yield {"type": "error", "detail": str(e)}
+            report = dict(ERROR_REPORT)
+        yield from final_events(report, emitted)
+
+    def _messages(self, tasks: List[Dict[str, Any]]):
+        project_id = tasks[0].get('project_id')
+        project_context = self.retriever.get_project_context(project_id) if project_id else {}
+        project_metrics = self.retriever.get_project_metrics(project_id) if project_id else {}
+        similar_projects = self.retriever.get_similar_projects(project_id) if project_id else []
+        matcher = self.retriever.get_skill_matcher(project_id) if project_id else None
+        return self._prompt(tasks, project_context, project_metrics, similar_projects, matcher)
+
+    async def _amessages(self, tasks: List[Dict[str, Any]]):
+        project_id = tasks[0].get('project_id')
+        if not project_id:
+            return self._prompt(tasks, {}, {}, [], None)
+        retriever = self.retriever
+        project_context, project_metrics, similar_projects, matcher = await asyncio.gather(
+            retriever.arun(retriever.get_project_context, project_id),
+            retriever.arun(retriever.get_project_metrics, project_id),
+            retriever.arun(retriever.get_similar_projects, project_id),
+            retriever.arun(retriever.get_skill_matcher, project_id),
+        )
+        return self._prompt(tasks, project_context, project_metrics, similar_projects, matcher)
+
+    def _prompt(self, tasks: List[Dict[str, Any]], project_context, project_metrics, similar_projects, matcher):
+        # Convert datetime objects to strings
+        def json_serial(obj):
+            if isinstance(obj, datetime):
+                return obj.isoformat()
+            raise TypeError(f"Type {type(obj)} not serializable")
+
+        # Name each task's assignee, or suggest the best skill fit for unassigned tasks
+        fit = matcher.rank([(task['id'], task.get('required_skills')) for task in tasks], k=1) if matcher else {}
+        for task in tasks:
+            assignee = matcher.name_of(task.get('assigned_to_id')) if matcher else None
+            if assignee:
+                task['assigned_to'] = assignee
+            elif fit.get(task['id']):
+                task['assigned_to'] = f"Unassigned (best fit: {fit[task['id']][0]['name']})"
+            else:
+                task['assigned_to'] = "Unassigned"
+
+        system_message = SystemMessage(content="You are an AI assistant tasked with generating project reports.")
+        human_message = HumanMessage(content=self.report_prompt.format(
+            tasks=json.dumps(tasks, default=json_serial, indent=2),
+            project_context=json.dumps(project_context, default=json_serial, indent=2),
+            project_metrics=json.dumps(project_metrics, indent=2),
+            similar_projects=json.dumps(similar_projects, default=json_serial, indent=2),
+            format_instructions=self.parser.get_format_instructions()
+        ))
+
+        return [system_message, human_message]
+
+
+def section_events(text: str, emitted: set) -> List[Dict[str, Any]]:
+    """Section events for the report fields completed so far that are not in `emitted` yet."""
+    partial = partial_report(text)
+    events = []
+    # Fields are written one after another: all but the last one seen are complete.
+    for name in list(partial)[:-1]:
+        if name in SECTIONS and name not in emitted:
+            emitted.add(name)
+            events.append({"type": "section", "name": name, "value": partial[name]})
+    return events
+
+
+def final_events(report: Dict[str, Any], emitted: set) -> List[Dict[str, Any]]:
+    events = [{"type": "section", "name": name, "value": report[name]} for name in SECTIONS if name not in emitted]
+    return events + [{"type": "report", "report": report}]
+
+
+def partial_report(text: str) -> Dict[str, Any]:
+    """The fields of a report the model is still writing, as far as its JSON parses so far."""
+    try:
+        parsed = parse_json_markdown(text)
+    except Exception:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
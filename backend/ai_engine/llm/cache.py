@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from backend.ai_engine.rag.embeddings import normalize_text
+from backend.ai_engine.utils.cache import LRUCache
+
+
+def normalize_messages(messages) -> list:
+    """(role, text) pairs of a chat input, with whitespace collapsed; a plain prompt string is one human turn."""
+    if isinstance(messages, str):
+        return [["human", normalize_text(messages)]]
+    normalized = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        normalized.append([message.type, normalize_text(content)])
+    return normalized
+
+
+class ResponseCache:
+    """Exact-match cache of chat completions: an in-process LRU in front of a SQLite file.
+
+    Responses are keyed by a hash of (model, temperature, max_tokens, normalized messages), so
+    only a repeat of the very same prompt to the same settings is served from here. Entries
+    expire after `ttl` seconds (never when None) in both tiers.
+    """
+    def __init__(self, cache_path: Optional[str] = None, memory_size: int = 1024, ttl: Optional[float] = None):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._memory = LRUCache(memory_size, ttl)
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, model: str, temperature: float, max_tokens: Optional[int], messages) -> str:
+        payload = json.dumps([model, temperature, max_tokens, normalize_messages(messages)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        content = self._memory_get(key)
+        return content if content is not None else self._load(key)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """`get` for the event loop: memory hits return at once, the SQLite lookup runs on a thread."""
+        content = self._memory_get(key)
+        if content is not None:
+            return content
+        return await asyncio.to_thread(self._load, key) if self.cache_path else self._load(key)
+
+    def put(self, key: str, model: str, content: str):
+        self._memory.put(key, content)
+        self._store(key, model, content)
+
+    async def aput(self, key: str, model: str, content: str):
+        """`put` for the event loop: the response is in memory at once, the SQLite write runs on a thread."""
+        self._memory.put(key, content)
+        if self.cache_path:
+            await asyncio.to_thread(self._store, key, model, content)
+
+    def clear(self):
+        self._memory.clear()
+        with self._lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        content = self._memory.get(key)
+        if content is not None:
+            with self._lock:
+                self.memory_hits += 1
+        return content
+
+    def _load(self, key: str) -> Optional[str]:
+        content = None
+        with self._lock:
+            db = self._connection()
+            row = db.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone() if db else None
+            if row is not None and (self.ttl is None or time.time() - row[1] <= self.ttl):
+                self.disk_hits += 1
+                content = row[0]
+            else:
+                self.misses += 1
+        if content is not None:
+            self._memory.put(key, content)
+        return content
+
+    def _store(self, key: str, model: str, content: str):
+        with self._lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO responses (key, model, content, created_at) VALUES (?, ?, ?, ?)",
+                           (key, model, content, time.time()))
+                db.commit()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # Opened on first use, like the embedding cache, so importing an agent never touches the disk.
+        if self._db is None and self.cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
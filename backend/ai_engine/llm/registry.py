@@ -0,0 +1,273 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import httpx
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_groq import ChatGroq
+from backend.ai_engine.llm.cache import ResponseCache
+from backend.config import settings
+
+
+class ModelLimit:
+    """Concurrency slots of one model, shared by threads and by coroutines on any event loop.
+
+    Threads block on the semaphore as usual. Coroutines only try it and otherwise park on a
+    future that the next release wakes, so a request waiting for a slot holds no thread.
+    """
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self._waiters = {}
+
+    def acquire(self):
+        self._semaphore.acquire()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            # Parked before trying, so a release in between still wakes this coroutine.
+            with self._lock:
+                self._waiters[waiter] = loop
+            try:
+                if self._semaphore.acquire(blocking=False):
+                    return
+                await waiter
+            finally:
+                with self._lock:
+                    self._waiters.pop(waiter, None)
+
+    def release(self):
+        self._semaphore.release()
+        with self._lock:
+            waiters, self._waiters = self._waiters, {}
+        # Every parked coroutine retries; those that lose the race park again.
+        for waiter, loop in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # The waiter's loop has closed.
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class PooledChat:
+    """An agent's handle on a shared chat client, holding the model's concurrency slot per call.
+
+    The client itself is built on the first call, so constructing an agent never needs an API
+    key. With a response cache, a prompt answered before is served from it without calling the model.
+    """
+    def __init__(self, registry: "LLMRegistry", key: tuple, limit: ModelLimit,
+                 cache: Optional[ResponseCache] = None):
+        self.model, self.temperature, self.max_tokens, _ = key
+        self.cache = cache
+        self._key = key
+        self._limit = limit
+        self._registry = registry
+
+    @property
+    def client(self) -> ChatGroq:
+        return self._registry._client(self._key)
+
+    def invoke(self, messages, **kwargs):
+        key = self._cache_key(messages, kwargs)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return AIMessage(content=cached)
+        with self._slot():
+            response = self.client.invoke(messages, **kwargs)
+        self._remember(key, response)
+        return response
+
+    async def ainvoke(self, messages, **kwargs):
+        key = self._cache_key(messages, kwargs)
+        cached = await self.cache.aget(key) if key else None
+        if cached is not None:
+            return AIMessage(content=cached)
+        async with self._aslot():
+            response = await self.client.ainvoke(messages, **kwargs)
+        await self._aremember(key, response)
+        return response
+
+    def stream(self, messages, **kwargs) -> Iterator[AIMessageChunk]:
+        """Yield the completion as it is generated; the model's slot is held until the stream ends."""
+        key = self._cache_key(messages, kwargs)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            yield AIMessageChunk(content=cached)
+            return
+        content = []
+        with self._slot():
+            for chunk in self.client.stream(messages, **kwargs):
+                content.append(chunk.content)
+                yield chunk
+        self._remember(key, AIMessage(content="".join(content)))
+
+    async def astream(self, messages, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        key = self._cache_key(messages, kwargs)
+        cached = await self.cache.aget(key) if key else None
+        if cached is not None:
+            yield AIMessageChunk(content=cached)
+            return
+        content = []
+        async with self._aslot():
+            async for chunk in self.client.astream(messages, **kwargs):
+                content.append(chunk.content)
+                yield chunk
+        await self._aremember(key, AIMessage(content="".join(content)))
+
+    def _cache_key(self, messages, kwargs) -> Optional[str]:
+        # Calls with extra options (stop sequences, tools, ...) are never cached.
+        if self.cache is None or kwargs:
+            return None
+        return self.cache.key(self.model, self.temperature, self.max_tokens, messages)
+
+    def _remember(self, key: Optional[str], response):
+        if key and isinstance(response.content, str):
+            self.cache.put(key, self.model, response.content)
+
+    async def _aremember(self, key: Optional[str], response):
+        # The SQLite write runs off the event loop.
+        if key and isinstance(response.content, str):
+            await self.cache.aput(key, self.model, response.content)
+
+    @asynccontextmanager
+    async def _aslot(self):
+        # One limit bounds sync and async callers alike; waiting for it must not block the event loop.
+        await self._limit.aacquire()
+        self._registry._started(self.model)
+        try:
+            yield
+        finally:
+            self._registry._finished(self.model)
+            self._limit.release()
+
+    @contextmanager
+    def _slot(self):
+        self._limit.acquire()
+        self._registry._started(self.model)
+        try:
+            yield
+        finally:
+            self._registry._finished(self.model)
+            self._limit.release()
+
+
+class LLMRegistry:
+    """Process-wide chat clients, shared by every agent instead of built per request.
+
+    There is one client per (model, temperature, max_tokens) and all of them send through one
+    pair of keep-alive httpx pools, so requests reuse warm TLS connections. Each model also has
+    a concurrency limit (`LLM_CONCURRENCY`, else `LLM_DEFAULT_CONCURRENCY`): callers past it wait
+    for a slot rather than piling onto the provider's rate limit. Agents whose prompts repeat
+    (deterministic ones at temperature 0) opt into the shared response cache with `cache=True`.
+    """
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 timeout: float = 60.0, concurrency: Optional[Dict[str, int]] = None, default_concurrency: int = 8,
+                 response_cache: Optional[ResponseCache] = None):
+        self.api_key = api_key
+        self.response_cache = response_cache
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self.timeout = timeout
+        self.concurrency = dict(concurrency or {})
+        self.default_concurrency = default_concurrency
+        self._clients = {}
+        self._semaphores = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._active = {}
+
+    def get(self, model: str, temperature: float = 0, max_tokens: Optional[int] = None, max_retries: int = 2,
+            cache: bool = False) -> PooledChat:
+        with self._lock:
+            limit = self._semaphores.get(model)
+            if limit is None:
+                limit = self._semaphores[model] = ModelLimit(self.concurrency.get(model, self.default_concurrency))
+        return PooledChat(self, (model, temperature, max_tokens, max_retries), limit, self.response_cache if cache else None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "models": {
+                    model: {
+                        "limit": self.concurrency.get(model, self.default_concurrency),
+                        "active": self._active.get(model, 0),
+                        "calls": self._calls.get(model, 0),
+                    }
+                    for model in self._semaphores
+                },
+                "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            # Closing the async pool needs the loop that used it; `aclose` does that.
+            self._clients.clear()
+            self._http_client = self._http_async_client = None
+
+    async def aclose(self):
+        """`close` for the event loop that ran the async calls, closing its pool as well."""
+        with self._lock:
+            http_async_client, self._http_async_client = self._http_async_client, None
+        self.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+    def _client(self, key: tuple) -> ChatGroq:
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    model, temperature, max_tokens, max_retries = key
+                    client = self._clients[key] = ChatGroq(
+                        groq_api_key=self.api_key or os.getenv("GROQ_API_KEY"),
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        max_retries=max_retries,
+                        http_client=self._sync_pool(),
+                        http_async_client=self._async_pool(),
+                    )
+        return client
+
+    def _sync_pool(self) -> httpx.Client:
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+        return self._http_client
+
+    def _async_pool(self) -> httpx.AsyncClient:
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._http_async_client
+
+    def _started(self, model: str):
+        with self._lock:
+            self._calls[model] = self._calls.get(model, 0) + 1
+            self._active[model] = self._active.get(model, 0) + 1
+
+    def _finished(self, model: str):
+        with self._lock:
+            self._active[model] -= 1
+
+
+llm_registry = LLMRegistry(
+    api_key=settings.GROQ_API_KEY,
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+    timeout=settings.LLM_TIMEOUT,
+    concurrency=settings.LLM_CONCURRENCY,
+    default_concurrency=settings.LLM_DEFAULT_CONCURRENCY,
+    response_cache=ResponseCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_SIZE, settings.LLM_CACHE_TTL) if settings.LLM_CACHE else None,
+)
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from backend.ai_engine.rag.vector_store import vector_store
+from backend.ai_engine.utils.concurrency import Lazy
+from backend.config import settings
+from backend.database.versioning import project_version
+
+
+class ProjectAnswers:
+    """Question vectors and answers of one project, scanned brute force; it stays small."""
+    def __init__(self, version: tuple, capacity: int):
+        self.version = version
+        self.capacity = capacity
+        self.vectors = None
+        self.answers = []
+        self.last_used = np.zeros(0, dtype=np.int64)
+        self.created = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def best(self, vector: np.ndarray, since: Optional[float] = None) -> Tuple[Optional[int], float]:
+        """Row of the most similar question and its similarity, among answers created after `since` if given."""
+        if not self.answers:
+            return None, 0.0
+        similarities = self.vectors @ vector
+        if since is not None:
+            similarities = np.where(self.created > since, similarities, -np.inf)
+        row = int(np.argmax(similarities))
+        if not np.isfinite(similarities[row]):
+            return None, 0.0
+        return row, float(similarities[row])
+
+    def add(self, vector: np.ndarray, answer: str, tick: int, threshold: float, now: float):
+        if self.vectors is None:
+            self.vectors = np.zeros((0, len(vector)), dtype=np.float32)
+        row, similarity = self.best(vector)
+        if row is None or similarity < threshold:
+            if len(self.answers) < self.capacity:
+                self.vectors = np.vstack([self.vectors, vector[None, :]])
+                self.answers.append(answer)
+                self.last_used = np.append(self.last_used, tick)
+                self.created = np.append(self.created, now)
+                return
+            # Full: the least recently used answer makes room.
+            row = int(np.argmin(self.last_used))
+        # Otherwise the new answer replaces the one its question would have been served.
+        self.vectors[row] = vector
+        self.answers[row] = answer
+        self.last_used[row] = tick
+        self.created[row] = now
+
+
+class SemanticAnswerCache:
+    """Answers to earlier chat questions, per project, found again by question similarity.
+
+    A question is embedded once and compared by cosine similarity with the questions already
+    answered for its project; at or above `threshold` the earlier answer is reused. Answers are
+    only valid for the version they were given under: the project's CRUD version (see
+    backend.database.versioning) together with its vector store revision, so a write empties
+    the project's entries once it is committed and again once the indexer has applied it.
+    Versions are per process, so answers also expire after `ttl` seconds (never when None),
+    which bounds how long another worker's writes can go unseen. Each project keeps up to
+    `max_entries_per_project` answers and the cache up to `max_projects` projects, both evicting
+    the least recently used.
+    """
+    def __init__(self, embeddings: Embeddings, threshold: float = 0.92, max_entries_per_project: int = 128,
+                 max_projects: int = 256, ttl: Optional[float] = None, vector_store=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.vector_store = vector_store
+        self.max_entries_per_project = max_entries_per_project
+        self.max_projects = max_projects
+        self._projects = OrderedDict()
+        self._lock = threading.Lock()
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def version(self, project_id: int) -> tuple:
+        """The version an answer read from the project's data now is valid for."""
+        revision = self.vector_store.store_revision(project_id) if self.vector_store is not None else None
+        return project_version(project_id), revision
+
+    def lookup(self, project_id: int, vector: np.ndarray) -> Optional[str]:
+        version = self.version(project_id)
+        since = time.time() - self.ttl if self.ttl is not None else None
+        with self._lock:
+            answers = self._answers(project_id, version, create=False)
+            row, similarity = answers.best(vector, since) if answers is not None else (None, 0.0)
+            if row is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._tick += 1
+            answers.last_used[row] = self._tick
+            self.hits += 1
+            return answers.answers[row]
+
+    def store(self, project_id: int, vector: np.ndarray, answer: str, version: tuple):
+        """Keep an answer given from the project's data at `version`; dropped if the project changed since."""
+        current = self.version(project_id)
+        with self._lock:
+            if version != current:
+                return
+            self._tick += 1
+            self._answers(project_id, current, create=True).add(vector, answer, self._tick, self.threshold, time.time())
+
+    def clear(self):
+        with self._lock:
+            self._projects.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "projects": len(self._projects),
+            "entries": sum(len(answers) for answers in self._projects.values()),
+            "threshold": self.threshold,
+        }
+
+    def _answers(self, project_id: int, version: tuple, create: bool) -> Optional[ProjectAnswers]:
+        answers = self._projects.get(project_id)
+        if answers is not None and answers.version != version:
+            del self._projects[project_id]
+            answers = None
+        if answers is None and create:
+            answers = self._projects[project_id] = ProjectAnswers(version, self.max_entries_per_project)
+            while len(self._projects) > self.max_projects:
+                self._projects.popitem(last=False)
+        if answers is not None:
+            self._projects.move_to_end(project_id)
+        return answers
+
+
+semantic_answer_cache = Lazy(lambda: SemanticAnswerCache(
+    vector_store.embeddings,
+    threshold=settings.AI_CHAT_CACHE_THRESHOLD,
+    max_entries_per_project=settings.AI_CHAT_CACHE_SIZE,
+    max_projects=settings.AI_CHAT_CACHE_PROJECTS,
+    ttl=settings.AI_CHAT_CACHE_TTL,
+    vector_store=vector_store.instance(),
+))
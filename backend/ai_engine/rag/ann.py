@@ -0,0 +1,167 @@
+import math
+from typing import Optional, Tuple
+import faiss
+import numpy as np
+from backend.config import settings
+
+FLAT = "Flat"
+IVF = "IVF"
+HNSW = "HNSW"
+KINDS = [FLAT, IVF, HNSW]
+
+SQ8 = "sq8"
+PQ = "pq"
+
+# k-means wants a few dozen points per centroid; more than this many per centroid buys nothing.
+TRAINING_POINTS_PER_LIST = 256
+# PQ trains 256 centroids per sub-quantizer and wants ~40 points for each of them.
+MIN_TRAINING_SAMPLE = 16384
+
+# Id map entry plus the reverse hash map entry IndexIDMap2 keeps per vector.
+ID_MAP_BYTES = 48
+
+
+def index_kind_for(count: int) -> str:
+    """Index type for a corpus of `count` vectors; the thresholds come from the ANN_* settings."""
+    if count >= settings.ANN_HNSW_MIN_VECTORS:
+        return HNSW
+    if count >= settings.ANN_IVF_MIN_VECTORS:
+        return IVF
+    return FLAT
+
+
+def ivf_nlist(count: int) -> int:
+    return max(1, int(math.sqrt(count)))
+
+
+def encoding_for(count: int) -> Optional[str]:
+    """Vector code for a corpus of `count` vectors: None for float32, else the configured quantizer.
+
+    Quantizers need training data, so small corpora stay float32 until ANN_QUANTIZE_MIN_VECTORS.
+    """
+    if not settings.VECTOR_STORE_QUANTIZATION or count < settings.ANN_QUANTIZE_MIN_VECTORS:
+        return None
+    return settings.VECTOR_STORE_QUANTIZATION
+
+
+def pq_subquantizers(dimension: int) -> int:
+    # One byte per sub-quantizer; the count has to divide the dimension.
+    return max(m for m in range(1, min(dimension, settings.ANN_PQ_BYTES) + 1) if dimension % m == 0)
+
+
+def factory_string(kind: str, count: int, dimension: int, encoding: Optional[str] = None) -> str:
+    codes = {None: "Flat", SQ8: "SQ8", PQ: f"PQ{pq_subquantizers(dimension)}"}[encoding]
+    if kind == IVF:
+        return f"IVF{ivf_nlist(count)},{codes}"
+    if kind == HNSW:
+        return f"HNSW{settings.ANN_HNSW_M},{codes}"
+    return codes
+
+
+def index_kind(index: faiss.Index) -> str:
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexIVF):
+        return IVF
+    if isinstance(inner, faiss.IndexHNSW):
+        return HNSW
+    return FLAT
+
+
+def index_encoding(index: faiss.IndexIDMap2) -> Optional[str]:
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return SQ8
+    if isinstance(inner, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return PQ
+    return None
+
+
+def bytes_per_vector(index: faiss.IndexIDMap2) -> int:
+    """Approximate resident bytes per stored vector, codes plus id bookkeeping and graph links."""
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        # Level 0 holds 2 * M neighbour ids per vector; upper levels add little on average.
+        return faiss.downcast_index(inner.storage).code_size + 2 * settings.ANN_HNSW_M * 4 + ID_MAP_BYTES
+    if isinstance(inner, faiss.IndexIVF):
+        # Inverted lists store an id next to every code.
+        return inner.code_size + 8 + ID_MAP_BYTES
+    return inner.code_size + ID_MAP_BYTES
+
+
+def needs_migration(index: faiss.IndexIDMap2, live_count: int) -> bool:
+    """Whether the corpus has outgrown (or clearly shrunk below) the index it is stored in."""
+    if index_encoding(index) != encoding_for(live_count):
+        return True
+    current = index_kind(index)
+    target = index_kind_for(live_count)
+    if KINDS.index(target) < KINDS.index(current):
+        # Step down only once well below the threshold, so a corpus hovering around it does not flap.
+        threshold = settings.ANN_HNSW_MIN_VECTORS if current == HNSW else settings.ANN_IVF_MIN_VECTORS
+        return live_count < threshold / 2
+    if target != current:
+        return True
+    if current == IVF:
+        # Centroids were trained on a corpus a quarter of the size; retrain with more lists.
+        return ivf_nlist(live_count) >= 2 * faiss.downcast_index(index.index).nlist
+    return False
+
+
+def configure(index: faiss.IndexIDMap2):
+    """Apply the query-time knobs, which faiss does not persist for every index type."""
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(settings.ANN_IVF_NPROBE, inner.nlist)
+    elif isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = settings.ANN_HNSW_EF_SEARCH
+
+
+def build_index(dimension: int, vectors: np.ndarray, ids: np.ndarray, kind: Optional[str] = None,
+                encoding: Optional[str] = "auto") -> faiss.IndexIDMap2:
+    """Build (and train, if needed) an ID-mapped index over `vectors`.
+
+    `kind` and `encoding` default to the ones sized for the corpus; pass encoding=None for float32.
+    """
+    count = len(vectors)
+    kind = kind or index_kind_for(count)
+    encoding = encoding_for(count) if encoding == "auto" else encoding
+    if kind == IVF and count < ivf_nlist(count) * 4:
+        kind = FLAT
+    if kind == FLAT and encoding is None:
+        inner = faiss.IndexFlatL2(dimension)
+    else:
+        inner = faiss.index_factory(dimension, factory_string(kind, count, dimension, encoding))
+    if not inner.is_trained:
+        lists = inner.nlist if isinstance(inner, faiss.IndexIVF) else 0
+        sample_size = min(count, max(lists * TRAINING_POINTS_PER_LIST, MIN_TRAINING_SAMPLE))
+        inner.train(vectors[np.random.default_rng(0).choice(count, sample_size, replace=False)])
+    if isinstance(inner, faiss.IndexIVF):
+        # Lets live vectors be read back out of the lists when the index is rebuilt.
+        inner.make_direct_map()
+    index = faiss.IndexIDMap2(inner)
+    configure(index)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def live_vectors(index: faiss.IndexIDMap2, live_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Read back the stored vectors whose external ids are in `live_ids`, with those ids."""
+    inner = faiss.downcast_index(index.index)
+    if inner.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+    ids = faiss.vector_to_array(index.id_map)
+    vectors = inner.reconstruct_n(0, inner.ntotal)
+    mask = np.isin(ids, live_ids)
+    return vectors[mask], ids[mask]
+
+
+def search_parameters(index: faiss.IndexIDMap2, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    # The parameter class has to match the wrapped index, so carry over its own probe settings.
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
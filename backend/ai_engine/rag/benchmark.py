@@ -0,0 +1,96 @@
+"""Recall and latency of each ANN index type against the exact flat index.
+
+    python -m backend.ai_engine.rag.benchmark --vectors 100000 --dim 384
+    python -m backend.ai_engine.rag.benchmark --snapshot ./vector_index
+
+Use it to pick ANN_IVF_MIN_VECTORS / ANN_HNSW_MIN_VECTORS, the nprobe / efSearch settings and
+VECTOR_STORE_QUANTIZATION: each row reports build time, resident bytes per vector, recall@k
+against exact search and p50/p99 single-query latency.
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+import faiss
+import numpy as np
+from backend.ai_engine.rag import ann
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    # Embeddings of real text are clustered by topic, which is what makes IVF and HNSW work; so is this data.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.5 * rng.normal(size=(count, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def sample_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), min(count, len(vectors)), replace=False)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, k: int = 10, kinds: Optional[List[str]] = None,
+                  encodings: Optional[List[Optional[str]]] = None) -> List[Dict[str, float]]:
+    ids = np.arange(len(vectors), dtype=np.int64)
+    _, truth = ann.build_index(vectors.shape[1], vectors, ids, ann.FLAT, encoding=None).search(queries, k)
+    rows = []
+    for kind, encoding in ((kind, encoding) for kind in kinds or ann.KINDS for encoding in encodings or [None]):
+        start = time.perf_counter()
+        index = ann.build_index(vectors.shape[1], vectors, ids, kind, encoding=encoding)
+        build_seconds = time.perf_counter() - start
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            _, found = index.search(query[None, :], k)
+            latencies.append(time.perf_counter() - start)
+            hits += len(set(found[0].tolist()) & set(expected.tolist()))
+        rows.append({
+            "index": ann.index_kind(index),
+            "encoding": ann.index_encoding(index) or "float32",
+            "vectors": len(vectors),
+            "build_seconds": build_seconds,
+            "bytes_per_vector": ann.bytes_per_vector(index),
+            "recall": hits / (k * len(queries)),
+            "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+            "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        })
+    return rows
+
+
+def load_snapshot_vectors(directory: str) -> np.ndarray:
+    from backend.ai_engine.rag.vector_store import CURRENT_FILE, INDEX_FILE
+
+    current_path = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(current_path):
+        raise SystemExit(f"No vector store snapshot found in {directory}")
+    with open(current_path) as f:
+        index = faiss.read_index(os.path.join(directory, f.read().strip(), INDEX_FILE))
+    # Includes tombstoned vectors, and quantized snapshots give back approximations; fine for timing.
+    return ann.live_vectors(index, faiss.vector_to_array(index.id_map))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector dimension")
+    parser.add_argument("--snapshot", help="benchmark the vectors of a saved store instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--encodings", default="none,sq8", help="comma-separated: none, sq8, pq (pq is slow to train)")
+    args = parser.parse_args()
+
+    vectors = load_snapshot_vectors(args.snapshot) if args.snapshot else synthetic_vectors(args.vectors, args.dim)
+    encodings = [None if name == "none" else name for name in args.encodings.split(",")]
+    rows = run_benchmark(vectors, sample_queries(vectors, args.queries), k=args.k, encodings=encodings)
+    print(f"{'index':<6} {'codes':<8} {'vectors':>9} {'build s':>8} {'B/vec':>6} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        print(f"{row['index']:<6} {row['encoding']:<8} {row['vectors']:>9} {row['build_seconds']:>8.2f} "
+              f"{row['bytes_per_vector']:>6} {row['recall']:>10.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+
+# Rows of the global store use this key; partitions use their project ID.
+GLOBAL_STORE = -1
+
+# SQLite caps bound parameters per statement; stay well below the limit.
+CHUNK_SIZE = 500
+
+
+class MemoryDocuments:
+    """Documents of one store held in RAM, in the langchain docstore as plain FAISS stores keep them.
+
+    With `keep_vectors` (set when the index may hold lossy SQ8/PQ codes) the exact float32 vectors
+    are kept by id as well, so rebuilding the index never trains on vectors decoded from codes.
+    """
+    def __init__(self, docstore: Optional[InMemoryDocstore] = None, index_to_docstore_id: Optional[Dict[int, str]] = None,
+                 keep_vectors: bool = False, exact_vectors: Optional[Dict[int, np.ndarray]] = None):
+        self.docstore = docstore if docstore is not None else InMemoryDocstore()
+        self.index_to_docstore_id = index_to_docstore_id if index_to_docstore_id is not None else {}
+        self.ids_by_docstore_id = {docstore_id: i for i, docstore_id in self.index_to_docstore_id.items()}
+        self.keep_vectors = keep_vectors
+        self.exact_vectors = dict(exact_vectors or {}) if keep_vectors else {}
+
+    def __len__(self) -> int:
+        return len(self.index_to_docstore_id)
+
+    def ids(self) -> np.ndarray:
+        return np.fromiter(self.index_to_docstore_id, dtype=np.int64, count=len(self.index_to_docstore_id))
+
+    def max_id(self) -> int:
+        return max(self.index_to_docstore_id, default=-1)
+
+    def ids_for(self, docstore_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Ids of the given documents (every document by default); unknown docstore ids are left out."""
+        if docstore_ids is None:
+            return dict(self.ids_by_docstore_id)
+        return {docstore_id: self.ids_by_docstore_id[docstore_id] for docstore_id in docstore_ids if docstore_id in self.ids_by_docstore_id}
+
+    def get(self, ids: List[int]) -> Dict[int, Document]:
+        found = {}
+        for i in ids:
+            docstore_id = self.index_to_docstore_id.get(i)
+            doc = self.docstore.search(docstore_id) if docstore_id is not None else None
+            if isinstance(doc, Document):
+                found[i] = doc
+        return found
+
+    def put(self, ids: List[int], docstore_ids: List[str], documents: List[Document], vectors: np.ndarray):
+        self.docstore.add(dict(zip(docstore_ids, documents)))
+        for i, docstore_id in zip(ids, docstore_ids):
+            self.index_to_docstore_id[i] = docstore_id
+            self.ids_by_docstore_id[docstore_id] = i
+        if self.keep_vectors:
+            for i, vector in zip(ids, vectors):
+                self.exact_vectors[i] = np.asarray(vector, dtype=np.float32)
+
+    def remove(self, docstore_ids: List[str]) -> List[int]:
+        """Forget documents by docstore id and return the ids they were stored under."""
+        removed = [docstore_id for docstore_id in dict.fromkeys(docstore_ids) if docstore_id in self.ids_by_docstore_id]
+        if not removed:
+            return []
+        ids = [self.ids_by_docstore_id.pop(docstore_id) for docstore_id in removed]
+        for i in ids:
+            del self.index_to_docstore_id[i]
+            self.exact_vectors.pop(i, None)
+        self.docstore.delete(removed)
+        return ids
+
+    def texts(self) -> Iterator[Tuple[int, str]]:
+        for i, docstore_id in list(self.index_to_docstore_id.items()):
+            yield i, self.docstore.search(docstore_id).page_content
+
+    def vectors(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        # Without exact vectors for every document (the store was loaded from a snapshot that had
+        # none), callers read them back from the index.
+        if not self.keep_vectors or not self.index_to_docstore_id or len(self.exact_vectors) != len(self.index_to_docstore_id):
+            return None
+        ids = np.fromiter(sorted(self.exact_vectors), dtype=np.int64, count=len(self.exact_vectors))
+        return np.vstack([self.exact_vectors[i] for i in ids.tolist()]), ids
+
+
+class DocumentDatabase:
+    """SQLite file holding the documents of every store, global and per project, in compact mode."""
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._db = None
+
+    def table(self, key: Optional[int]) -> "SQLiteDocuments":
+        return SQLiteDocuments(self, GLOBAL_STORE if key is None else key)
+
+    def drop(self, key: Optional[int]):
+        with self.lock:
+            db = self.connection()
+            db.execute("DELETE FROM documents WHERE store = ?", (GLOBAL_STORE if key is None else key,))
+            db.commit()
+
+    def connection(self) -> sqlite3.Connection:
+        # Opened on first use, like the embedding cache, so constructing a store never touches the disk.
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "store INTEGER NOT NULL, id INTEGER NOT NULL, doc_id TEXT NOT NULL, page_content TEXT NOT NULL, "
+                "metadata TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (store, id))"
+            )
+            self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS documents_doc_id ON documents (store, doc_id)")
+            self._db.commit()
+        return self._db
+
+
+class SQLiteDocuments:
+    """Documents of one store kept on disk and read back only for the hits a search returns.
+
+    Each row also keeps the exact float32 vector, so a quantized index is always rebuilt from the
+    original embeddings rather than from its own lossy codes.
+    """
+    def __init__(self, database: DocumentDatabase, store: int):
+        self.database = database
+        self.store = store
+        self._count = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = self._query("SELECT COUNT(*) FROM documents WHERE store = ?", ())[0][0]
+        return self._count
+
+    def ids(self) -> np.ndarray:
+        rows = self._query("SELECT id FROM documents WHERE store = ?", ())
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def max_id(self) -> int:
+        value = self._query("SELECT MAX(id) FROM documents WHERE store = ?", ())[0][0]
+        return -1 if value is None else value
+
+    def ids_for(self, docstore_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Ids of the given documents (every document by default); unknown docstore ids are left out."""
+        if docstore_ids is None:
+            return dict(self._query("SELECT doc_id, id FROM documents WHERE store = ?", ()))
+        found = {}
+        for start in range(0, len(docstore_ids), CHUNK_SIZE):
+            chunk = docstore_ids[start:start + CHUNK_SIZE]
+            found.update(self._query(
+                f"SELECT doc_id, id FROM documents WHERE store = ? AND doc_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return found
+
+    def get(self, ids: List[int]) -> Dict[int, Document]:
+        found = {}
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            rows = self._query(
+                f"SELECT id, page_content, metadata FROM documents WHERE store = ? AND id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for i, page_content, metadata in rows:
+                found[i] = Document(page_content=page_content, metadata=json.loads(metadata))
+        return found
+
+    def put(self, ids: List[int], docstore_ids: List[str], documents: List[Document], vectors: np.ndarray):
+        rows = [
+            (self.store, i, docstore_id, doc.page_content, json.dumps(doc.metadata, default=str),
+             np.asarray(vector, dtype=np.float32).tobytes())
+            for i, docstore_id, doc, vector in zip(ids, docstore_ids, documents, vectors)
+        ]
+        with self.database.lock:
+            db = self.database.connection()
+            db.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)", rows)
+            db.commit()
+            self._count = None
+
+    def remove(self, docstore_ids: List[str]) -> List[int]:
+        """Delete documents by docstore id and return the ids they were stored under."""
+        docstore_ids = list(dict.fromkeys(docstore_ids))
+        removed = []
+        with self.database.lock:
+            db = self.database.connection()
+            for start in range(0, len(docstore_ids), CHUNK_SIZE):
+                chunk = docstore_ids[start:start + CHUNK_SIZE]
+                where = f"store = ? AND doc_id IN ({','.join('?' * len(chunk))})"
+                removed.extend(row[0] for row in db.execute(f"SELECT id FROM documents WHERE {where}", [self.store, *chunk]))
+                db.execute(f"DELETE FROM documents WHERE {where}", [self.store, *chunk])
+            db.commit()
+            self._count = None
+        return removed
+
+    def texts(self) -> Iterator[Tuple[int, str]]:
+        yield from self._query("SELECT id, page_content FROM documents WHERE store = ?", ())
+
+    def vectors(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        rows = self._query("SELECT id, vector FROM documents WHERE store = ? ORDER BY id", ())
+        if not rows:
+            return None
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        return np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]), ids
+
+    def _query(self, sql: str, params) -> list:
+        with self.database.lock:
+            return self.database.connection().execute(sql, [self.store, *params]).fetchall()
@@ -0,0 +1,297 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from backend.ai_engine.rag.lexical import tokenize
+from backend.config import settings
+
+# Ollama model tags and their Hugging Face names, for running the same model in process.
+MODEL_ALIASES = {
+    "all-minilm": "sentence-transformers/all-MiniLM-L6-v2",
+    "nomic-embed-text": "nomic-ai/nomic-embed-text-v1",
+}
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed cache in front of an embedding model.
+
+    Vectors are keyed by a hash of (model, normalized text) and looked up in an in-process LRU
+    first, then in a SQLite file of float32 blobs that survives restarts. Only texts missing from
+    both tiers reach the wrapped model, in a single batched call.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_path: Optional[str] = None, memory_size: int = 10000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self.cache_path = cache_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+            self._store(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+            pending = [key for key in dict.fromkeys(keys) if key not in found]
+            db = self._connection() if pending else None
+            if db is not None:
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start:start + 500]
+                    rows = db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+            self.misses += sum(1 for key in pending if key not in found)
+        return found
+
+    def _store(self, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            db = self._connection()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    [(key, self.model_name, vector.tobytes()) for key, vector in vectors.items()],
+                )
+                db.commit()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # Opened on first use so importing the vector store never touches the disk.
+        if self._db is None and self.cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic feature-hashing vectors of word unigrams and bigrams; no model, no network.
+
+    Texts that share words get nearby vectors, so it works as an offline stand-in for a real
+    model in tests, benchmarks and local development.
+    """
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        tokens = tokenize(text)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            # The top bit picks the sign so colliding features cancel out instead of piling up.
+            vector[value % self.size] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+
+class DynamicBatcher:
+    """Coalesces encode calls from concurrent threads into shared model batches.
+
+    Callers block on their own slice of the result. A daemon worker takes the first waiting
+    request, gathers more for up to `max_wait` seconds or `max_batch_size` texts, and runs them
+    through `encode` in one call, so the model sees large batches under load and no extra delay
+    beyond `max_wait` when idle.
+    """
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch_size: int = 32, max_wait: float = 0.005):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, texts: List[str]) -> List[List[float]]:
+        future = Future()
+        self._start()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+            self.batches += 1
+            try:
+                vectors = self.encode([text for texts, _ in requests for text in texts])
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for texts, future in requests:
+                future.set_result([np.asarray(vector, dtype=np.float32).tolist() for vector in vectors[start:start + len(texts)]])
+                start += len(texts)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """In-process CPU embedder built on sentence-transformers.
+
+    `backend="onnx"` runs the model through onnxruntime instead of torch. Either way the model
+    is loaded on first use and every call goes through a `DynamicBatcher`, so concurrent
+    requests share forward passes that use all cores.
+    """
+    def __init__(self, model_name: str, backend: str = "torch", batch_size: int = 32, max_wait: float = 0.005):
+        self.model_name = MODEL_ALIASES.get(model_name, model_name)
+        self.backend = backend
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.batcher = DynamicBatcher(self._encode, max_batch_size=batch_size, max_wait=max_wait)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.batcher.submit(list(texts)) if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self._load().encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+
+    def _load(self):
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise ImportError(
+                        "The sentence-transformers embedding backend needs `pip install sentence-transformers` "
+                        "(and `optimum[onnxruntime]` for the onnx backend)"
+                    ) from e
+                kwargs = {} if self.backend == "torch" else {"backend": self.backend}
+                self._model = SentenceTransformer(self.model_name, device="cpu", **kwargs)
+            return self._model
+
+
+def _ollama_embeddings(model: str) -> Embeddings:
+    from langchain_ollama import OllamaEmbeddings
+
+    return OllamaEmbeddings(model=model)
+
+
+def _sentence_transformer_embeddings(backend: str) -> Callable[[str], Embeddings]:
+    return lambda model: SentenceTransformerEmbeddings(
+        model,
+        backend=backend,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        max_wait=settings.EMBEDDING_BATCH_WAIT_MS / 1000,
+    )
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[[str], Embeddings]] = {
+    "ollama": _ollama_embeddings,
+    "sentence-transformers": _sentence_transformer_embeddings("torch"),
+    "onnx": _sentence_transformer_embeddings("onnx"),
+    "hashing": lambda model: HashingEmbeddings(settings.EMBEDDING_DIMENSION),
+}
+
+
+def register_embedding_backend(name: str, factory: Callable[[str], Embeddings]):
+    """Make `factory(model_name)` available as EMBEDDING_BACKEND=`name`."""
+    EMBEDDING_BACKENDS[name] = factory
+
+
+def create_embeddings(backend: Optional[str] = None, model: Optional[str] = None) -> Embeddings:
+    """Build the configured embedding backend, behind the embedding cache when it is a real model."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    model = model or settings.EMBEDDING_MODEL
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {sorted(EMBEDDING_BACKENDS)}")
+    embeddings = EMBEDDING_BACKENDS[backend](model)
+    if isinstance(embeddings, HashingEmbeddings):
+        # Hashing is cheaper than a cache lookup.
+        return embeddings
+    # Ollama keeps the bare model name so caches written before backends existed stay valid.
+    namespace = model if backend == "ollama" else f"{backend}:{model}"
+    return CachedEmbeddings(
+        embeddings,
+        namespace,
+        cache_path=settings.EMBEDDING_CACHE_PATH,
+        memory_size=settings.EMBEDDING_CACHE_SIZE,
+    )
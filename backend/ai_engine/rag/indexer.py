@@ -0,0 +1,302 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from backend.ai_engine.rag.neighbors import neighbor_graphs
+from backend.ai_engine.rag.vector_store import partition_key, vector_store
+from backend.ai_engine.utils.concurrency import Lazy
+from backend.config import settings
+from backend.database import models
+
+_STOP = object()
+
+UPSERT = "upsert"
+DELETE = "delete"
+DROP_PROJECT = "drop_project"
+
+SPOOL_FILE = "index_events.sqlite3"
+
+
+def task_document(task: models.Task) -> Tuple[str, Dict[str, Any]]:
+    text = f"{task.title}\n{task.description}" if task.description else task.title
+    metadata = {
+        "kind": "task",
+        "doc_id": f"task:{task.id}",
+        "task_id": task.id,
+        "project_id": task.project_id,
+        "title": task.title,
+        "status": task.status,
+        "priority": task.priority or "Unknown",
+    }
+    return text, metadata
+
+
+def project_document(project: models.Project) -> Tuple[str, Dict[str, Any]]:
+    text = f"{project.name}\n{project.description}" if project.description else project.name
+    metadata = {
+        "kind": "project",
+        "doc_id": f"project:{project.id}",
+        "project_id": project.id,
+        "name": project.name,
+        "status": project.status,
+    }
+    return text, metadata
+
+
+class EventSpool:
+    """Index events handed from reader processes to the writer process through a SQLite file.
+
+    Readers append the events their requests produce; the writer drains them oldest first and
+    deletes them once applied.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def exists(self) -> bool:
+        return self._db is not None or os.path.exists(self.path)
+
+    def append(self, events: List[Tuple]):
+        with self._lock:
+            db = self._connection()
+            db.executemany("INSERT INTO events (event) VALUES (?)", [(json.dumps(event, default=str),) for event in events])
+            db.commit()
+
+    def claim(self, limit: int) -> Tuple[int, List[Tuple]]:
+        """The oldest `limit` events and the sequence number to `ack` once they are applied."""
+        with self._lock:
+            rows = self._connection().execute("SELECT seq, event FROM events ORDER BY seq LIMIT ?", (limit,)).fetchall()
+        return (rows[-1][0] if rows else 0), [tuple(json.loads(event)) for _, event in rows]
+
+    def ack(self, seq: int):
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM events WHERE seq <= ?", (seq,))
+            db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, event TEXT NOT NULL)")
+            self._db.commit()
+        return self._db
+
+
+class BackgroundIndexer:
+    """Feeds committed task/project writes into the vector store off the request path.
+
+    Upserts are snapshotted into (text, metadata) pairs when enqueued; a daemon thread drains
+    events in micro-batches so each batch costs a single embedding call. Deletes travel the same
+    queue; within a batch the last event for a document in a partition wins, so a delete never
+    removes a document that a later upsert put back.
+
+    Next to a reader-role store, batches go to the `spool` instead; next to the writer, the
+    thread also drains the spool when idle and publishes a new snapshot generation at most
+    every `publish_interval` seconds. With `neighbors`, the task neighbor graphs of the projects
+    a batch touched are refreshed right after it is applied.
+    """
+    def __init__(self, store, batch_size: int = 64, flush_interval: float = 0.5, spool: Optional[EventSpool] = None,
+                 publish_interval: Optional[float] = None, neighbors=None):
+        self.store = store
+        self.neighbors = neighbors
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.publish_interval = publish_interval
+        self._published = time.monotonic()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, text: str, metadata: Dict[str, Any]):
+        self._put((UPSERT, text, metadata))
+
+    def enqueue_delete(self, doc_id: str, project_id: Optional[int] = None):
+        self._put((DELETE, doc_id, project_id))
+
+    def enqueue_task(self, task: models.Task, previous_project_id: Optional[int] = None):
+        text, metadata = task_document(task)
+        if previous_project_id is not None and previous_project_id != task.project_id:
+            # The task moved, so its old vector sits in another project's partition.
+            self.enqueue_delete(metadata["doc_id"], previous_project_id)
+        self.enqueue(text, metadata)
+
+    def enqueue_task_delete(self, task_id: int, project_id: Optional[int]):
+        self.enqueue_delete(f"task:{task_id}", project_id)
+
+    def enqueue_project(self, project: models.Project):
+        self.enqueue(*project_document(project))
+
+    def enqueue_project_delete(self, project_id: int):
+        self.enqueue_delete(f"project:{project_id}")
+        self._put((DROP_PROJECT, project_id))
+
+    def enqueue_all(self, db: Session):
+        for project in db.query(models.Project).all():
+            self.enqueue_project(project)
+        for task in db.query(models.Task).all():
+            self.enqueue_task(task)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vector-indexer", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Block until every event enqueued so far has been indexed."""
+        self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _put(self, event: Tuple):
+        self.start()
+        self._queue.put(event)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._idle()
+                continue
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                self._index(batch)
+                self._publish()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _forwarding(self) -> bool:
+        return self.spool is not None and self.store.read_only
+
+    def _idle(self):
+        if self.spool is not None and not self._forwarding() and self.spool.exists():
+            try:
+                seq, events = self.spool.claim(self.batch_size)
+                while events:
+                    self._apply(events)
+                    self.spool.ack(seq)
+                    seq, events = self.spool.claim(self.batch_size)
+            except Exception as e:
+                print(f"Error draining index event spool: {e}")
+        self._publish()
+
+    def _publish(self):
+        if (self.publish_interval is None or self._forwarding()
+                or time.monotonic() - self._published < self.publish_interval):
+            return
+        self._published = time.monotonic()
+        try:
+            self.store.save_snapshot()
+        except Exception as e:
+            print(f"Error publishing vector store snapshot: {e}")
+
+    def _index(self, batch: List[Tuple]):
+        if self._forwarding():
+            # Only the writer process touches the index; hand the batch over to it.
+            try:
+                self.spool.append(batch)
+            except Exception as e:
+                print(f"Error spooling {len(batch)} index events for the writer: {e}")
+            return
+        self._apply(batch)
+
+    def _apply(self, batch: List[Tuple]):
+        # Later events for the same record within a batch supersede earlier ones.
+        latest = {}
+        dropped = []
+        for event in batch:
+            if event[0] == DROP_PROJECT:
+                dropped.append(event[1])
+            elif event[0] == DELETE:
+                latest[(event[1], event[2])] = event
+            else:
+                doc_id = event[2].get("doc_id")
+                # Upserts run before deletes, so an earlier delete from the same partition must go.
+                latest.pop((doc_id, partition_key(event[2])), None)
+                latest[doc_id or id(event[2])] = event
+        upserts = [event for event in latest.values() if event[0] == UPSERT]
+        deletes = {}
+        for _, doc_id, project_id in (event for event in latest.values() if event[0] == DELETE):
+            deletes.setdefault(project_id, []).append(doc_id)
+        if upserts:
+            texts = [text for _, text, _ in upserts]
+            try:
+                self.store.add_texts(texts, [metadata for _, _, metadata in upserts])
+            except Exception as e:
+                print(f"Error indexing batch of {len(texts)} documents: {e}")
+        for project_id, doc_ids in deletes.items():
+            try:
+                self.store.delete(doc_ids, project_id=project_id)
+            except Exception as e:
+                print(f"Error deleting {len(doc_ids)} documents from the vector store: {e}")
+        for project_id in dropped:
+            try:
+                self.store.drop_partition(project_id)
+            except Exception as e:
+                print(f"Error dropping vector store partition for project {project_id}: {e}")
+        if self.neighbors is not None:
+            self._update_neighbors(upserts, deletes, dropped)
+
+    def _update_neighbors(self, upserts: List[Tuple], deletes: Dict[Optional[int], List[str]], dropped: List[int]):
+        changed = {}
+        removed = {}
+        for _, _, metadata in upserts:
+            if metadata.get("kind") == "task":
+                changed.setdefault(metadata["project_id"], []).append(metadata["task_id"])
+        for project_id, doc_ids in deletes.items():
+            task_ids = [int(doc_id.split(":", 1)[1]) for doc_id in doc_ids if doc_id.startswith("task:")]
+            if project_id is not None and task_ids:
+                removed[project_id] = task_ids
+        for project_id in set(changed) | set(removed):
+            try:
+                self.neighbors.update(project_id, changed.get(project_id, []), removed.get(project_id, []))
+            except Exception as e:
+                print(f"Error updating task neighbors for project {project_id}: {e}")
+        for project_id in dropped:
+            self.neighbors.drop(project_id)
+
+
+indexer = Lazy(lambda: BackgroundIndexer(
+    vector_store.instance(),
+    batch_size=settings.INDEXER_BATCH_SIZE,
+    flush_interval=settings.INDEXER_FLUSH_INTERVAL,
+    spool=EventSpool(os.path.join(settings.VECTOR_STORE_PATH, SPOOL_FILE)),
+    publish_interval=settings.VECTOR_STORE_PUBLISH_INTERVAL,
+    neighbors=neighbor_graphs.instance(),
+))
@@ -0,0 +1,67 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import count
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over append-only texts keyed by integer document ids."""
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts: Iterable[str], ids: Optional[Iterable[int]] = None):
+        """Index texts under the given ids, or under consecutive ids continuing from the current size."""
+        if ids is None:
+            ids = count(len(self.doc_lengths))
+        for doc_id, text in zip(ids, texts):
+            counts = Counter(tokenize(text))
+            for term, frequency in counts.items():
+                self.postings[term][doc_id] = frequency
+            length = sum(counts.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+
+    def search(self, query: str, k: int, accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, score) pairs, best first; `accept` can veto documents by id."""
+        total_docs = len(self.doc_lengths)
+        if total_docs == 0:
+            return []
+        average_length = self.total_length / total_docs or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = frequency + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / norm
+        candidates = scores.items() if accept is None else ((doc_id, score) for doc_id, score in scores.items() if accept(doc_id))
+        return heapq.nlargest(k, candidates, key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Any]], key: Callable[[Any], Hashable] = id, k: int = 60) -> List[Tuple[Any, float]]:
+    """Merge ranked lists by summing 1 / (k + rank) per item; returns (item, score) pairs, best first."""
+    scores = {}
+    items = {}
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked, start=1):
+            item_key = key(item)
+            items.setdefault(item_key, item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+    return sorted(((items[item_key], score) for item_key, score in scores.items()), key=lambda pair: pair[1], reverse=True)
@@ -0,0 +1,191 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from backend.ai_engine.rag.vector_store import vector_store
+from backend.ai_engine.utils.concurrency import Lazy
+from backend.config import settings
+
+TASK_FILTER = {"kind": "task"}
+
+# Distances are kept as float16; clip instead of overflowing to inf.
+MAX_DISTANCE = float(np.finfo(np.float16).max)
+
+
+def task_doc_id(task_id: int) -> str:
+    return f"task:{task_id}"
+
+
+class NeighborGraph:
+    """The k most similar other tasks of every task in one project.
+
+    Rows hold int32 task ids and float16 L2 distances, nearest first, padded with -1 / inf;
+    about 6 bytes per edge. Rows of removed tasks are recycled.
+    """
+    def __init__(self, k: int):
+        self.k = k
+        self.revision = None
+        self.rows = {}
+        self.neighbors = np.full((0, k), -1, dtype=np.int32)
+        self.distances = np.full((0, k), np.inf, dtype=np.float16)
+        self._free = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, task_id: int) -> Optional[List[Tuple[int, float]]]:
+        row = self.rows.get(task_id)
+        if row is None:
+            return None
+        keep = self.neighbors[row] >= 0
+        return list(zip(self.neighbors[row][keep].tolist(), self.distances[row][keep].astype(float).tolist()))
+
+    def set(self, task_id: int, pairs: Iterable[Tuple[int, float]]):
+        row = self.rows.get(task_id)
+        if row is None:
+            row = self._free.pop() if self._free else self._grow()
+            self.rows[task_id] = row
+        pairs = sorted(pairs, key=lambda pair: pair[1])[:self.k]
+        self.neighbors[row] = -1
+        self.distances[row] = np.inf
+        if pairs:
+            ids, distances = zip(*pairs)
+            self.neighbors[row, :len(pairs)] = ids
+            self.distances[row, :len(pairs)] = np.minimum(distances, MAX_DISTANCE)
+
+    def offer(self, task_id: int, pairs: Iterable[Tuple[int, float]]):
+        """Add `task_id` to the rows of the tasks it found nearest, wherever it beats their farthest neighbor."""
+        for other, distance in pairs:
+            current = self.get(other)
+            if current is None:
+                continue
+            current = [pair for pair in current if pair[0] != task_id]
+            if len(current) < self.k or distance < current[-1][1]:
+                self.set(other, current + [(task_id, distance)])
+
+    def remove(self, task_ids: List[int]) -> List[int]:
+        """Drop the rows of `task_ids`; returns the remaining tasks that listed one of them as a neighbor."""
+        for task_id in task_ids:
+            row = self.rows.pop(task_id, None)
+            if row is not None:
+                self.neighbors[row] = -1
+                self._free.append(row)
+        if not self.rows:
+            return []
+        stale = np.isin(self.neighbors, np.asarray(task_ids, dtype=np.int32)).any(axis=1)
+        return [task_id for task_id, row in self.rows.items() if stale[row]]
+
+    def _grow(self) -> int:
+        size = len(self.neighbors)
+        grown = max(16, 2 * size)
+        self.neighbors = np.vstack([self.neighbors, np.full((grown - size, self.k), -1, dtype=np.int32)])
+        self.distances = np.vstack([self.distances, np.full((grown - size, self.k), np.inf, dtype=np.float16)])
+        self._free.extend(range(grown - 1, size, -1))
+        return size
+
+
+class NeighborGraphs:
+    """Neighbor graphs of the tasks in each project partition of the vector store.
+
+    A project's graph is built in the background the first time it is looked up, with one
+    batched search over the vectors already stored for its tasks, and the background indexer
+    keeps it current as tasks change. Neither step calls the embedding model, and a lookup in a
+    built graph is a dict hit. Until the graph is ready, or when the store changed behind its
+    back (say a reader swapped in a new generation), lookups search the store for the one task
+    and a rebuild is scheduled. Each project has its own lock, so a build never blocks others.
+    """
+    def __init__(self, store, k: int = 10):
+        self.store = store
+        self.k = k
+        self._graphs = {}
+        self._locks = {}
+        self._builds = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="neighbor-graph")
+
+    def neighbors(self, project_id: int, task_id: int) -> Optional[List[Tuple[int, float]]]:
+        """(task_id, distance) pairs of a stored task's nearest tasks, or None if it is not indexed."""
+        revision = self.store.store_revision(project_id)
+        if revision is None:
+            return None
+        graph = self._graphs.get(project_id)
+        if graph is not None and graph.revision == revision:
+            with self._project_lock(project_id):
+                return graph.get(task_id)
+        self.warm(project_id)
+        return self._search(project_id, [task_id]).get(task_id)
+
+    def warm(self, project_id: int) -> Future:
+        """Schedule a build of the project's graph unless one is already running; returns its future."""
+        with self._lock:
+            build = self._builds.get(project_id)
+            if build is None or build.done():
+                build = self._builds[project_id] = self._executor.submit(self._build, project_id)
+            return build
+
+    def update(self, project_id: int, changed: List[int], removed: List[int]):
+        """Refresh a built graph after tasks of the project were upserted (`changed`) or deleted (`removed`)."""
+        with self._project_lock(project_id):
+            graph = self._graphs.get(project_id)
+            if graph is None:
+                return
+            stale = graph.remove(list(changed) + list(removed))
+            found = self._search(project_id, list(dict.fromkeys(list(changed) + stale)))
+            for task_id, pairs in found.items():
+                graph.set(task_id, pairs)
+            for task_id in changed:
+                graph.offer(task_id, found.get(task_id, []))
+            graph.revision = self.store.store_revision(project_id)
+
+    def drop(self, project_id: int):
+        with self._project_lock(project_id):
+            with self._lock:
+                self._graphs.pop(project_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "projects": len(self._graphs),
+                "tasks": sum(len(graph) for graph in self._graphs.values()),
+                "bytes": sum(graph.neighbors.nbytes + graph.distances.nbytes for graph in self._graphs.values()),
+            }
+
+    def close(self):
+        """Cancel pending graph builds and stop the build threads."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _build(self, project_id: int):
+        try:
+            with self._project_lock(project_id):
+                # Taken before the search, so a write that lands meanwhile makes the graph stale, not wrong.
+                revision = self.store.store_revision(project_id)
+                graph = self._graphs.get(project_id)
+                if revision is None or (graph is not None and graph.revision == revision):
+                    return
+                graph = NeighborGraph(self.k)
+                for task_id, pairs in self._search(project_id, None).items():
+                    graph.set(task_id, pairs)
+                graph.revision = revision
+                with self._lock:
+                    self._graphs[project_id] = graph
+        except Exception as e:
+            print(f"Error building task neighbors for project {project_id}: {e}")
+
+    def _project_lock(self, project_id: int) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(project_id)
+            if lock is None:
+                lock = self._locks[project_id] = threading.Lock()
+            return lock
+
+    def _search(self, project_id: int, task_ids: Optional[List[int]]) -> Dict[int, List[Tuple[int, float]]]:
+        doc_ids = None if task_ids is None else [task_doc_id(task_id) for task_id in task_ids]
+        hits = self.store.neighbors_of(doc_ids, k=self.k, filter=TASK_FILTER, project_id=project_id)
+        return {
+            int(doc_id.split(":", 1)[1]): [(doc.metadata["task_id"], distance) for doc, distance in row]
+            for doc_id, row in hits.items()
+            if doc_id.startswith("task:")
+        }
+
+
+neighbor_graphs = Lazy(lambda: NeighborGraphs(vector_store.instance(), k=settings.NEIGHBOR_GRAPH_K))
@@ -1,99 +1,298 @@
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
-from backend.ai_engine.rag.vector_store import vector_store
-from backend.database import crud
-from backend.database import models
-import json
-
-
-class Retriever:
-    def __init__(self, db: Session):
-        self.db = db
-
-    def get_similar_tasks(self, description: str, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
-        query = f"Project ID: {project_id} | Task: {description}"
-        similar_docs = vector_store.similarity_search(query, k=k)
-        return [{"title": doc.metadata["title"], "description": doc.page_content} for doc in similar_docs]
-
-    def get_project_context(self, project_id: int) -> Dict[str, Any]:
-        project = crud.get_project(self.db, project_id)
-        if not project:
-            print(f"No project found for id: {project_id}")
-            return {}
-        context = {
-            "name": project.name,
-            "description": project.description,
-            "start_date": str(project.start_date),
-            "end_date": str(project.end_date),
-            "status": project.status,
-            "team_members": [member.name for member in project.team_members]
-        }
-        print(f"Project context: {context}")
-        return context
-
-    
-    def get_project_team_members(self, project_id: int):
-        return self.db.query(models.TeamMember).join(models.Project.team_members).filter(models.Project.id == project_id).all()
-
-    def get_similar_tasks_priorities(self, description: str, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
-        query = f"Project ID: {project_id} | Task: {description}"
-        similar_docs = vector_store.similarity_search(query, k=k)
-        return [{"title": doc.metadata["title"], "priority": doc.metadata.get("priority", "Unknown")} for doc in similar_docs]
-
-    def get_available_team_members(self, project_id: int) -> List[Dict[str, Any]]:
-        team_members = crud.get_project_team_members(self.db, project_id)
-        return [{"name": tm.name, "skills": tm.skills, "role": tm.role} for tm in team_members]
-
-    def get_similar_collaborations(self, task_description: str, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
-        query = f"Project ID: {project_id} | Collaboration for: {task_description}"
-        similar_docs = vector_store.similarity_search(query, k=k)
-        return [{"task": doc.metadata["task"], "collaboration": doc.page_content} for doc in similar_docs]
-
-    def get_project_tasks(self, project_id: int) -> List[Dict[str, Any]]:
-        tasks = crud.get_project_tasks(self.db, project_id)
-        return [{"title": task.title, "status": task.status, "priority": task.priority} for task in tasks]
-
-    def get_team_performance(self, project_id: int) -> Dict[str, Any]:
-        tasks = crud.get_project_tasks(self.db, project_id)
-        completed_tasks = sum(1 for task in tasks if task.status == "Completed")
-        total_tasks = len(tasks)
-        return {
-            "task_completion_rate": completed_tasks / total_tasks if total_tasks > 0 else 0,
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks
-        }
-
-    def get_similar_projects(self, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
-        project = crud.get_project(self.db, project_id)
-        if not project:
-            return []
-        
-        query = f"Project: {project.name} | Description: {project.description}"
-        similar_docs = vector_store.similarity_search(query, k=k)
-        
-        return [
-            {
-                "name": doc.metadata.get("name", "Unnamed Project"),
-                "description": doc.page_content
-            } 
-            for doc in similar_docs
-        ]
-
-    def get_similar_completed_tasks(self, task_description: str, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
-        query = f"Project ID: {project_id} | Completed Task: {task_description}"
-        similar_docs = vector_store.similarity_search(query, k=k)
-        return [{"title": doc.metadata["title"], "description": doc.page_content} for doc in similar_docs]
-
-    def get_team_skills(self, project_id: int) -> Dict[str, List[str]]:
-        team_members = self.get_project_team_members(project_id)
-        return {tm.name: json.loads(tm.skills) if tm.skills else [] for tm in team_members}
-
-    def get_available_team_members(self, project_id: int) -> List[Dict[str, Any]]:
-        team_members = crud.get_project_team_members(self.db, project_id)
-        return [{"name": tm.name, "skills": tm.skills.split(',')} for tm in team_members]
-
-    def get_related_information(self, question: str, k: int = 3) -> List[Dict[str, Any]]:
-        similar_docs = vector_store.similarity_search(question, k=k)
-        related_info = [{"title": doc.metadata.get("title", "Unknown"), "content": doc.page_content} for doc in similar_docs]
-        print(f"Related information: {related_info}")
-        return related_info
+from typing import List, Dict, Any, Optional
+from sqlalchemy.orm import Session
+import asyncio
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from backend.ai_engine.rag.neighbors import neighbor_graphs, task_doc_id
+from backend.ai_engine.rag.skills import SkillMatcher, parse_skills
+from backend.ai_engine.rag.vector_store import matches_filter, vector_store
+from backend.ai_engine.utils.cache import LRUCache
+from backend.database import crud
+from backend.database import metrics, models
+from backend.database.versioning import bump_project_version, project_version
+from backend.config import settings
+import json
+import numpy as np
+
+TASK_FILTER = {"kind": "task"}
+COMPLETED_TASK_FILTER = {"kind": "task", "status": "Completed"}
+PROJECT_FILTER = {"kind": "project"}
+
+# Columns the lookups copy out of ORM rows, which must not outlive the request's Session.
+PROJECT_FIELDS = ("id", "name", "description", "start_date", "end_date", "status")
+TEAM_MEMBER_FIELDS = ("id", "name", "role", "skills")
+
+# Memo hits (lookups saved) and misses of every Retriever in this process, for the stats endpoint.
+memo_stats = {"hits": 0, "misses": 0}
+
+# Project context and team skills outlive a request: they are shared across requests under the
+# project's version, which the CRUD writes bump in every worker, so a write is never served stale
+# data. Entries are plain data, never ORM objects, which would outlive their Session.
+project_cache = LRUCache(settings.PROJECT_CACHE_SIZE, settings.PROJECT_CACHE_TTL)
+
+
+def memoized(method):
+    """Cache a Retriever method's result for the retriever's lifetime, keyed by method and arguments."""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, value) for name, value in bound.arguments.items() if name != "self")
+        key = (method.__name__, bound.arguments.get("project_id"), arguments)
+        if key in self._memo:
+            self.memo_hits += 1
+            memo_stats["hits"] += 1
+            return self._memo[key]
+        self.memo_misses += 1
+        memo_stats["misses"] += 1
+        value = self._memo[key] = method(self, *args, **kwargs)
+        return value
+    return wrapper
+
+
+class Retriever:
+    """Context lookups for the agents, over the database and the vector store.
+
+    A retriever lives for one request or workflow run, and every lookup is memoized for that
+    long: the agents of a run ask for the same project, roster and similar tasks repeatedly,
+    and each is loaded once. Call `invalidate` after writing to a project mid-run, or `reset`
+    when reusing the retriever for a new run.
+
+    Async callers run lookups concurrently with `arun`; the database session is used by one
+    lookup at a time, while vector searches overlap.
+    """
+    def __init__(self, db: Session, hybrid: Optional[bool] = None):
+        self.db = db
+        self._db_lock = threading.Lock()
+        self.hybrid = settings.RAG_HYBRID_SEARCH if hybrid is None else hybrid
+        self._memo = {}
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def reset(self):
+        self._memo.clear()
+
+    def invalidate(self, project_id: int):
+        """Forget every memoized lookup about a project, here and in the process-wide cache."""
+        for key in [key for key in self._memo if key[1] == project_id]:
+            del self._memo[key]
+        bump_project_version(project_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.memo_hits, "misses": self.memo_misses, "entries": len(self._memo)}
+
+    async def arun(self, lookup, *args, **kwargs):
+        """Run a lookup on a worker thread, e.g. `await asyncio.gather(retriever.arun(retriever.get_team_skills, 1), ...)`."""
+        return await asyncio.to_thread(lookup, *args, **kwargs)
+
+    @contextmanager
+    def _session(self):
+        # A Session must not be used by two threads at once.
+        with self._db_lock:
+            yield self.db
+
+    def _query(self, query, *args):
+        with self._session() as db:
+            return query(db, *args)
+
+    @memoized
+    def get_similar_tasks(self, description: str, project_id: int, k: int = 3, task_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        similar_docs = self._similar_task_docs(f"Task: {description}", description, project_id, k, TASK_FILTER, task_id)
+        return [{"title": doc.metadata["title"], "description": doc.page_content} for doc in similar_docs]
+
+    @memoized
+    def get_project_context(self, project_id: int) -> Dict[str, Any]:
+        return self._shared("project_context", project_id, self._load_project_context)
+
+    def _load_project_context(self, project_id: int) -> Dict[str, Any]:
+        project = self.get_project(project_id)
+        if not project:
+            print(f"No project found for id: {project_id}")
+            return {}
+        context = {
+            "name": project["name"],
+            "description": project["description"],
+            "start_date": str(project["start_date"]),
+            "end_date": str(project["end_date"]),
+            "status": project["status"],
+            "team_members": [member["name"] for member in self.get_project_team_members(project_id)]
+        }
+        print(f"Project context: {context}")
+        return context
+
+    @memoized
+    def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
+        with self._session() as db:
+            project = crud.get_project(db, project_id)
+            if not project:
+                return None
+            return {field: getattr(project, field) for field in PROJECT_FIELDS}
+
+    @memoized
+    def get_project_team_members(self, project_id: int) -> List[Dict[str, Any]]:
+        with self._session() as db:
+            members = db.query(models.TeamMember).join(models.Project.team_members).filter(models.Project.id == project_id).all()
+            return [{field: getattr(member, field) for field in TEAM_MEMBER_FIELDS} for member in members]
+
+    @memoized
+    def get_similar_tasks_priorities(self, description: str, project_id: int, k: int = 3, task_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        similar_docs = self._similar_task_docs(f"Task: {description}", description, project_id, k, TASK_FILTER, task_id)
+        return [{"title": doc.metadata["title"], "priority": doc.metadata.get("priority", "Unknown")} for doc in similar_docs]
+
+    @memoized
+    def get_similar_collaborations(self, task_description: str, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
+        similar_docs = self._similar_task_docs(f"Collaboration for: {task_description}", task_description, project_id, k, TASK_FILTER)
+        return [{"task": doc.metadata["title"], "collaboration": doc.page_content} for doc in similar_docs]
+
+    @memoized
+    def get_project_tasks(self, project_id: int) -> List[Dict[str, Any]]:
+        with self._session() as db:
+            tasks = db.query(models.Task).filter(models.Task.project_id == project_id).all()
+        return [{"title": task.title, "status": task.status, "priority": task.priority} for task in tasks]
+
+    @memoized
+    def get_team_performance(self, project_id: int) -> Dict[str, Any]:
+        return self._shared("team_performance", project_id, lambda project_id: self._query(metrics.team_performance, project_id))
+
+    @memoized
+    def get_project_metrics(self, project_id: int) -> Dict[str, Any]:
+        return self._shared("project_metrics", project_id, lambda project_id: self._query(metrics.project_metrics, project_id))
+
+    @memoized
+    def get_similar_projects(self, project_id: int, k: int = 3) -> List[Dict[str, Any]]:
+        project = self.get_project(project_id)
+        if not project:
+            return []
+        
+        query = f"Project: {project['name']} | Description: {project['description']}"
+        similar_docs = vector_store.similarity_search(query, k=k + 1, filter=PROJECT_FILTER)
+        
+        return [
+            {
+                "name": doc.metadata.get("name", "Unnamed Project"),
+                "description": doc.page_content
+            } 
+            for doc in similar_docs
+            if doc.metadata.get("project_id") != project_id
+        ][:k]
+
+    @memoized
+    def get_similar_completed_tasks(self, task_description: str, project_id: int, k: int = 3, task_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        similar_docs = self._similar_task_docs(
+            f"Completed Task: {task_description}", task_description, project_id, k, COMPLETED_TASK_FILTER, task_id
+        )
+        return [{"title": doc.metadata["title"], "description": doc.page_content} for doc in similar_docs]
+
+    @memoized
+    def get_retrieval_bundle(self, description: str, project_id: int, k: int = 3,
+                             task_id: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch all vector-store context for a task in one batched search.
+
+        For a task that is already stored, pass its `task_id` to read the precomputed neighbor graph instead.
+        """
+        similar_tasks = completed_tasks = None
+        if task_id is not None:
+            similar_tasks = self._neighbor_docs(task_id, project_id, k, TASK_FILTER)
+            completed_tasks = self._neighbor_docs(task_id, project_id, k, COMPLETED_TASK_FILTER)
+        if similar_tasks is not None and completed_tasks is not None:
+            collaborations = similar_tasks
+        elif self.hybrid:
+            candidates = self._hybrid_candidates(description, project_id)
+            similar_tasks = collaborations = candidates.top(k)
+            completed_tasks = candidates.top(k, COMPLETED_TASK_FILTER)
+        else:
+            similar_tasks, completed_tasks, collaborations = vector_store.similarity_search_batch(
+                [f"Task: {description}", f"Completed Task: {description}", f"Collaboration for: {description}"],
+                k=k,
+                filter=[TASK_FILTER, COMPLETED_TASK_FILTER, TASK_FILTER],
+                project_id=project_id,
+            )
+        return {
+            "similar_tasks": [{"title": doc.metadata["title"], "description": doc.page_content} for doc in similar_tasks],
+            "similar_tasks_priorities": [{"title": doc.metadata["title"], "priority": doc.metadata.get("priority", "Unknown")} for doc in similar_tasks],
+            "similar_completed_tasks": [{"title": doc.metadata["title"], "description": doc.page_content} for doc in completed_tasks],
+            "similar_collaborations": [{"task": doc.metadata["title"], "collaboration": doc.page_content} for doc in collaborations],
+        }
+
+    @memoized
+    def get_team_skills(self, project_id: int) -> Dict[str, List[str]]:
+        return self._shared("team_skills", project_id, self._load_team_skills)
+
+    def _load_team_skills(self, project_id: int) -> Dict[str, List[str]]:
+        team_members = self.get_project_team_members(project_id)
+        return {tm["name"]: json.loads(tm["skills"]) if tm["skills"] else [] for tm in team_members}
+
+    @memoized
+    def get_available_team_members(self, project_id: int) -> List[Dict[str, Any]]:
+        team_members = self.get_project_team_members(project_id)
+        return [{"name": tm["name"], "skills": parse_skills(tm["skills"]), "role": tm["role"]} for tm in team_members]
+
+    @memoized
+    def get_skill_matcher(self, project_id: int) -> SkillMatcher:
+        return self._shared("skill_matcher", project_id, self._load_skill_matcher)
+
+    def _load_skill_matcher(self, project_id: int) -> SkillMatcher:
+        return SkillMatcher([(tm["id"], tm["name"], tm["skills"]) for tm in self.get_project_team_members(project_id)])
+
+    @memoized
+    def get_team_fit(self, project_id: int, k: int = 3) -> Dict[int, List[Dict[str, Any]]]:
+        """Best-fitting team members for every task of a project, by required skills, keyed by task id."""
+        return self._shared(("team_fit", k), project_id, lambda project_id: self.get_skill_matcher(project_id).rank(self._task_skills(project_id), k))
+
+    def _task_skills(self, project_id: int):
+        with self._session() as db:
+            return db.query(models.Task.id, models.Task.required_skills).filter(models.Task.project_id == project_id).all()
+
+    def rank_team_members(self, project_id: int, required_skills: List[str]) -> List[Dict[str, Any]]:
+        """Every team member of a project with their fit for one set of required skills, best first."""
+        matcher = self.get_skill_matcher(project_id)
+        if not len(matcher):
+            return []
+        fit = matcher.scores([required_skills])[0]
+        return [
+            {"name": matcher.names[column], "skills": matcher.skills[column], "fit": round(float(fit[column]), 3)}
+            for column in np.argsort(-fit, kind="stable")
+        ]
+
+    @memoized
+    def get_related_information(self, question: str, k: int = 3, project_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        similar_docs = vector_store.similarity_search(question, k=k, project_id=project_id)
+        related_info = [{"title": doc.metadata.get("title", "Unknown"), "content": doc.page_content} for doc in similar_docs]
+        print(f"Related information: {related_info}")
+        return related_info
+
+    def _similar_task_docs(self, query: str, description: str, project_id: int, k: int, filter: Dict[str, Any],
+                           task_id: Optional[int] = None):
+        if task_id is not None:
+            docs = self._neighbor_docs(task_id, project_id, k, filter)
+            if docs is not None:
+                return docs
+        if self.hybrid:
+            return self._hybrid_candidates(description, project_id).top(k, filter)
+        return vector_store.similarity_search(query, k=k, filter=filter, project_id=project_id)
+
+    def _shared(self, name: str, project_id: int, load):
+        # Read from the process-wide cache; callers must not mutate what it returns.
+        return project_cache.get_or_load((name, project_id, project_version(project_id)), lambda: load(project_id))
+
+    def _neighbor_docs(self, task_id: int, project_id: int, k: int, filter: Dict[str, Any]):
+        # None sends the caller to a fresh search: the task is not indexed yet, or the filter
+        # left fewer than k of a full neighbor row and tasks further out might still match.
+        neighbors = neighbor_graphs.neighbors(project_id, task_id)
+        if neighbors is None:
+            return None
+        docs = vector_store.get_documents([task_doc_id(neighbor) for neighbor, _ in neighbors], project_id)
+        hits = [doc for doc in (docs.get(task_doc_id(neighbor)) for neighbor, _ in neighbors)
+                if doc is not None and matches_filter(doc.metadata, filter)][:k]
+        if len(hits) < k and len(neighbors) == neighbor_graphs.k:
+            return None
+        return hits
+
+    @memoized
+    def _hybrid_candidates(self, description: str, project_id: int):
+        # One fused candidate list per task description serves every get_similar_* call in this request.
+        return vector_store.hybrid_search(description, k=settings.RAG_HYBRID_FETCH_K, filter=TASK_FILTER, project_id=project_id)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+
+
+def parse_skills(value) -> List[str]:
+    """Skills from a list, a JSON array string or a comma-separated string, as the tables store them."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(',')
+        if isinstance(value, str):
+            value = [value]
+    return [str(skill).strip() for skill in value if str(skill).strip()]
+
+
+class SkillVocabulary:
+    """Interned skill names: each distinct skill, compared case-insensitively, gets a stable column."""
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, skill: str) -> int:
+        key = skill.strip().lower()
+        column = self.ids.get(key)
+        if column is None:
+            with self._lock:
+                column = self.ids.get(key)
+                if column is None:
+                    column = self.ids[key] = len(self.names)
+                    self.names.append(skill.strip())
+        return column
+
+    def lookup(self, skill: str) -> Optional[int]:
+        return self.ids.get(skill.strip().lower())
+
+    def matrix(self, skill_lists: Sequence[Iterable[str]], intern: bool = True) -> sparse.csr_matrix:
+        """Binary rows × vocabulary matrix; with intern=False skills nobody has are left out."""
+        indptr, indices = [0], []
+        for skills in skill_lists:
+            columns = {self.intern(skill) if intern else self.lookup(skill) for skill in skills}
+            columns.discard(None)
+            indices.extend(sorted(columns))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+                                 shape=(len(indptr) - 1, len(self.names)))
+
+
+# Shared by every matcher in the process, so a skill gets the same column in all of them.
+vocabulary = SkillVocabulary()
+
+
+class SkillMatcher:
+    """Team members of one project as a sparse member × skill matrix, scored against tasks in bulk.
+
+    A task's fit with a member is the share of its required skills the member has. All tasks of a
+    batch are scored against all members with one sparse product, so ranking a whole project
+    costs a single multiply rather than a pass over every (task, member) pair.
+    """
+    def __init__(self, members: Sequence[Tuple[int, str, Iterable[str]]], vocab: SkillVocabulary = vocabulary):
+        self.vocab = vocab
+        self.member_ids = [member_id for member_id, _, _ in members]
+        self.names = [name for _, name, _ in members]
+        self.skills = [parse_skills(skills) for _, _, skills in members]
+        self.matrix = vocab.matrix(self.skills)
+
+    def __len__(self) -> int:
+        return len(self.member_ids)
+
+    def name_of(self, member_id: Optional[int]) -> Optional[str]:
+        try:
+            return self.names[self.member_ids.index(member_id)]
+        except ValueError:
+            return None
+
+    def scores(self, required_skills: Sequence[Iterable[str]]) -> np.ndarray:
+        """Dense tasks × members fit matrix in [0, 1]; tasks without known skills score 0 everywhere."""
+        tasks = self.vocab.matrix([parse_skills(skills) for skills in required_skills], intern=False)
+        required = np.asarray([len(parse_skills(skills)) for skills in required_skills], dtype=np.float32)
+        # The vocabulary may have grown since this matcher was built; missing columns are all zero.
+        members = self.matrix
+        if members.shape[1] < tasks.shape[1]:
+            members = sparse.csr_matrix((members.data, members.indices, members.indptr), shape=(members.shape[0], tasks.shape[1]))
+        else:
+            tasks = sparse.csr_matrix((tasks.data, tasks.indices, tasks.indptr), shape=(tasks.shape[0], members.shape[1]))
+        overlap = (tasks @ members.T).toarray()
+        return overlap / np.maximum(required, 1)[:, None]
+
+    def rank(self, tasks: Sequence[Tuple[int, Iterable[str]]], k: int = 3) -> Dict[int, List[Dict[str, float]]]:
+        """Up to k best-fitting members per task id, best first; members with no matching skill are left out."""
+        if not tasks or not self.member_ids:
+            return {task_id: [] for task_id, _ in tasks}
+        scores = self.scores([skills for _, skills in tasks])
+        k = min(k, len(self.member_ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        ranked = {}
+        for row, (task_id, _) in enumerate(tasks):
+            order = top[row][np.argsort(-scores[row, top[row]], kind="stable")]
+            ranked[task_id] = [
+                {"member_id": self.member_ids[column], "name": self.names[column], "fit": round(float(scores[row, column]), 3)}
+                for column in order if scores[row, column] > 0
+            ]
+        return ranked
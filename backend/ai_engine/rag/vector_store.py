@@ -1,70 +1,1042 @@
-import faiss
-from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings
-from langchain.schema import Document
-from typing import List, Dict, Any
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class VectorStore:
-    def __init__(self):
-        self.embeddings = OllamaEmbeddings(model="all-minilm")
-        self.vector_store = None
-
-    def create_vector_store(self, texts: List[str], metadatas: List[Dict[str, Any]]):
-        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
-        try:
-            print(f"Creating FAISS index with {len(documents)} documents")
-            print(f"Embedding dimension: {len(self.embeddings.embed_query('test'))}")
-            self.vector_store = FAISS.from_documents(documents, self.embeddings)
-            print("FAISS index created successfully")
-        except Exception as e:
-            print(f"Error creating vector store: {e}")
-            print("Falling back to in-memory storage without embeddings.")
-            self.vector_store = InMemoryStore(documents)
-            
-    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]):
-        if self.vector_store is None:
-            self.create_vector_store(texts, metadatas)
-        else:
-            try:
-                self.vector_store.add_texts(texts, metadatas=metadatas)
-            except Exception as e:
-                print(f"Error adding texts to vector store: {e}")
-
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
-        if self.vector_store is None:
-            self.initialize_with_dummy_data()
-        try:
-            return self.vector_store.similarity_search(query, k=k)
-        except Exception as e:
-            print(f"Error performing similarity search: {e}")
-            return []
-
-    def initialize_with_dummy_data(self):
-        dummy_texts = [
-            "This is a dummy task for initializing the vector store.",
-            "Another dummy task to ensure the vector store is not empty.",
-            "A third dummy task for good measure."
-        ]
-        dummy_metadatas = [
-            {"title": "Dummy Task 1", "project_id": 0},
-            {"title": "Dummy Task 2", "project_id": 0},
-            {"title": "Dummy Task 3", "project_id": 0}
-        ]
-        self.create_vector_store(dummy_texts, dummy_metadatas)
-        print("Vector store initialized with dummy data.")
-
-class InMemoryStore:
-    def __init__(self, documents: List[Document]):
-        self.documents = documents
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
-        return self.documents[:k]
-
-    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]):
-        new_docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
-        self.documents.extend(new_docs)
-
-vector_store = VectorStore()
\ No newline at end of file
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+from typing import List, Dict, Any, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from backend.ai_engine.rag import ann
+from backend.ai_engine.rag.docstore import DocumentDatabase, MemoryDocuments, SQLiteDocuments
+from backend.ai_engine.rag.embeddings import CachedEmbeddings, create_embeddings
+from backend.ai_engine.rag.lexical import BM25Index, reciprocal_rank_fusion
+from backend.ai_engine.rag.wal import ADD, DELETE, DROP, WriteAheadLog
+from backend.ai_engine.utils.concurrency import Lazy, ProcessLock, ReadWriteLock
+from backend.config import settings
+import asyncio
+import os
+import pickle
+import shutil
+import threading
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+DOCUMENTS_FILE = "documents.sqlite3"
+WAL_FILE = "wal.log"
+WRITER_LOCK_FILE = "writer.lock"
+PARTITIONS_DIR = "partitions"
+
+# The writer indexes and publishes snapshot generations; readers only map and search them.
+WRITER = "writer"
+READER = "reader"
+
+# Candidates fetched per query before metadata filtering, matching FAISS.similarity_search.
+FILTER_FETCH_K = 20
+
+# Rough per-document cost of the docstore entry, used for the partition memory budget.
+DOC_OVERHEAD_BYTES = 1024
+
+# faiss >= 1.8 can map flat codes straight from the page cache; older builds only mmap inverted lists.
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def list_snapshots(directory: str) -> List[int]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        int(name[1:]) for name in os.listdir(directory)
+        if name.startswith("v") and name[1:].isdigit()
+    )
+
+
+def current_version(directory: str) -> Optional[int]:
+    """Version of the generation `directory`/CURRENT points at, or None if nothing was published."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return int(f.read().strip()[1:])
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(store: "MutableFAISS", directory: str) -> int:
+    """Write a FAISS store to a new versioned directory under `directory` and point CURRENT at it."""
+    os.makedirs(directory, exist_ok=True)
+    version = max(list_snapshots(directory) + [0]) + 1
+    name = f"v{version:06d}"
+    final_path = os.path.join(directory, name)
+    tmp_path = f"{final_path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path)
+    try:
+        faiss.write_index(store.index, os.path.join(tmp_path, INDEX_FILE))
+        with open(os.path.join(tmp_path, DOCSTORE_FILE), "wb") as f:
+            pickle.dump({
+                "docstore": store.docstore._dict,
+                "index_to_docstore_id": store.index_to_docstore_id,
+                "tombstones": store.tombstones,
+                "wal_seq": store.wal_seq,
+                "vectors": getattr(store.documents, "exact_vectors", None) or None,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, final_path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    current_tmp = os.path.join(directory, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(current_tmp, "w") as f:
+        f.write(name)
+    os.replace(current_tmp, os.path.join(directory, CURRENT_FILE))
+    # Readers that still map an older generation keep its pages after the files are unlinked.
+    for old_version in list_snapshots(directory)[:-settings.VECTOR_STORE_KEEP_SNAPSHOTS]:
+        shutil.rmtree(os.path.join(directory, f"v{old_version:06d}"), ignore_errors=True)
+    return version
+
+
+def read_snapshot(directory: str, embeddings, documents: Optional[SQLiteDocuments] = None,
+                  read_only: bool = False) -> Optional[Tuple["MutableFAISS", int]]:
+    """Memory-map the snapshot named in `directory`/CURRENT, if there is one.
+
+    With `documents` (compact mode) the snapshot holds only the index; documents come from the table.
+    A `read_only` load never writes to the table or copies the mapped index out of the page cache.
+    """
+    current_path = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path) as f:
+        name = f.read().strip()
+    path = os.path.join(directory, name)
+    try:
+        try:
+            index = faiss.read_index(os.path.join(path, INDEX_FILE), MMAP_FLAGS)
+        except RuntimeError:
+            # Not every index type can be mapped; fall back to reading it into RAM.
+            index = faiss.read_index(os.path.join(path, INDEX_FILE))
+        with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"Error loading vector store snapshot {path}: {e}")
+        return None
+    if not isinstance(index, faiss.IndexIDMap2):
+        # Snapshots from before stable ids hold a bare flat index; its positions become the ids.
+        index = ann.build_index(
+            index.d, index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64), ann.FLAT, encoding=None
+        )
+    ann.configure(index)
+    if read_only and documents is not None and len(documents) == 0:
+        # Nothing migrated into the table yet; serve the documents the snapshot carries.
+        documents = None
+    if documents is None:
+        docstore = InMemoryDocstore(payload["docstore"])
+        store = MutableFAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=payload["index_to_docstore_id"],
+            tombstones=payload.get("tombstones"),
+            documents=MemoryDocuments(docstore, payload["index_to_docstore_id"], keep_vectors=keeps_exact_vectors(),
+                                      exact_vectors=payload.get("vectors")),
+        )
+        store.wal_seq = payload.get("wal_seq", 0)
+        return store, int(name[1:])
+    if len(documents) == 0 and payload["index_to_docstore_id"]:
+        # Written before compact mode was switched on: move its documents into the table.
+        memory = MemoryDocuments(InMemoryDocstore(payload["docstore"]), payload["index_to_docstore_id"])
+        vectors, ids = ann.live_vectors(index, memory.ids())
+        docs = memory.get(ids.tolist())
+        documents.put(ids.tolist(), [memory.index_to_docstore_id[i] for i in ids.tolist()], [docs[i] for i in ids.tolist()], vectors)
+    # The table is written through on every change, so it can be ahead of the snapshot: ids it no
+    # longer has are tombstones, and rows the index lacks are re-added from their stored vectors.
+    index_ids = faiss.vector_to_array(index.id_map)
+    live_ids = documents.ids()
+    store = MutableFAISS(
+        embeddings, index, InMemoryDocstore(), {},
+        tombstones=np.setdiff1d(index_ids, live_ids).tolist(),
+        documents=documents,
+    )
+    store.wal_seq = payload.get("wal_seq", 0)
+    missing = np.setdiff1d(live_ids, index_ids)
+    if len(missing) and not read_only:
+        store.index = faiss.deserialize_index(faiss.serialize_index(index))
+        ann.configure(store.index)
+        vectors, ids = documents.vectors()
+        keep = np.isin(ids, missing)
+        store.index.add_with_ids(vectors[keep], ids[keep])
+        print(f"Vector store snapshot {path} caught up with {len(missing)} documents written after it")
+    return store, int(name[1:])
+
+
+def partition_key(metadata: Dict[str, Any]) -> Optional[int]:
+    # Tasks live in their project's partition; projects and anything unscoped live in the global store.
+    if metadata.get("kind") == "task":
+        return metadata.get("project_id")
+    return None
+
+
+def document_key(doc: Document):
+    return doc.metadata.get("doc_id") or id(doc)
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    return not filter or all(metadata.get(key) == value for key, value in filter.items())
+
+
+def keeps_exact_vectors() -> bool:
+    # A quantized index decodes to approximate vectors; in-memory documents then keep the exact ones.
+    return bool(settings.VECTOR_STORE_QUANTIZATION)
+
+
+def estimate_bytes(store) -> int:
+    if isinstance(store, MutableFAISS):
+        document_bytes = DOC_OVERHEAD_BYTES if isinstance(store.documents, MemoryDocuments) else 0
+        if getattr(store.documents, "exact_vectors", None):
+            document_bytes += store.index.d * 4
+        return store.index.ntotal * ann.bytes_per_vector(store.index) + len(store.documents) * document_bytes
+    return len(store.documents) * DOC_OVERHEAD_BYTES
+
+
+class HybridResults:
+    """Vector and lexical rankings for one query plus their reciprocal-rank fusion."""
+    def __init__(self, vector: List[Document], lexical: List[Document]):
+        self.vector = vector
+        self.lexical = lexical
+        self.fused = reciprocal_rank_fusion([vector, lexical], key=document_key)
+
+    def top(self, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        return [doc for doc, _ in self.fused if matches_filter(doc.metadata, filter)][:k]
+
+
+class MutableFAISS(FAISS):
+    """FAISS store with stable ids, so documents can be replaced and deleted in place.
+
+    Vectors live in an IndexIDMap2 under int64 ids that are never reused, and documents are keyed
+    by their `doc_id` ("task:12"). Replacing or deleting a document only tombstones its old id:
+    searches mask tombstones out with an ID selector, and `compact` rebuilds the index without
+    them. The wrapped index is flat, IVF or HNSW depending on corpus size (see `ann`).
+
+    Documents sit in the langchain docstore by default, or in a `SQLiteDocuments` table in
+    compact mode, where only the hits of a search are ever loaded.
+    """
+    def __init__(self, embedding_function, index, docstore, index_to_docstore_id, tombstones=None, documents=None, **kwargs):
+        super().__init__(embedding_function, index, docstore, index_to_docstore_id, **kwargs)
+        if documents is None:
+            documents = MemoryDocuments(docstore, index_to_docstore_id, keep_vectors=keeps_exact_vectors())
+        self.documents = documents
+        self.tombstones = set(tombstones or ())
+        index_ids = faiss.vector_to_array(index.id_map) if index.ntotal else np.empty(0, dtype=np.int64)
+        self.next_id = max(int(index_ids.max(initial=-1)), self.documents.max_id()) + 1
+        # Bumped by every upsert and delete, so a rebuild can tell whether it raced a write.
+        self.revision = 0
+        # Last write-ahead log record applied; snapshots carry it so replay can skip older ones.
+        self.wal_seq = 0
+        self._search_params = None
+        self._selectors = None
+        self._lexical_index = None
+        self._lexical_lock = threading.Lock()
+
+    @classmethod
+    def empty(cls, embeddings, dimension: int, documents=None) -> "MutableFAISS":
+        empty = np.empty((0, dimension), dtype=np.float32)
+        index = ann.build_index(dimension, empty, np.empty(0, dtype=np.int64), ann.FLAT, encoding=None)
+        return cls(embeddings, index, InMemoryDocstore(), {}, documents=documents)
+
+    def upsert(self, texts: List[str], vectors: List[List[float]], metadatas: Optional[List[Dict[str, Any]]] = None,
+               ids: Optional[List[str]] = None) -> List[str]:
+        """Add documents, replacing any stored under the same docstore id (`ids`, else metadata `doc_id`)."""
+        metadatas = metadatas or [{} for _ in texts]
+        latest = {}
+        for position, (text, vector, metadata) in enumerate(zip(texts, vectors, metadatas)):
+            docstore_id = ids[position] if ids else metadata.get("doc_id") or str(uuid.uuid4())
+            latest[docstore_id] = (text, vector, metadata)
+        if not latest:
+            return []
+        self.delete(list(latest))
+        new_ids = np.arange(self.next_id, self.next_id + len(latest), dtype=np.int64)
+        self.next_id += len(latest)
+        matrix = np.asarray([vector for _, vector, _ in latest.values()], dtype=np.float32)
+        self.index.add_with_ids(matrix, new_ids)
+        self.revision += 1
+        self.documents.put(
+            new_ids.tolist(),
+            list(latest),
+            [Document(page_content=text, metadata=metadata) for text, _, metadata in latest.values()],
+            matrix,
+        )
+        if self._lexical_index is not None:
+            self._lexical_index.add((text for text, _, _ in latest.values()), ids=new_ids.tolist())
+        return list(latest)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> List[str]:
+        texts = list(texts)
+        return self.upsert(texts, self.embedding_function.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs) -> List[str]:
+        texts, vectors = zip(*text_embeddings) if text_embeddings else ((), ())
+        return self.upsert(list(texts), list(vectors), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> bool:
+        """Tombstone documents by docstore id; unknown ids are ignored. Returns whether anything was removed."""
+        dead = self.documents.remove(list(ids or ()))
+        if not dead:
+            return False
+        self.tombstones.update(dead)
+        self.revision += 1
+        self._search_params = None
+        return True
+
+    def stored_vectors(self, docstore_ids: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """Vectors of stored documents (every live one by default), read back from the index, with their docstore ids."""
+        ids = self.documents.ids_for(docstore_ids)
+        if not ids:
+            return [], np.empty((0, self.index.d), dtype=np.float32)
+        return list(ids), self.index.reconstruct_batch(np.fromiter(ids.values(), dtype=np.int64, count=len(ids)))
+
+    def get_documents(self, docstore_ids: List[str]) -> Dict[str, Document]:
+        ids = self.documents.ids_for(docstore_ids)
+        docs = self.documents.get(list(ids.values()))
+        return {docstore_id: docs[i] for docstore_id, i in ids.items() if i in docs}
+
+    def dead_ratio(self) -> float:
+        return len(self.tombstones) / self.index.ntotal if self.index.ntotal else 0.0
+
+    def needs_compaction(self, threshold: float) -> bool:
+        return self.dead_ratio() > threshold or ann.needs_migration(self.index, len(self.documents))
+
+    def compact(self) -> int:
+        """Rebuild the index from live vectors only and return how many dead vectors were dropped.
+
+        The rebuild also moves the store to the index type and encoding suited to its current
+        size. It runs on a new index that is swapped in at the end, so a memory-mapped index is
+        never written to.
+        """
+        return self.install(self.rebuild())
+
+    def rebuild(self) -> faiss.IndexIDMap2:
+        """Build a fresh index over the live vectors without touching the store."""
+        stored = self.documents.vectors()
+        if stored is None:
+            stored = ann.live_vectors(self.index, self.documents.ids())
+        vectors, ids = stored
+        return ann.build_index(self.index.d, vectors, ids)
+
+    def install(self, index: faiss.IndexIDMap2) -> int:
+        """Swap in an index from `rebuild` and return how many dead vectors it dropped."""
+        removed = len(self.tombstones)
+        self.index = index
+        self.tombstones.clear()
+        self._search_params = None
+        # BM25 statistics still count the removed documents; rebuild on next use.
+        self._lexical_index = None
+        return removed
+
+    def search_vectors(self, vectors: np.ndarray, k: int,
+                       filters: List[Optional[Dict[str, Any]]], fetch_k: int = FILTER_FETCH_K) -> List[List[Tuple[Document, float]]]:
+        """Top-k (document, L2 distance) pairs for each row of `vectors`, skipping tombstones."""
+        index = self.index
+        if len(self.documents) == 0:
+            return [[] for _ in filters]
+        fetch_k = min(k if not any(filters) else max(k, fetch_k), index.ntotal)
+        params = self._search_parameters()
+        if params is None:
+            distances, indices = index.search(vectors, fetch_k)
+        else:
+            distances, indices = index.search(vectors, fetch_k, params=params)
+        # One document lookup covers the candidates of every query.
+        docs = self.documents.get(list(dict.fromkeys(int(i) for i in indices.ravel() if i >= 0)))
+        results = []
+        for distance_row, row, query_filter in zip(distances, indices, filters):
+            hits = []
+            for distance, i in zip(distance_row, row):
+                doc = docs.get(int(i))
+                if doc is not None and matches_filter(doc.metadata, query_filter):
+                    hits.append((doc, float(distance)))
+                    if len(hits) == k:
+                        break
+            results.append(hits)
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               fetch_k: int = FILTER_FETCH_K, **kwargs) -> List[Tuple[Document, float]]:
+        return self.search_vectors(np.asarray([embedding], dtype=np.float32), k, [filter], fetch_k)[0]
+
+    def lexical_index(self) -> BM25Index:
+        # Built on first use over the live documents; upserts keep it current, compaction discards it.
+        # Concurrent first searches share one build instead of each scanning the documents.
+        if self._lexical_index is None:
+            with self._lexical_lock:
+                if self._lexical_index is None:
+                    ids, texts = zip(*self.documents.texts()) if len(self.documents) else ((), ())
+                    lexical_index = BM25Index()
+                    lexical_index.add(texts, ids=ids)
+                    self._lexical_index = lexical_index
+        return self._lexical_index
+
+    def lexical_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        lexical_index = self.lexical_index()
+        ranked = [i for i, _ in lexical_index.search(query, len(lexical_index))]
+        # Documents are fetched a page of hits at a time; tombstoned ids have none and drop out.
+        page_size = max(k, FILTER_FETCH_K)
+        results = []
+        for start in range(0, len(ranked), page_size):
+            page = ranked[start:start + page_size]
+            docs = self.documents.get(page)
+            for i in page:
+                doc = docs.get(i)
+                if doc is not None and matches_filter(doc.metadata, filter):
+                    results.append(doc)
+                    if len(results) == k:
+                        return results
+        return results
+
+    def _search_parameters(self) -> Optional[faiss.SearchParameters]:
+        if not self.tombstones:
+            return None
+        if self._search_params is None:
+            dead = np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones))
+            # SWIG does not keep the selectors alive on its own; hold references next to the params.
+            batch = faiss.IDSelectorBatch(dead)
+            self._selectors = (batch, faiss.IDSelectorNot(batch))
+            self._search_params = ann.search_parameters(self.index, self._selectors[1])
+        return self._search_params
+
+
+class VectorStore:
+    """Global store plus per-project partitions behind one readers-writer lock.
+
+    Searches share the read side, so they run in parallel with each other (faiss releases the
+    GIL while it scans); adds, deletes and index swaps take the write side. Embedding happens
+    outside the lock on both paths. The `a*` methods run the same calls on bounded thread pools
+    for async callers.
+
+    With several worker processes, one store runs in the writer role and publishes snapshot
+    generations; the others run as readers, which memory-map the latest generation (so they
+    share its pages) and swap in newer ones as they appear. The writer holds an exclusive lock
+    file in the snapshot directory; a process asking for the writer role while another holds
+    it runs as a reader instead.
+
+    Writes are recorded in a write-ahead log before they are applied, and the log is replayed
+    over the snapshots on boot; `save_snapshot` checkpoints and truncates it.
+    """
+    def __init__(self, embeddings=None, snapshot_dir: Optional[str] = None, memory_budget_mb: Optional[float] = None,
+                 documents_on_disk: Optional[bool] = None, role: Optional[str] = None, wal: Optional[bool] = None):
+        self.embeddings = embeddings or create_embeddings()
+        self.vector_store = None
+        self.partitions = OrderedDict()
+        self.snapshot_dir = snapshot_dir or settings.VECTOR_STORE_PATH
+        self.snapshot_version = 0
+        self.role = role or settings.VECTOR_STORE_ROLE
+        self.read_only = self.role == READER
+        # The WAL, snapshots and CURRENT pointers are shared files: only one process may write them.
+        self._writer_lock = None
+        if not self.read_only:
+            self._writer_lock = ProcessLock(os.path.join(self.snapshot_dir, WRITER_LOCK_FILE))
+            if not self._writer_lock.acquire():
+                print(f"Vector store {self.snapshot_dir} already has a writer process; running as a reader")
+                self.role, self.read_only = READER, True
+        if memory_budget_mb is None:
+            memory_budget_mb = settings.VECTOR_STORE_MEMORY_BUDGET_MB
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        if documents_on_disk is None:
+            documents_on_disk = settings.VECTOR_STORE_DOCUMENTS_ON_DISK
+        self.documents_db = DocumentDatabase(os.path.join(self.snapshot_dir, DOCUMENTS_FILE)) if documents_on_disk else None
+        if wal is None:
+            wal = settings.VECTOR_STORE_WAL
+        self.wal = None
+        if wal and not self.read_only:
+            self.wal = WriteAheadLog(os.path.join(self.snapshot_dir, WAL_FILE), fsync=settings.VECTOR_STORE_WAL_FSYNC)
+        # Keys are project IDs for partitions and None for the global store.
+        self._mmapped = set()
+        # Generation each resident store was loaded from, for readers to spot newer ones.
+        self._versions = {}
+        self._dirty = set()
+        self._compacting = set()
+        self.compaction_threshold = settings.VECTOR_STORE_COMPACTION_THRESHOLD
+        self._lock = ReadWriteLock()
+        # Readers bump a resident partition's recency under the read lock; they serialize on this instead.
+        self._recency_lock = threading.Lock()
+        # Hybrid fan-out and background compaction.
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vector-store")
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=settings.VECTOR_STORE_SEARCH_WORKERS, thread_name_prefix="vector-search"
+        )
+        # Writes serialize on the lock anyway; one thread keeps them in submission order.
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-write")
+        self._closed = threading.Event()
+        self.load_snapshot()
+        self._replay()
+        if self.read_only:
+            threading.Thread(target=self._watch, name="vector-refresh", daemon=True).start()
+
+    def create_vector_store(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        store = self._build_store(texts, metadatas)
+        with self._lock.write():
+            self.vector_store = store
+            self._mmapped.discard(None)
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        self._ensure_writer()
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            print(f"Error embedding texts: {e}")
+            vectors = None
+        groups = {}
+        for position, metadata in enumerate(metadatas):
+            groups.setdefault(partition_key(metadata), []).append(position)
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock.write():
+            for key, positions in groups.items():
+                self._write((
+                    ADD,
+                    key,
+                    [texts[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                    vectors[positions] if vectors is not None else None,
+                ))
+            self._evict()
+
+    def delete(self, doc_ids: List[str], project_id: Optional[int] = None):
+        """Remove documents by doc_id from the global store, or from a project's partition."""
+        self._ensure_writer()
+        with self._lock.write():
+            if self._get_store(project_id) is not None:
+                self._write((DELETE, project_id, list(doc_ids)))
+
+    def drop_partition(self, project_id: int):
+        """Forget a project's partition entirely, in memory and on disk."""
+        self._ensure_writer()
+        with self._lock.write():
+            self._write((DROP, project_id))
+
+    def compact(self, project_id: Optional[int] = None) -> int:
+        """Rebuild a resident store without its tombstoned vectors, migrating its index type if the
+        corpus has outgrown it; returns how many dead vectors were dropped.
+
+        The rebuild runs under the read lock, so searches carry on and only writes wait; the
+        write lock is held just for the swap.
+        """
+        self._ensure_writer()
+        index = None
+        with self._lock.read():
+            store = self._resident_store(project_id)
+            if isinstance(store, MutableFAISS):
+                revision = store.revision
+                try:
+                    index = store.rebuild()
+                except Exception as e:
+                    print(f"Error compacting vector store: {e}")
+        with self._lock.write():
+            self._compacting.discard(project_id)
+            if index is None or self._resident_store(project_id) is not store:
+                return 0
+            if store.revision != revision:
+                # Written to while rebuilding; start over from the new contents if still needed.
+                self._schedule_compaction(project_id, store)
+                return 0
+            removed = store.install(index)
+            # install() always swaps in a freshly built index held in RAM.
+            self._mmapped.discard(project_id)
+            self._dirty.add(project_id)
+            label = "global store" if project_id is None else f"project {project_id}"
+            print(f"Vector store compacted {label}: dropped {removed} dead vectors, "
+                  f"{store.index.ntotal} vectors in a {ann.index_kind(store.index)} index")
+            return removed
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          project_id: Optional[int] = None) -> List[Document]:
+        store = self._search_store(project_id)
+        if store is None:
+            return []
+        try:
+            if isinstance(store, MutableFAISS):
+                vector = self.embeddings.embed_query(query)
+                with self._lock.read():
+                    return store.similarity_search_by_vector(vector, k=k, filter=filter)
+            with self._lock.read():
+                if filter is None:
+                    return store.similarity_search(query, k=k)
+                return store.similarity_search(query, k=k, filter=filter)
+        except Exception as e:
+            print(f"Error performing similarity search: {e}")
+            return []
+
+    def similarity_search_batch(self, queries: List[str], k: int = 4,
+                                filter: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None] = None,
+                                project_id: Optional[int] = None) -> List[List[Document]]:
+        """Answer several queries with one embedding call and one matrix search.
+
+        `filter` is either applied to every query or given per query as a list aligned with `queries`.
+        """
+        filters = filter if isinstance(filter, list) else [filter] * len(queries)
+        store = self._search_store(project_id)
+        if store is None:
+            return [[] for _ in queries]
+        try:
+            if not isinstance(store, MutableFAISS):
+                with self._lock.read():
+                    return [store.similarity_search(query, k=k, filter=query_filter) for query, query_filter in zip(queries, filters)]
+            if len(store.documents) == 0:
+                return [[] for _ in queries]
+            vectors = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+            with self._lock.read():
+                return [[doc for doc, _ in hits] for hits in store.search_vectors(vectors, k, filters)]
+        except Exception as e:
+            print(f"Error performing batched similarity search: {e}")
+            return [[] for _ in queries]
+
+    def lexical_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                       project_id: Optional[int] = None) -> List[Document]:
+        store = self._search_store(project_id)
+        if store is None:
+            return []
+        # The read lock keeps upserts out while a first search builds the BM25 index.
+        with self._lock.read():
+            return store.lexical_search(query, k, filter)
+
+    def hybrid_search(self, query: str, k: int = 20, filter: Optional[Dict[str, Any]] = None,
+                      project_id: Optional[int] = None) -> HybridResults:
+        """Run vector and BM25 search side by side and fuse them; callers can re-slice the result by filter."""
+        vector_future = self._executor.submit(self.similarity_search, query, k, filter, project_id)
+        lexical_future = self._executor.submit(self.lexical_search, query, k, filter, project_id)
+        return HybridResults(vector_future.result(), lexical_future.result())
+
+    def neighbors_of(self, doc_ids: Optional[List[str]], k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                     project_id: Optional[int] = None) -> Dict[str, List[Tuple[Document, float]]]:
+        """Nearest other documents of documents already in the store (all of them if `doc_ids` is None).
+
+        Searches with the stored vectors in one batch, so nothing is embedded. Returns
+        (document, L2 distance) pairs per doc_id; ids the store does not hold are left out.
+        """
+        store = self._search_store(project_id)
+        if not isinstance(store, MutableFAISS):
+            return {}
+        with self._lock.read():
+            found, vectors = store.stored_vectors(doc_ids)
+            if not found:
+                return {}
+            hits = store.search_vectors(vectors, k + 1, [filter] * len(found))
+        return {
+            doc_id: [(doc, distance) for doc, distance in row if doc.metadata.get("doc_id") != doc_id][:k]
+            for doc_id, row in zip(found, hits)
+        }
+
+    def get_documents(self, doc_ids: List[str], project_id: Optional[int] = None) -> Dict[str, Document]:
+        store = self._search_store(project_id)
+        if not isinstance(store, MutableFAISS):
+            return {}
+        with self._lock.read():
+            return store.get_documents(doc_ids)
+
+    def store_revision(self, project_id: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Identifies the contents of a store: changes whenever it is written to or swapped for a newer generation."""
+        store = self._search_store(project_id)
+        if not isinstance(store, MutableFAISS):
+            return None
+        return id(store), store.revision
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                 project_id: Optional[int] = None) -> List[Document]:
+        return await self._run(self._search_executor, self.similarity_search, query, k, filter, project_id)
+
+    async def asimilarity_search_batch(self, queries: List[str], k: int = 4,
+                                       filter: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None] = None,
+                                       project_id: Optional[int] = None) -> List[List[Document]]:
+        return await self._run(self._search_executor, self.similarity_search_batch, queries, k, filter, project_id)
+
+    async def ahybrid_search(self, query: str, k: int = 20, filter: Optional[Dict[str, Any]] = None,
+                             project_id: Optional[int] = None) -> HybridResults:
+        return await self._run(self._search_executor, self.hybrid_search, query, k, filter, project_id)
+
+    async def aadd_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        return await self._run(self._write_executor, self.add_texts, texts, metadatas)
+
+    def initialize_with_dummy_data(self):
+        dummy_texts = [
+            "This is a dummy task for initializing the vector store.",
+            "Another dummy task to ensure the vector store is not empty.",
+            "A third dummy task for good measure."
+        ]
+        dummy_metadatas = [
+            {"title": "Dummy Task 1", "project_id": 0},
+            {"title": "Dummy Task 2", "project_id": 0},
+            {"title": "Dummy Task 3", "project_id": 0}
+        ]
+        self.create_vector_store(dummy_texts, dummy_metadatas)
+        print("Vector store initialized with dummy data.")
+
+    def save_snapshot(self):
+        """Write every store changed since its last snapshot, the global store and partitions alike.
+
+        In the writer role this is also how a new generation is published to readers.
+        """
+        if self.read_only:
+            return
+        with self._lock.write():
+            for key in list(self._dirty):
+                self._save_store(key)
+            if self.wal is not None:
+                # Every logged write is now in a snapshot (or in a fallback store that has none).
+                self.wal.checkpoint()
+
+    def load_snapshot(self) -> bool:
+        snapshot = read_snapshot(self.snapshot_dir, self.embeddings, self._documents(None), self.read_only)
+        if snapshot is None:
+            return False
+        with self._lock.write():
+            self.vector_store, self.snapshot_version = snapshot
+            self._versions[None] = self.snapshot_version
+            self._mmapped.add(None)
+            self._dirty.discard(None)
+        print(f"Vector store snapshot v{self.snapshot_version:06d} loaded with {self.vector_store.index.ntotal} vectors")
+        return True
+
+    def refresh(self) -> bool:
+        """Reader role: swap in every generation published since the stores were loaded.
+
+        New generations are mapped outside the lock and swapped in under it; searches already
+        running finish on the generation they started with. Returns whether anything changed.
+        """
+        changed = False
+        for key in [None, *list(self.partitions)]:
+            path = self._snapshot_path(key)
+            version = current_version(path)
+            if version == self._versions.get(key):
+                continue
+            if version is None:
+                # The project was deleted and its partition directory removed.
+                with self._lock.write():
+                    self.partitions.pop(key, None)
+                    self._versions.pop(key, None)
+                changed = True
+                continue
+            snapshot = read_snapshot(path, self.embeddings, self._documents(key), read_only=True)
+            if snapshot is None:
+                continue
+            with self._lock.write():
+                if key is None:
+                    self.vector_store, self.snapshot_version = snapshot
+                elif key in self.partitions:
+                    self.partitions[key] = snapshot[0]
+                else:
+                    continue
+                self._versions[key] = snapshot[1]
+            changed = True
+        return changed
+
+    def list_snapshots(self) -> List[int]:
+        return list_snapshots(self.snapshot_dir)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock.read():
+            # Copied first: searches may reorder the map while the stats are computed.
+            partitions = list(self.partitions.items())
+            stats = {
+                "role": self.role,
+                "snapshot_version": self.snapshot_version,
+                "resident_partitions": len(partitions),
+                "resident_bytes": sum(estimate_bytes(store) for _, store in partitions),
+                "index_types": {
+                    "global" if key is None else str(key): ann.index_kind(store.index)
+                    for key, store in [(None, self.vector_store), *partitions]
+                    if isinstance(store, MutableFAISS)
+                },
+                "quantization": settings.VECTOR_STORE_QUANTIZATION,
+                "documents_on_disk": self.documents_db is not None,
+                "tombstones": sum(
+                    len(store.tombstones) for store in [self.vector_store, *(store for _, store in partitions)]
+                    if isinstance(store, MutableFAISS)
+                ),
+            }
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats["embedding_cache"] = self.embeddings.stats()
+        return stats
+
+    def _search_store(self, project_id: Optional[int]):
+        if project_id is None:
+            if self.vector_store is None:
+                self.initialize_with_dummy_data()
+            return self.vector_store
+        with self._lock.read():
+            store = self.partitions.get(project_id)
+            if store is not None:
+                with self._recency_lock:
+                    self.partitions.move_to_end(project_id)
+                return store
+        # Not resident: loading it (and evicting others) changes the partition map.
+        with self._lock.write():
+            return self._get_store(project_id)
+
+    def _write(self, record: tuple):
+        """Log a mutation, then apply it; the caller holds the write lock."""
+        self._apply(self.wal.append(record) if self.wal is not None else 0, record)
+
+    def _apply(self, seq: int, record: tuple):
+        op, key = record[0], record[1]
+        if op == ADD:
+            self._add_to_store(key, *record[2:])
+        elif op == DELETE:
+            store = self._get_store(key)
+            if store is not None and store.delete(record[2]):
+                self._dirty.add(key)
+                self._schedule_compaction(key, store)
+        elif op == DROP:
+            self.partitions.pop(key, None)
+            self._versions.pop(key, None)
+            self._mmapped.discard(key)
+            self._dirty.discard(key)
+            shutil.rmtree(self._snapshot_path(key), ignore_errors=True)
+            if self.documents_db is not None:
+                self.documents_db.drop(key)
+        store = self._resident_store(key)
+        if seq and isinstance(store, MutableFAISS):
+            store.wal_seq = seq
+
+    def _replay(self):
+        # Records a store's snapshot already holds are skipped; the rest are re-applied in order.
+        if self.wal is None:
+            return
+        replayed = 0
+        with self._lock.write():
+            for seq, record in self.wal.records():
+                store = self._get_store(record[1]) if record[0] != DROP else None
+                if isinstance(store, MutableFAISS) and seq <= store.wal_seq:
+                    continue
+                self._apply(seq, record)
+                replayed += 1
+            self._evict()
+        if replayed:
+            print(f"Vector store replayed {replayed} write-ahead log records")
+
+    def _resident_store(self, key: Optional[int]):
+        return self.vector_store if key is None else self.partitions.get(key)
+
+    @staticmethod
+    async def _run(executor: ThreadPoolExecutor, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args))
+
+    def _build_store(self, texts: List[str], metadatas: List[Dict[str, Any]], vectors: Optional[List[List[float]]] = None,
+                     table: Optional[SQLiteDocuments] = None):
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        try:
+            print(f"Creating FAISS index with {len(documents)} documents")
+            if vectors is None:
+                vectors = self.embeddings.embed_documents(texts)
+            print(f"Embedding dimension: {len(vectors[0])}")
+            store = MutableFAISS.empty(self.embeddings, len(vectors[0]), table)
+            store.upsert(texts, vectors, metadatas)
+            if ann.needs_migration(store.index, len(texts)):
+                # Large initial corpus: train the approximate index now rather than search it flat.
+                store.compact()
+            print(f"FAISS {ann.index_kind(store.index)} index created successfully")
+            return store
+        except Exception as e:
+            print(f"Error creating vector store: {e}")
+            print("Falling back to in-memory storage.")
+            return InMemoryStore(documents, embeddings=self.embeddings, vectors=vectors)
+
+    def _add_to_store(self, key: Optional[int], texts: List[str], metadatas: List[Dict[str, Any]],
+                      vectors: Optional[List[List[float]]]):
+        self._dirty.add(key)
+        store = self._get_store(key)
+        if store is None:
+            table = self._documents(key)
+            if table is not None:
+                # A store built from scratch replaces whatever rows an earlier one left behind.
+                self.documents_db.drop(key)
+            store = self._build_store(texts, metadatas, vectors, table)
+            if key is None:
+                self.vector_store = store
+            else:
+                self.partitions[key] = store
+            return
+        try:
+            if isinstance(store, MutableFAISS) and vectors is not None:
+                self._ensure_writable(key, store)
+                store.upsert(texts, vectors, metadatas)
+                self._schedule_compaction(key, store)
+            elif isinstance(store, InMemoryStore):
+                store.add_texts(texts, metadatas, vectors=vectors)
+            else:
+                store.add_texts(texts, metadatas=metadatas)
+        except Exception as e:
+            print(f"Error adding texts to vector store: {e}")
+
+    def _get_store(self, key: Optional[int]):
+        if key is None:
+            return self.vector_store
+        if key in self.partitions:
+            self.partitions.move_to_end(key)
+            return self.partitions[key]
+        snapshot = read_snapshot(self._snapshot_path(key), self.embeddings, self._documents(key), self.read_only)
+        if snapshot is None:
+            return None
+        self.partitions[key] = snapshot[0]
+        self._versions[key] = snapshot[1]
+        self._mmapped.add(key)
+        self._evict()
+        return snapshot[0]
+
+    def _evict(self):
+        # Least recently used partitions go first; the most recent one always stays resident.
+        total = sum(estimate_bytes(store) for store in self.partitions.values())
+        for key in list(self.partitions)[:-1]:
+            if total <= self.memory_budget:
+                break
+            store = self.partitions[key]
+            if key in self._dirty:
+                if not isinstance(store, MutableFAISS):
+                    continue
+                self._save_store(key)
+            total -= estimate_bytes(store)
+            del self.partitions[key]
+            self._versions.pop(key, None)
+            self._mmapped.discard(key)
+
+    def _save_store(self, key: Optional[int]):
+        store = self._resident_store(key)
+        if not isinstance(store, MutableFAISS):
+            return
+        version = write_snapshot(store, self._snapshot_path(key))
+        self._versions[key] = version
+        self._dirty.discard(key)
+        if key is None:
+            self.snapshot_version = version
+        label = "global store" if key is None else f"project {key}"
+        print(f"Vector store snapshot v{version:06d} saved for {label} with {store.index.ntotal} vectors")
+
+    def _documents(self, key: Optional[int]) -> Optional[SQLiteDocuments]:
+        return self.documents_db.table(key) if self.documents_db is not None else None
+
+    def _schedule_compaction(self, key: Optional[int], store):
+        if (isinstance(store, MutableFAISS) and key not in self._compacting
+                and store.needs_compaction(self.compaction_threshold)):
+            self._compacting.add(key)
+            self._executor.submit(self.compact, key)
+
+    def _snapshot_path(self, key: Optional[int]) -> str:
+        if key is None:
+            return self.snapshot_dir
+        return os.path.join(self.snapshot_dir, PARTITIONS_DIR, str(key))
+
+    def _ensure_writer(self):
+        if self.read_only:
+            raise RuntimeError("Vector store is read-only in the reader role; writes go through the writer process")
+
+    def close(self):
+        """Stop the store's threads and give up the writer role; call `save_snapshot` first to keep changes."""
+        self._closed.set()
+        for executor in (self._executor, self._search_executor, self._write_executor):
+            executor.shutdown(wait=True)
+        if self.wal is not None:
+            self.wal.close()
+        if self._writer_lock is not None:
+            self._writer_lock.release()
+
+    def _watch(self):
+        while not self._closed.wait(settings.VECTOR_STORE_REFRESH_INTERVAL):
+            try:
+                if self.refresh():
+                    print(f"Vector store refreshed to snapshot v{self.snapshot_version:06d}")
+            except Exception as e:
+                print(f"Error refreshing vector store: {e}")
+
+    def _ensure_writable(self, key: Optional[int], store: MutableFAISS):
+        # A memory-mapped index is a read-only view of the snapshot file; copy it into RAM before the first write.
+        if key in self._mmapped:
+            store.index = faiss.deserialize_index(faiss.serialize_index(store.index))
+            self._mmapped.discard(key)
+
+class InMemoryStore:
+    """Fallback store used when a FAISS index cannot be built.
+
+    Embeddings, when available for every document, are kept L2-normalized in a growable float32
+    matrix for exact cosine top-k. A BM25 index over page_content is always maintained, so search
+    stays relevant even when no embeddings could be computed. Replaced and deleted documents keep
+    their slot and are only masked out of results.
+    """
+    def __init__(self, documents: List[Document], embeddings=None, vectors: Optional[List[List[float]]] = None):
+        self.documents = []
+        self.embeddings = embeddings
+        self.lexical_index = BM25Index()
+        self.deleted = set()
+        self._positions = {}
+        self._matrix = None
+        self._vector_count = 0
+        self.add_documents(documents, vectors)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if self.embeddings is not None and 0 < self._vector_count == len(self.documents):
+            try:
+                return self._vector_search(query, k, filter)
+            except Exception as e:
+                print(f"Vector search unavailable, using lexical search: {e}")
+        return self.lexical_search(query, k, filter)
+
+    def lexical_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        accept = (lambda i: self._live(i, filter)) if filter or self.deleted else None
+        return [self.documents[i] for i, _ in self.lexical_index.search(query, k, accept)]
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]], vectors: Optional[List[List[float]]] = None):
+        new_docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        self.add_documents(new_docs, vectors)
+
+    def add_documents(self, documents: List[Document], vectors: Optional[List[List[float]]] = None):
+        # Vector search needs a vector for every document; once one batch arrives without, stay lexical.
+        if vectors is not None and self._vector_count == len(self.documents):
+            self._append_vectors(vectors)
+        for doc in documents:
+            doc_id = doc.metadata.get("doc_id")
+            if doc_id is not None:
+                if doc_id in self._positions:
+                    self.deleted.add(self._positions[doc_id])
+                self._positions[doc_id] = len(self.documents)
+            self.documents.append(doc)
+        self.lexical_index.add(doc.page_content for doc in documents)
+
+    def delete(self, ids: List[str]) -> bool:
+        positions = [self._positions.pop(doc_id) for doc_id in ids if doc_id in self._positions]
+        self.deleted.update(positions)
+        return bool(positions)
+
+    def _live(self, position: int, filter: Optional[Dict[str, Any]]) -> bool:
+        return position not in self.deleted and matches_filter(self.documents[position].metadata, filter)
+
+    def _append_vectors(self, vectors: List[List[float]]):
+        rows = np.asarray(vectors, dtype=np.float32)
+        if rows.size == 0:
+            return
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        rows /= norms
+        needed = self._vector_count + len(rows)
+        if self._matrix is None:
+            self._matrix = np.empty((max(needed, 1024), rows.shape[1]), dtype=np.float32)
+        elif needed > len(self._matrix):
+            grown = np.empty((max(needed, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._vector_count] = self._matrix[:self._vector_count]
+            self._matrix = grown
+        self._matrix[self._vector_count:needed] = rows
+        self._vector_count = needed
+
+    def _vector_search(self, query: str, k: int, filter: Optional[Dict[str, Any]]) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        scores = self._matrix[:self._vector_count] @ query_vector
+        if filter or self.deleted:
+            mask = np.fromiter((self._live(i, filter) for i in range(len(self.documents))), dtype=bool, count=len(self.documents))
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.documents[i] for i in top]
+
+# Built on first use, so importing the app neither opens the index nor claims the writer role.
+vector_store = Lazy(VectorStore)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import pickle
+import struct
+import threading
+import zlib
+from typing import Iterator, Optional, Tuple
+
+ADD = "add"
+DELETE = "delete"
+DROP = "drop"
+# Written alone into a truncated log so the sequence carries on past the records it replaced.
+CHECKPOINT = "checkpoint"
+
+# Each frame is a payload length and CRC32 followed by the pickled (seq, record) payload.
+FRAME = struct.Struct("<II")
+
+
+class WriteAheadLog:
+    """Append-only log of vector store mutations, replayed over the last snapshot on boot.
+
+    Records are tuples: (ADD, key, texts, metadatas, vectors), (DELETE, key, doc_ids) and
+    (DROP, key), where key is a project ID or None for the global store. Adds carry their
+    embeddings, so recovery never calls the embedding model. Every record gets a sequence number
+    that keeps increasing across checkpoints; snapshots remember the last one they contain.
+
+    Appends are flushed to the OS, which survives a process crash; `fsync` also survives power
+    loss at the cost of a disk sync per write. A frame torn by a crash ends the log.
+    """
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self._next_seq = None
+
+    def records(self) -> Iterator[Tuple[int, tuple]]:
+        """Yield (seq, record) for every intact record, oldest first."""
+        for seq, record, _ in self._scan():
+            if record[0] != CHECKPOINT:
+                yield seq, record
+
+    def append(self, record: tuple) -> int:
+        """Durably add a record and return its sequence number."""
+        with self._lock:
+            handle = self._open()
+            seq = self._next_seq
+            self._write(handle, seq, record)
+            self._next_seq += 1
+            return seq
+
+    def checkpoint(self):
+        """Drop every record; call once all of them are in snapshots."""
+        with self._lock:
+            self._open()
+            self._file.close()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as handle:
+                self._write(handle, self._next_seq - 1, (CHECKPOINT,))
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "ab")
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        # Opened on first use; the scan finds the next sequence number and cuts off a torn tail.
+        if self._file is None:
+            next_seq, end = 1, 0
+            for seq, _, end in self._scan():
+                next_seq = seq + 1
+            if os.path.exists(self.path) and os.path.getsize(self.path) > end:
+                print(f"Write-ahead log {self.path} ends in a torn record; discarding it")
+                with open(self.path, "r+b") as handle:
+                    handle.truncate(end)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._next_seq = next_seq if self._next_seq is None else max(self._next_seq, next_seq)
+        return self._file
+
+    def _scan(self) -> Iterator[Tuple[int, tuple, int]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as handle:
+            while True:
+                header = handle.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    return
+                length, checksum = FRAME.unpack(header)
+                payload = handle.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    return
+                seq, record = pickle.loads(payload)
+                yield seq, record, handle.tell()
+
+    def _write(self, handle, seq: int, record: tuple):
+        payload = pickle.dumps((seq, record), protocol=pickle.HIGHEST_PROTOCOL)
+        handle.write(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        handle.flush()
+        if self.fsync:
+            os.fsync(handle.fileno())
@@ -0,0 +1,40 @@
+"""Index writer process for deployments with several API workers.
+
+    VECTOR_STORE_ROLE=writer python -m backend.ai_engine.rag.writer
+    VECTOR_STORE_ROLE=reader uvicorn backend.main:app --workers 4
+
+The writer owns the index: it applies the writes the reader workers forward through the event
+spool and publishes a snapshot generation every VECTOR_STORE_PUBLISH_INTERVAL seconds. Readers
+memory-map the latest generation, so the page cache holds one copy of it however many workers
+there are, and swap in each new one as it is published.
+"""
+import time
+from backend.ai_engine.rag.indexer import indexer
+from backend.ai_engine.rag.vector_store import vector_store
+from backend.database.database import SessionLocal
+
+
+def main():
+    if vector_store.read_only:
+        raise SystemExit("The index writer needs VECTOR_STORE_ROLE=writer and no other writer running on the index")
+    if vector_store.vector_store is None:
+        db = SessionLocal()
+        try:
+            indexer.enqueue_all(db)
+        finally:
+            db.close()
+    indexer.start()
+    print(f"Vector store writer running on {vector_store.snapshot_dir}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        indexer.stop()
+        vector_store.save_snapshot()
+        vector_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Cost of a (task, member) pair that would push the member over capacity; never chosen.
+INFEASIBLE = 1e9
+
+
+def balanced_assignment(fit: np.ndarray, durations: np.ndarray, loads: np.ndarray, capacity: float,
+                        skill_weight: float = 1.0, load_weight: float = 1.0) -> np.ndarray:
+    """Assign tasks to members by skill fit and workload without exceeding anyone's capacity.
+
+    `fit` is the tasks × members skill fit in [0, 1], `durations` the hours of each task and
+    `loads` the hours each member already carries. Tasks are handed out in rounds, longest first:
+    each round solves a min-cost linear assignment between the next batch of tasks and the
+    members, where a pair costs `skill_weight * (1 - fit) + load_weight * load_after / capacity`.
+    Each round is a members × members problem, so thousands of tasks take a few hundred small
+    solves. Returns the member column of every task, or -1 for tasks no member has room for.
+    """
+    n_tasks, n_members = fit.shape
+    assigned = np.full(n_tasks, -1, dtype=np.int64)
+    loads = np.asarray(loads, dtype=np.float64).copy()
+    durations = np.asarray(durations, dtype=np.float64)
+    if n_tasks == 0 or n_members == 0:
+        return assigned
+
+    pending = np.argsort(-durations, kind="stable")
+    while len(pending):
+        batch = pending[:n_members]
+        load_after = loads[None, :] + durations[batch, None]
+        feasible = load_after <= capacity + 1e-9
+        cost = skill_weight * (1 - fit[batch]) + load_weight * load_after / capacity
+        cost[~feasible] = INFEASIBLE
+        rows, columns = linear_sum_assignment(cost)
+        chosen = cost[rows, columns] < INFEASIBLE
+        rows, columns = rows[chosen], columns[chosen]
+        assigned[batch[rows]] = columns
+        loads[columns] += durations[batch[rows]]
+        # Loads only grow, so a task that fits nobody now never will; tasks that lost their
+        # member to another task of the batch go first in the next round.
+        done = ~feasible.any(axis=1)
+        done[rows] = True
+        pending = np.concatenate([batch[~done], pending[n_members:]])
+    return assigned
+
+
+def plan_assignments(matcher, tasks, loads, capacity: float, default_duration: float = 1.0):
+    """Plan assignments for (task_id, required_skills, estimated_duration) rows with a project's SkillMatcher.
+
+    `loads` maps member ids to the hours they already carry. Tasks without an estimate count as
+    `default_duration` hours. Returns ({task_id: member_id}, unassigned task ids, fit per task id,
+    hours per member id once the plan is applied).
+    """
+    loads = {member_id: float(loads.get(member_id, 0.0)) for member_id in matcher.member_ids}
+    if not tasks:
+        return {}, [], {}, loads
+    durations = np.asarray([duration if duration is not None else default_duration for _, _, duration in tasks])
+    fit = matcher.scores([skills for _, skills, _ in tasks]) if len(matcher) else np.zeros((len(tasks), 0))
+    columns = balanced_assignment(fit, durations, np.asarray(list(loads.values())), capacity)
+    plan, unassigned, fits = {}, [], {}
+    for row, ((task_id, _, _), column) in enumerate(zip(tasks, columns)):
+        if column < 0:
+            unassigned.append(task_id)
+        else:
+            plan[task_id] = matcher.member_ids[column]
+            fits[task_id] = round(float(fit[row, column]), 3)
+            loads[plan[task_id]] += float(durations[row])
+    return plan, unassigned, fits, loads
@@ -0,0 +1,149 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class Lazy:
+    """Stand-in for a module-level singleton that is built on first use rather than at import.
+
+    Attribute access is forwarded to the instance, building it if needed, so callers use the
+    proxy as they would the object itself; `built` lets shutdown code skip what never started.
+    """
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._instance is not None
+
+    def instance(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.instance(), name)
+
+
+class ReadWriteLock:
+    """Lock shared by any number of readers or held by a single writer.
+
+    Waiting writers block new readers, so a steady stream of searches cannot starve indexing.
+    The writing thread may re-enter `write()` and also take `read()`; a reader may re-enter
+    `read()`, but must not ask for `write()` while it still holds a read lock.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._condition:
+            owned = self._writer == me
+            if not owned:
+                depth = getattr(self._local, "read_depth", 0)
+                # A nested read never waits: the writer it would queue behind is waiting on it.
+                while depth == 0 and (self._writer is not None or self._writers_waiting):
+                    self._condition.wait()
+                self._readers += 1
+                self._local.read_depth = depth + 1
+        try:
+            yield
+        finally:
+            if not owned:
+                with self._condition:
+                    self._readers -= 1
+                    self._local.read_depth -= 1
+                    if self._readers == 0:
+                        self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer != me:
+                self._writers_waiting += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._writers_waiting -= 1
+                self._writer = me
+            self._write_depth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class ProcessLock:
+    """Exclusive lock on a file, held by at most one process at a time (say one of several API workers).
+
+    The OS releases it when the holding process exits, so a crashed holder never leaves it stuck.
+    Within the holding process every instance for the same path shares the lock.
+    """
+    _held = {}
+    _held_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.acquired = False
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; returns whether this process now holds it."""
+        with self._held_lock:
+            if not self.acquired:
+                handle, count = self._held.get(self.path, (None, 0))
+                if handle is None:
+                    handle = self._lock_file()
+                    if handle is None:
+                        return False
+                self._held[self.path] = (handle, count + 1)
+                self.acquired = True
+            return True
+
+    def release(self):
+        with self._held_lock:
+            if not self.acquired:
+                return
+            self.acquired = False
+            handle, count = self._held.pop(self.path)
+            if count > 1:
+                self._held[self.path] = (handle, count - 1)
+            else:
+                # Closing the file drops the OS lock.
+                handle.close()
+
+    def _lock_file(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        handle = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return None
+        return handle
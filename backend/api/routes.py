@@ -1,212 +1,346 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
-from typing import List
-import logging
-from backend.database import crud, schemas
-from backend.api.dependencies import get_db
-from backend.ai_engine.workflow.graph import workflow
-from backend.ai_engine.agents.ai_assistant import AIAssistant
-from backend.ai_engine.rag.retriever import Retriever
-from backend.ai_engine.agents.priority_agent import PriorityAgent
-from backend.ai_engine.agents.suggestion_agent import SuggestionAgent
-from backend.ai_engine.agents.report_agent import ReportAgent
-from backend.ai_engine.utils.helpers import model_to_dict
-from pydantic import BaseModel
-import json
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-
-router = APIRouter()
-logging.basicConfig(level=logging.INFO)
-
-
-@router.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
-
-@router.get("/users/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
-
-@router.post("/projects/", response_model=schemas.Project)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
-    return crud.create_project(db=db, project=project, user_id=1)
-
-@router.get("/projects/", response_model=List[schemas.ProjectOut])
-def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    projects = crud.get_projects(db, skip=skip, limit=limit)
-    return projects
-
-@router.get("/projects/{project_id}", response_model=schemas.Project)
-def read_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = crud.get_project(db, project_id=project_id)
-    if db_project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return db_project
-
-@router.post("/projects/{project_id}/tasks/", response_model=schemas.Task)
-def create_task(project_id: int, task: schemas.TaskCreate, db: Session = Depends(get_db)):
-    project = crud.get_project(db, project_id=project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    logging.info(f"Creating task for project {project_id}: {task}")
-    
-    try:
-        db_task = crud.create_task(db=db, task=task, project_id=project_id)
-        return db_task
-    except Exception as e:
-        logging.error(f"Error creating task: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"An error occurred while creating the task: {str(e)}")
-
-@router.get("/projects/{project_id}/tasks/", response_model=List[schemas.Task])
-def read_tasks(project_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    tasks = crud.get_tasks(db, project_id=project_id, skip=skip, limit=limit)
-    return tasks
-
-@router.post("/team-members/", response_model=schemas.TeamMember)
-def create_team_member(team_member: schemas.TeamMemberCreate, db: Session = Depends(get_db)):
-    return crud.create_team_member(db=db, team_member=team_member)
-
-@router.get("/team-members/", response_model=List[schemas.TeamMember])
-def read_team_members(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    team_members = crud.get_team_members(db, skip=skip, limit=limit)
-    return team_members
-
-class AIQuestion(BaseModel):
-    question: str
-
-@router.post("/projects/{project_id}/ai-chat/")
-def ai_chat(project_id: int, ai_question: AIQuestion, db: Session = Depends(get_db)):
-    print(f"Received question for project {project_id}: {ai_question.question}")
-    project = crud.get_project(db, project_id=project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    retriever = Retriever(db)
-    ai_assistant = AIAssistant(retriever)
-    
-    try:
-        answer = ai_assistant.answer_question(project_id, ai_question.question)
-        print(f"AI response: {answer}")
-        return {"answer": answer}
-    except Exception as e:
-        print(f"Error in AI chat: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
-
-@router.post("/projects/{project_id}/tasks/{task_id}/prioritize/", response_model=schemas.Task)
-def prioritize_task(project_id: int, task_id: int, db: Session = Depends(get_db)):
-    task = crud.get_task(db, task_id=task_id)
-    if task is None or task.project_id != project_id:
-        raise HTTPException(status_code=404, detail="Task not found or does not belong to the specified project")
-    
-    retriever = Retriever(db)
-    priority_agent = PriorityAgent(retriever)
-    
-    # Convert SQLAlchemy model to dictionary
-    task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
-    
-    # Ensure the task dictionary has all required fields
-    task_dict['project_id'] = project_id
-    if 'required_skills' in task_dict and task_dict['required_skills']:
-        task_dict['required_skills'] = task_dict['required_skills'].split(',')
-    else:
-        task_dict['required_skills'] = []
-
-    try:
-        priority_info = priority_agent.assign_priority(task_dict)
-        updated_task = crud.update_task(db, task_id=task_id, task_update={
-            'priority': priority_info['priority'],
-            'priority_reasoning': priority_info['reasoning']
-        })
-        return updated_task
-    except Exception as e:
-        print(f"Error in prioritize_task: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred while prioritizing the task")
-
-@router.post("/projects/{project_id}/tasks/{task_id}/suggest/")
-def suggest_for_task(project_id: int, task_id: int, db: Session = Depends(get_db)):
-    task = crud.get_task(db, task_id=task_id)
-    if task is None or task.project_id != project_id:
-        raise HTTPException(status_code=404, detail="Task not found or does not belong to the specified project")
-    
-    retriever = Retriever(db)
-    suggestion_agent = SuggestionAgent(retriever)
-    
-    task_dict = model_to_dict(task)
-    suggestions = suggestion_agent.generate_suggestions(task_dict, project_id)
-    return suggestions
-
-@router.post("/projects/{project_id}/report/")
-def generate_project_report(project_id: int, db: Session = Depends(get_db), pdf: bool = False):
-    project = crud.get_project(db, project_id=project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    tasks = crud.get_tasks(db, project_id=project_id)
-    
-    retriever = Retriever(db)
-    report_agent = ReportAgent(retriever)
-    
-    # Convert SQLAlchemy model instances to dictionaries
-    task_dicts = []
-    for task in tasks:
-        task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
-        # Handle the 'required_skills' field separately
-        if task.required_skills:
-            task_dict['required_skills'] = json.loads(task.required_skills)
-        task_dicts.append(task_dict)
-    
-    logging.info(f"Generating report for project {project_id} with {len(task_dicts)} tasks")
-    
-    try:
-        report = report_agent.generate_report(task_dicts)
-        logging.info("Report generated successfully")
-        
-        if pdf:
-            # Generate PDF
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = []
-
-            # Add content to the PDF
-            story.append(Paragraph("Project Report", styles['Title']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("Summary", styles['Heading2']))
-            story.append(Paragraph(report['summary'], styles['Normal']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("Key Metrics", styles['Heading2']))
-            for key, value in report['key_metrics'].items():
-                story.append(Paragraph(f"{key}: {value}", styles['Normal']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("Risks", styles['Heading2']))
-            for risk in report['risks']:
-                story.append(Paragraph(f"• {risk}", styles['Normal']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("Recommendations", styles['Heading2']))
-            for recommendation in report['recommendations']:
-                story.append(Paragraph(f"• {recommendation}", styles['Normal']))
-
-            doc.build(story)
-            buffer.seek(0)
-            return Response(content=buffer.getvalue(), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=project_report.pdf"})
-        else:
-            return report
-    except Exception as e:
-        logging.error(f"Error generating report: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"An error occurred while generating the report: {str(e)}")
-
-@router.post("/projects/{project_id}/team-members/{team_member_id}", response_model=schemas.ProjectOut)
-def assign_team_member_to_project(
-    project_id: int, 
-    team_member_id: int, 
-    db: Session = Depends(get_db)
-):
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, List, Optional
+import logging
+from backend.database import crud, metrics, schemas
+from backend.api.dependencies import get_db
+from backend.ai_engine.workflow.graph import workflow
+from backend.ai_engine.agents.ai_assistant import AIAssistant
+from backend.ai_engine.rag.retriever import Retriever, memo_stats, project_cache
+from backend.ai_engine.rag.vector_store import vector_store
+from backend.ai_engine.rag.neighbors import neighbor_graphs
+from backend.ai_engine.llm.registry import llm_registry
+from backend.ai_engine.llm.semantic_cache import semantic_answer_cache
+from backend.ai_engine.agents.priority_agent import PriorityAgent
+from backend.ai_engine.agents.suggestion_agent import SuggestionAgent
+from backend.ai_engine.agents.report_agent import ReportAgent
+from backend.ai_engine.utils.helpers import model_to_dict
+from backend.ai_engine.utils.assignment import plan_assignments
+from backend.config import settings
+from pydantic import BaseModel
+import json
+from io import BytesIO
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+
+router = APIRouter()
+logging.basicConfig(level=logging.INFO)
+
+
+@router.post("/users/", response_model=schemas.User)
+def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = crud.get_user_by_email(db, email=user.email)
+    if db_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return crud.create_user(db=db, user=user)
+
+@router.get("/users/", response_model=List[schemas.User])
+def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    users = crud.get_users(db, skip=skip, limit=limit)
+    return users
+
+@router.post("/projects/", response_model=schemas.Project)
+def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+    return crud.create_project(db=db, project=project, user_id=1)
+
+@router.get("/projects/", response_model=List[schemas.ProjectOut])
+def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    projects = crud.get_projects(db, skip=skip, limit=limit)
+    return projects
+
+@router.get("/projects/{project_id}", response_model=schemas.Project)
+def read_project(project_id: int, db: Session = Depends(get_db)):
+    db_project = crud.get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_project
+
+@router.delete("/projects/{project_id}", status_code=204)
+def delete_project(project_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_project(db, project_id=project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return Response(status_code=204)
+
+@router.post("/projects/{project_id}/tasks/", response_model=schemas.Task)
+def create_task(project_id: int, task: schemas.TaskCreate, db: Session = Depends(get_db)):
+    project = crud.get_project(db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    logging.info(f"Creating task for project {project_id}: {task}")
+    
+    try:
+        db_task = crud.create_task(db=db, task=task, project_id=project_id)
+        return db_task
+    except Exception as e:
+        logging.error(f"Error creating task: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An error occurred while creating the task: {str(e)}")
+
+@router.get("/projects/{project_id}/tasks/", response_model=List[schemas.Task])
+def read_tasks(project_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    tasks = crud.get_tasks(db, project_id=project_id, skip=skip, limit=limit)
+    return tasks
+
+@router.delete("/projects/{project_id}/tasks/{task_id}", status_code=204)
+def delete_task(project_id: int, task_id: int, db: Session = Depends(get_db)):
+    db_task = crud.get_task(db, task_id=task_id)
+    if db_task is None or db_task.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Task not found")
+    crud.delete_task(db, task_id=task_id)
+    return Response(status_code=204)
+
+@router.post("/team-members/", response_model=schemas.TeamMember)
+def create_team_member(team_member: schemas.TeamMemberCreate, db: Session = Depends(get_db)):
+    return crud.create_team_member(db=db, team_member=team_member)
+
+@router.get("/team-members/", response_model=List[schemas.TeamMember])
+def read_team_members(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    team_members = crud.get_team_members(db, skip=skip, limit=limit)
+    return team_members
+
+@router.post("/projects/{project_id}/assign-tasks/", response_model=schemas.BulkAssignment)
+def assign_tasks(project_id: int, capacity: Optional[float] = None, dry_run: bool = False, db: Session = Depends(get_db)):
+    """Assign every open unassigned task of a project by skill fit, balancing estimated hours under a capacity."""
+    project = crud.get_project(db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    capacity = settings.ASSIGNMENT_CAPACITY_HOURS if capacity is None else capacity
+    if capacity <= 0:
+        raise HTTPException(status_code=400, detail="Capacity must be positive")
+
+    matcher = Retriever(db).get_skill_matcher(project_id)
+    tasks = crud.get_unassigned_tasks(db, project_id)
+    loads = metrics.member_workloads(db, matcher.member_ids)
+    plan, unassigned, fits, workloads = plan_assignments(matcher, tasks, loads, capacity)
+    logging.info(f"Assigning {len(plan)} of {len(tasks)} unassigned tasks in project {project_id}")
+    if not dry_run:
+        crud.assign_tasks(db, project_id, plan)
+
+    return schemas.BulkAssignment(
+        assignments=[
+            schemas.TaskAssignment(task_id=task_id, team_member_id=member_id, team_member_name=matcher.name_of(member_id), fit=fits[task_id])
+            for task_id, member_id in plan.items()
+        ],
+        unassigned_task_ids=unassigned,
+        workloads=workloads,
+    )
+
+@router.get("/ai-engine/stats/")
+def read_ai_engine_stats():
+    return {
+        "vector_store": vector_store.stats(),
+        "neighbor_graphs": neighbor_graphs.stats(),
+        "retriever_memo": dict(memo_stats),
+        "project_cache": project_cache.stats(),
+        "llm": llm_registry.stats(),
+        "ai_chat_cache": semantic_answer_cache.stats(),
+    }
+
+class AIQuestion(BaseModel):
+    question: str
+
+@router.post("/projects/{project_id}/ai-chat/")
+async def ai_chat(project_id: int, ai_question: AIQuestion, db: Session = Depends(get_db),
+            x_ai_cache: Optional[str] = Header(None)):
+    """Answer a question about a project; send `X-AI-Cache: bypass` to skip the semantic answer cache."""
+    print(f"Received question for project {project_id}: {ai_question.question}")
+    project = await run_in_threadpool(crud.get_project, db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    retriever = Retriever(db)
+    ai_assistant = AIAssistant(retriever)
+    
+    try:
+        answer = await ai_assistant.aanswer_question(project_id, ai_question.question, use_cache=(x_ai_cache or "").lower() != "bypass")
+        print(f"AI response: {answer}")
+        return {"answer": answer}
+    except Exception as e:
+        print(f"Error in AI chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@router.post("/projects/{project_id}/ai-chat/stream/")
+async def ai_chat_stream(project_id: int, ai_question: AIQuestion, format: str = "ndjson", db: Session = Depends(get_db),
+                   x_ai_cache: Optional[str] = Header(None)):
+    """Stream the answer to a question as {"type": "token"} events, then {"type": "done"} with the whole answer."""
+    check_stream_format(format)
+    project = await run_in_threadpool(crud.get_project, db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Context is read before the response starts; only the model's output is streamed.
+    chunks = await AIAssistant(Retriever(db)).astream_answer(project_id, ai_question.question, use_cache=(x_ai_cache or "").lower() != "bypass")
+
+    async def events():
+        answer = []
+        try:
+            async for text in chunks:
+                answer.append(text)
+                yield {"type": "token", "text": text}
+            yield {"type": "done", "answer": "".join(answer)}
+        except Exception as e:
+            print(f"Error in AI chat stream: {str(e)}")
+            yield {"type": "error", "detail": f"An error occurred: {str(e)}"}
+    return stream_events(events(), format)
+
+def check_stream_format(format: str):
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+def stream_events(events: AsyncIterator[Dict[str, Any]], format: str) -> StreamingResponse:
+    """Send events as they come, one JSON object per line (NDJSON) or as Server-Sent Events.
+
+    A failure after the response has started ends the stream with an {"type": "error"} event,
+    so clients never take a cut-off stream for a complete one.
+    """
+    events = terminated(events)
+    if format == "sse":
+        body = (f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n" async for event in events)
+        return StreamingResponse(body, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    return StreamingResponse((json.dumps(event, default=str) + "\n" async for event in events), media_type="application/x-ndjson")
+
+async def terminated(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    try:
+        async for event in events:
+            yield event
+    except Exception as e:
+        logging.error(f"Error while streaming: {str(e)}")
+        yield {"type": "error", "detail": f"An error occurred: {str(e)}"}
+
+@router.post("/projects/{project_id}/tasks/{task_id}/prioritize/", response_model=schemas.Task)
+async def prioritize_task(project_id: int, task_id: int, db: Session = Depends(get_db)):
+    task = await run_in_threadpool(crud.get_task, db, task_id=task_id)
+    if task is None or task.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Task not found or does not belong to the specified project")
+    
+    retriever = Retriever(db)
+    priority_agent = PriorityAgent(retriever)
+    
+    # Convert SQLAlchemy model to dictionary
+    task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
+    
+    # Ensure the task dictionary has all required fields
+    task_dict['project_id'] = project_id
+    if 'required_skills' in task_dict and task_dict['required_skills']:
+        task_dict['required_skills'] = task_dict['required_skills'].split(',')
+    else:
+        task_dict['required_skills'] = []
+
+    try:
+        priority_info = await priority_agent.aassign_priority(task_dict)
+        updated_task = await run_in_threadpool(crud.update_task, db, task_id=task_id, task_update={
+            'priority': priority_info['priority'],
+            'priority_reasoning': priority_info['reasoning']
+        })
+        retriever.invalidate(project_id)
+        return updated_task
+    except Exception as e:
+        print(f"Error in prioritize_task: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while prioritizing the task")
+
+@router.post("/projects/{project_id}/tasks/{task_id}/suggest/")
+async def suggest_for_task(project_id: int, task_id: int, db: Session = Depends(get_db)):
+    task = await run_in_threadpool(crud.get_task, db, task_id=task_id)
+    if task is None or task.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Task not found or does not belong to the specified project")
+    
+    retriever = Retriever(db)
+    suggestion_agent = SuggestionAgent(retriever)
+    
+    task_dict = model_to_dict(task)
+    suggestions = await suggestion_agent.agenerate_suggestions(task_dict, project_id)
+    return suggestions
+
+@router.post("/projects/{project_id}/report/")
+async def generate_project_report(project_id: int, db: Session = Depends(get_db), pdf: bool = False):
+    project = await run_in_threadpool(crud.get_project, db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    retriever = Retriever(db)
+    report_agent = ReportAgent(retriever)
+    task_dicts = await run_in_threadpool(report_tasks, db, project_id)
+    
+    logging.info(f"Generating report for project {project_id} with {len(task_dicts)} tasks")
+    
+    try:
+        report = await report_agent.agenerate_report(task_dicts)
+        logging.info("Report generated successfully")
+        
+        if pdf:
+            content = await run_in_threadpool(report_pdf, report)
+            return Response(content=content, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=project_report.pdf"})
+        else:
+            return report
+    except Exception as e:
+        logging.error(f"Error generating report: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An error occurred while generating the report: {str(e)}")
+
+def report_pdf(report: Dict[str, Any]) -> bytes:
+    """Lay the report out as a PDF document."""
+    # Generate PDF
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Add content to the PDF
+    story.append(Paragraph("Project Report", styles['Title']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("Summary", styles['Heading2']))
+    story.append(Paragraph(report['summary'], styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("Key Metrics", styles['Heading2']))
+    for key, value in report['key_metrics'].items():
+        story.append(Paragraph(f"{key}: {value}", styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("Risks", styles['Heading2']))
+    for risk in report['risks']:
+        story.append(Paragraph(f"• {risk}", styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("Recommendations", styles['Heading2']))
+    for recommendation in report['recommendations']:
+        story.append(Paragraph(f"• {recommendation}", styles['Normal']))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+@router.post("/projects/{project_id}/report/stream/")
+async def stream_project_report(project_id: int, format: str = "ndjson", db: Session = Depends(get_db)):
+    """Stream a report as the model writes it: token events, a section event per finished field, then the report."""
+    check_stream_format(format)
+    project = await run_in_threadpool(crud.get_project, db, project_id=project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    task_dicts = await run_in_threadpool(report_tasks, db, project_id)
+    logging.info(f"Streaming report for project {project_id} with {len(task_dicts)} tasks")
+    # Context is read before the response starts, while the request's session is still in use here.
+    try:
+        events = await ReportAgent(Retriever(db)).astream_report(task_dicts)
+    except Exception as e:
+        logging.error(f"Error preparing report stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An error occurred while generating the report: {str(e)}")
+    return stream_events(events, format)
+
+def report_tasks(db: Session, project_id: int) -> List[Dict[str, Any]]:
+    # Convert SQLAlchemy model instances to dictionaries
+    task_dicts = []
+    for task in crud.get_tasks(db, project_id=project_id):
+        task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
+        # Handle the 'required_skills' field separately
+        if task.required_skills:
+            task_dict['required_skills'] = json.loads(task.required_skills)
+        task_dicts.append(task_dict)
+    return task_dicts
+
+@router.post("/projects/{project_id}/team-members/{team_member_id}", response_model=schemas.ProjectOut)
+def assign_team_member_to_project(
+    project_id: int, 
+    team_member_id: int, 
+    db: Session = Depends(get_db)
+):
     return crud.assign_team_member_to_project(db, project_id, team_member_id)
\ No newline at end of file
@@ -1,40 +1,90 @@
-from pydantic_settings import BaseSettings
-from typing import Optional
-import os
-from dotenv import load_dotenv
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-env_path = os.path.join(current_dir, '.env')
-
-load_dotenv(env_path)
-
-class Settings(BaseSettings):
-    APP_NAME: str = "AI-Powered Project Management System"
-    API_V1_PREFIX: str = "/api/v1"
-    DATABASE_URL: str = "sqlite:///./test.db"
-    ALLOWED_ORIGINS: list = ["http://localhost:3000"]
-    OPENAI_API_KEY: Optional[str] = None
-    GROQ_API_KEY: Optional[str] = None
-
-    class Config:
-        env_file = env_path
-        env_file_encoding = 'utf-8'
-
-settings = Settings()
-
-print("Debug information:")
-print(f"Current directory: {current_dir}")
-print(f".env file path: {env_path}")
-print(f".env file exists: {os.path.exists(env_path)}")
-print(f"GROQ_API_KEY from settings: {'Set' if settings.GROQ_API_KEY else 'Not set'}")
-print(f"GROQ_API_KEY from os.environ: {'Set' if os.environ.get('GROQ_API_KEY') else 'Not set'}")
-
-
-if settings.GROQ_API_KEY is None:
-    print("Warning: GROQ_API_KEY is not set in settings. Attempting to get it from os.environ.")
-    settings.GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
-
-if settings.GROQ_API_KEY is None:
-    print("Warning: GROQ_API_KEY is not set. Some features may not work properly.")
-else:
+from pydantic_settings import BaseSettings
+from typing import Dict, Optional
+import os
+from dotenv import load_dotenv
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+env_path = os.path.join(current_dir, '.env')
+
+load_dotenv(env_path)
+
+class Settings(BaseSettings):
+    APP_NAME: str = "AI-Powered Project Management System"
+    API_V1_PREFIX: str = "/api/v1"
+    DATABASE_URL: str = "sqlite:///./test.db"
+    ALLOWED_ORIGINS: list = ["http://localhost:3000"]
+    OPENAI_API_KEY: Optional[str] = None
+    GROQ_API_KEY: Optional[str] = None
+    VECTOR_STORE_PATH: str = "./vector_index"
+    VECTOR_STORE_KEEP_SNAPSHOTS: int = 3
+    VECTOR_STORE_MEMORY_BUDGET_MB: float = 512
+    VECTOR_STORE_COMPACTION_THRESHOLD: float = 0.2
+    VECTOR_STORE_SEARCH_WORKERS: int = 4
+    VECTOR_STORE_ROLE: str = "writer"
+    VECTOR_STORE_PUBLISH_INTERVAL: float = 5.0
+    VECTOR_STORE_REFRESH_INTERVAL: float = 2.0
+    VECTOR_STORE_WAL: bool = True
+    VECTOR_STORE_WAL_FSYNC: bool = False
+    ANN_IVF_MIN_VECTORS: int = 20000
+    ANN_HNSW_MIN_VECTORS: int = 500000
+    ANN_IVF_NPROBE: int = 16
+    ANN_HNSW_M: int = 32
+    ANN_HNSW_EF_SEARCH: int = 64
+    VECTOR_STORE_QUANTIZATION: Optional[str] = None
+    VECTOR_STORE_DOCUMENTS_ON_DISK: bool = False
+    ANN_QUANTIZE_MIN_VECTORS: int = 10000
+    ANN_PQ_BYTES: int = 48
+    EMBEDDING_BACKEND: str = "ollama"
+    EMBEDDING_MODEL: str = "all-minilm"
+    EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WAIT_MS: float = 5
+    EMBEDDING_CACHE_PATH: str = "./vector_index/embeddings.sqlite3"
+    EMBEDDING_CACHE_SIZE: int = 10000
+    RAG_HYBRID_SEARCH: bool = False
+    RAG_HYBRID_FETCH_K: int = 20
+    NEIGHBOR_GRAPH_K: int = 10
+    PROJECT_CACHE_SIZE: int = 256
+    PROJECT_CACHE_TTL: Optional[float] = 60
+    PROJECT_VERSIONS_PATH: str = "./vector_index/project_versions.sqlite3"
+    ASSIGNMENT_CAPACITY_HOURS: float = 40.0
+    LLM_MODEL: str = "mixtral-8x7b-32768"
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_TIMEOUT: float = 60.0
+    LLM_CONCURRENCY: Dict[str, int] = {}
+    LLM_DEFAULT_CONCURRENCY: int = 8
+    LLM_CACHE: bool = True
+    LLM_CACHE_PATH: str = "./vector_index/llm_cache.sqlite3"
+    LLM_CACHE_SIZE: int = 1024
+    LLM_CACHE_TTL: Optional[float] = 86400
+    AI_CHAT_CACHE: bool = True
+    AI_CHAT_CACHE_THRESHOLD: float = 0.92
+    AI_CHAT_CACHE_SIZE: int = 128
+    AI_CHAT_CACHE_PROJECTS: int = 256
+    AI_CHAT_CACHE_TTL: Optional[float] = 300
+    INDEXER_BATCH_SIZE: int = 64
+    INDEXER_FLUSH_INTERVAL: float = 0.5
+
+    class Config:
+        env_file = env_path
+        env_file_encoding = 'utf-8'
+
+settings = Settings()
+
+print("Debug information:")
+print(f"Current directory: {current_dir}")
+print(f".env file path: {env_path}")
+print(f".env file exists: {os.path.exists(env_path)}")
+print(f"GROQ_API_KEY from settings: {'Set' if settings.GROQ_API_KEY else 'Not set'}")
+print(f"GROQ_API_KEY from os.environ: {'Set' if os.environ.get('GROQ_API_KEY') else 'Not set'}")
+
+
+if settings.GROQ_API_KEY is None:
+    print("Warning: GROQ_API_KEY is not set in settings. Attempting to get it from os.environ.")
+    settings.GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+
+if settings.GROQ_API_KEY is None:
+    print("Warning: GROQ_API_KEY is not set. Some features may not work properly.")
+else:
     print("GROQ_API_KEY is set successfully.")
\ No newline at end of file
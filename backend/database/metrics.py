@@ -0,0 +1,54 @@
+from typing import Any, Dict, List
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from . import models
+
+COMPLETED = "Completed"
+
+
+def project_metrics(db: Session, project_id: int) -> Dict[str, Any]:
+    """Task totals and durations of a project, aggregated in SQL in a single query.
+
+    Returns the same keys as `helpers.calculate_project_metrics`; a task's duration is its actual
+    duration, or its estimate while it has none, and tasks with neither count as zero.
+    """
+    total_tasks, completed_tasks, total_duration = (
+        db.query(
+            func.count(models.Task.id),
+            func.sum(case((models.Task.status == COMPLETED, 1), else_=0)),
+            func.sum(func.coalesce(models.Task.actual_duration, models.Task.estimated_duration, 0)),
+        )
+        .filter(models.Task.project_id == project_id)
+        .one()
+    )
+    completed_tasks = completed_tasks or 0
+    total_duration = float(total_duration or 0)
+    return {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'completion_rate': completed_tasks / total_tasks if total_tasks > 0 else 0,
+        'total_duration': total_duration,
+        'average_task_duration': total_duration / total_tasks if total_tasks > 0 else 0
+    }
+
+
+def member_workloads(db: Session, member_ids: List[int]) -> Dict[int, float]:
+    """Estimated hours of the open (not completed) tasks assigned to each member, across projects."""
+    if not member_ids:
+        return {}
+    rows = (
+        db.query(models.Task.assigned_to_id, func.sum(func.coalesce(models.Task.estimated_duration, 0)))
+        .filter(models.Task.assigned_to_id.in_(member_ids), models.Task.status != COMPLETED)
+        .group_by(models.Task.assigned_to_id)
+        .all()
+    )
+    return {member_id: float(hours or 0) for member_id, hours in rows}
+
+
+def team_performance(db: Session, project_id: int) -> Dict[str, Any]:
+    metrics = project_metrics(db, project_id)
+    return {
+        "task_completion_rate": metrics["completion_rate"],
+        "total_tasks": metrics["total_tasks"],
+        "completed_tasks": metrics["completed_tasks"]
+    }
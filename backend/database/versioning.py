@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+from backend.ai_engine.utils.concurrency import Lazy
+from backend.config import settings
+
+# Version counter per project, bumped by every CRUD write that changes what the AI engine reads
+# about the project: its row, its tasks or its team roster. Caches key derived data by
+# (project ID, version), so a write makes every older entry unreachable without tracking them.
+
+# Rows of projects that are not stored (None) use this key.
+NO_PROJECT = -1
+
+
+class ProjectVersions:
+    """Project version counters in a SQLite file, shared by every worker process of the app.
+
+    A write in one worker bumps the counter that every other worker reads on its next cache
+    lookup, so no process serves data cached before another one's write.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def get(self, project_id: Optional[int]) -> int:
+        with self._lock:
+            row = self._connection().execute("SELECT version FROM versions WHERE project_id = ?", (_key(project_id),)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, project_id: Optional[int]) -> int:
+        with self._lock:
+            db = self._connection()
+            # IMMEDIATE takes the write lock up front, so concurrent bumps from other processes serialize.
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT OR IGNORE INTO versions (project_id, version) VALUES (?, 0)", (_key(project_id),))
+                db.execute("UPDATE versions SET version = version + 1 WHERE project_id = ?", (_key(project_id),))
+                version = db.execute("SELECT version FROM versions WHERE project_id = ?", (_key(project_id),)).fetchone()[0]
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return version
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS versions (project_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+        return self._db
+
+
+def _key(project_id: Optional[int]) -> int:
+    return NO_PROJECT if project_id is None else project_id
+
+
+_versions = Lazy(lambda: ProjectVersions(settings.PROJECT_VERSIONS_PATH))
+
+
+def project_version(project_id: Optional[int]) -> int:
+    return _versions.get(project_id)
+
+
+def bump_project_version(project_id: Optional[int]) -> int:
+    return _versions.bump(project_id)
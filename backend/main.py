@@ -1,34 +1,67 @@
-
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from .config import settings
-from .api.routes import router as api_router
-from .database.database import engine
-from .database import models
-from .ai_engine.rag.vector_store import vector_store
-from .database.models import Base, User, Project, Task, TeamMember
-
-Base.metadata.create_all(bind=engine)
-app = FastAPI(
-    title=settings.APP_NAME,
-    description="AI-powered project management system with RAG",
-    version="1.0.0",
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(api_router, prefix=settings.API_V1_PREFIX)
-
-@app.get("/")
-async def root():
-    return {"message": f"Welcome to the {settings.APP_NAME} API"}
-
-if __name__ == "__main__":
-    import uvicorn
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from .config import settings
+from .api.routes import router as api_router
+from .database.database import engine, SessionLocal
+from .database import models
+from .ai_engine.rag.vector_store import vector_store
+from .ai_engine.rag.indexer import indexer
+from .ai_engine.rag.neighbors import neighbor_graphs
+from .ai_engine.llm.registry import llm_registry
+from .database.models import Base, User, Project, Task, TeamMember
+
+Base.metadata.create_all(bind=engine)
+app = FastAPI(
+    title=settings.APP_NAME,
+    description="AI-powered project management system with RAG",
+    version="1.0.0",
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(api_router, prefix=settings.API_V1_PREFIX)
+
+@app.on_event("startup")
+def index_existing_records():
+    # Opening the store here, not at import, is what claims the writer role for this process.
+    # Reader workers leave indexing to the writer process and only forward their writes to it.
+    if vector_store.read_only:
+        return
+    # Without a snapshot to start from, backfill the index from the database in the background.
+    if vector_store.vector_store is None:
+        db = SessionLocal()
+        try:
+            indexer.enqueue_all(db)
+        finally:
+            db.close()
+    # Drains writes forwarded by reader workers and publishes new snapshot generations.
+    indexer.start()
+
+@app.on_event("shutdown")
+def save_vector_store():
+    if indexer.built:
+        indexer.stop()
+    if neighbor_graphs.built:
+        neighbor_graphs.close()
+    if vector_store.built:
+        vector_store.save_snapshot()
+        vector_store.close()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await llm_registry.aclose()
+
+@app.get("/")
+async def root():
+    return {"message": f"Welcome to the {settings.APP_NAME} API"}
+
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,11 @@
+import pytest
+from unittest.mock import patch
+from backend.config import settings
+
+
+@pytest.fixture(autouse=True, scope="session")
+def vector_store_path(tmp_path_factory):
+    # The app's vector store is built on first use; keep it off ./vector_index, where a running server holds the writer role.
+    path = tmp_path_factory.mktemp("vector_index")
+    with patch.multiple(settings, VECTOR_STORE_PATH=str(path), PROJECT_VERSIONS_PATH=str(path / "project_versions.sqlite3")):
+        yield
@@ -1,95 +1,298 @@
-import pytest
-from unittest.mock import Mock, patch
-from backend.ai_engine.agents.task_agent import TaskAgent
-from backend.ai_engine.agents.priority_agent import PriorityAgent
-from backend.ai_engine.agents.suggestion_agent import SuggestionAgent
-from backend.ai_engine.agents.report_agent import ReportAgent
-from backend.ai_engine.agents.collaboration_agent import CollaborationAgent
-
-@pytest.fixture
-def mock_retriever():
-    return Mock()
-
-def test_task_agent(mock_retriever):
-    with patch('backend.ai_engine.agents.task_agent.Retriever', return_value=mock_retriever):
-        task_agent = TaskAgent()
-        mock_retriever.get_similar_tasks.return_value = [{"title": "Similar Task", "description": "A similar task"}]
-        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
-        
-        task = task_agent.create_task("Create a new feature", project_id=1)
-        
-        assert "title" in task
-        assert "estimated_duration" in task
-        assert "required_skills" in task
-        assert task["status"] == "New"
-
-def test_priority_agent(mock_retriever):
-    with patch('backend.ai_engine.agents.priority_agent.Retriever', return_value=mock_retriever):
-        priority_agent = PriorityAgent()
-        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
-        mock_retriever.get_similar_tasks_priorities.return_value = [{"title": "Similar Task", "priority": "High"}]
-        
-        task = {
-            "title": "Implement user authentication",
-            "estimated_duration": 16,
-            "required_skills": ["Python", "Security"]
-        }
-        priority_info = priority_agent.assign_priority(task, project_id=1)
-        
-        assert "priority" in priority_info
-        assert "reasoning" in priority_info
-
-def test_suggestion_agent(mock_retriever):
-    with patch('backend.ai_engine.agents.suggestion_agent.Retriever', return_value=mock_retriever):
-        suggestion_agent = SuggestionAgent()
-        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
-        mock_retriever.get_similar_completed_tasks.return_value = [{"title": "Similar Task", "description": "A completed similar task"}]
-        mock_retriever.get_team_skills.return_value = {"Alice": ["Python", "JavaScript"], "Bob": ["Java", "C++"]}
-        
-        task = {
-            "title": "Implement data visualization",
-            "estimated_duration": 24,
-            "required_skills": ["Python", "D3.js"]
-        }
-        suggestions = suggestion_agent.generate_suggestions(task, project_id=1)
-        
-        assert "suggestions" in suggestions
-        assert "resources" in suggestions
-
-def test_report_agent(mock_retriever):
-    with patch('backend.ai_engine.agents.report_agent.Retriever', return_value=mock_retriever):
-        report_agent = ReportAgent()
-        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
-        mock_retriever.get_project_tasks.return_value = [
-            {"title": "Task 1", "status": "Completed"},
-            {"title": "Task 2", "status": "In Progress"}
-        ]
-        mock_retriever.get_team_performance.return_value = {"task_completion_rate": 0.5}
-        mock_retriever.get_similar_projects.return_value = [{"name": "Similar Project", "description": "A similar project"}]
-        
-        report = report_agent.generate_report(project_id=1)
-        
-        assert "summary" in report
-        assert "key_metrics" in report
-        assert "risks" in report
-        assert "recommendations" in report
-
-def test_collaboration_agent(mock_retriever):
-    with patch('backend.ai_engine.agents.collaboration_agent.Retriever', return_value=mock_retriever):
-        collaboration_agent = CollaborationAgent()
-        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
-        mock_retriever.get_available_team_members.return_value = [
-            {"name": "Alice", "skills": ["Python", "JavaScript"]},
-            {"name": "Bob", "skills": ["Java", "C++"]}
-        ]
-        mock_retriever.get_similar_collaborations.return_value = [{"task": "Similar Task", "collaboration": "Previous collaboration info"}]
-        
-        task = {
-            "title": "Develop API",
-            "estimated_duration": 40,
-            "required_skills": ["Python", "RESTful API"]
-        }
-        collaboration_info = collaboration_agent.suggest_collaboration(task, project_id=1)
-        
-        assert "team_formation" in collaboration_info
-        assert "communication_plan" in collaboration_info
\ No newline at end of file
+import pytest
+from unittest.mock import Mock, patch
+from backend.ai_engine.agents.task_agent import TaskAgent
+from backend.ai_engine.agents.priority_agent import PriorityAgent
+from backend.ai_engine.agents.suggestion_agent import SuggestionAgent
+from backend.ai_engine.agents.report_agent import ReportAgent
+from backend.ai_engine.agents.collaboration_agent import CollaborationAgent
+from backend.ai_engine.llm.registry import LLMRegistry
+from backend.ai_engine.llm.cache import ResponseCache
+from backend.ai_engine.llm.semantic_cache import SemanticAnswerCache
+from backend.ai_engine.agents.ai_assistant import AIAssistant
+
+@pytest.fixture
+def mock_retriever():
+    return Mock()
+
+def test_task_agent(mock_retriever):
+    with patch('backend.ai_engine.agents.task_agent.Retriever', return_value=mock_retriever):
+        task_agent = TaskAgent()
+        mock_retriever.get_similar_tasks.return_value = [{"title": "Similar Task", "description": "A similar task"}]
+        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
+        
+        task = task_agent.create_task("Create a new feature", project_id=1)
+        
+        assert "title" in task
+        assert "estimated_duration" in task
+        assert "required_skills" in task
+        assert task["status"] == "New"
+
+def test_priority_agent(mock_retriever):
+    with patch('backend.ai_engine.agents.priority_agent.Retriever', return_value=mock_retriever):
+        priority_agent = PriorityAgent()
+        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
+        mock_retriever.get_similar_tasks_priorities.return_value = [{"title": "Similar Task", "priority": "High"}]
+        
+        task = {
+            "title": "Implement user authentication",
+            "estimated_duration": 16,
+            "required_skills": ["Python", "Security"]
+        }
+        priority_info = priority_agent.assign_priority(task, project_id=1)
+        
+        assert "priority" in priority_info
+        assert "reasoning" in priority_info
+
+def test_suggestion_agent(mock_retriever):
+    with patch('backend.ai_engine.agents.suggestion_agent.Retriever', return_value=mock_retriever):
+        suggestion_agent = SuggestionAgent()
+        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
+        mock_retriever.get_similar_completed_tasks.return_value = [{"title": "Similar Task", "description": "A completed similar task"}]
+        mock_retriever.get_team_skills.return_value = {"Alice": ["Python", "JavaScript"], "Bob": ["Java", "C++"]}
+        
+        task = {
+            "title": "Implement data visualization",
+            "estimated_duration": 24,
+            "required_skills": ["Python", "D3.js"]
+        }
+        suggestions = suggestion_agent.generate_suggestions(task, project_id=1)
+        
+        assert "suggestions" in suggestions
+        assert "resources" in suggestions
+
+def test_report_agent(mock_retriever):
+    with patch('backend.ai_engine.agents.report_agent.Retriever', return_value=mock_retriever):
+        report_agent = ReportAgent()
+        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
+        mock_retriever.get_project_tasks.return_value = [
+            {"title": "Task 1", "status": "Completed"},
+            {"title": "Task 2", "status": "In Progress"}
+        ]
+        mock_retriever.get_team_performance.return_value = {"task_completion_rate": 0.5}
+        mock_retriever.get_similar_projects.return_value = [{"name": "Similar Project", "description": "A similar project"}]
+        
+        report = report_agent.generate_report(project_id=1)
+        
+        assert "summary" in report
+        assert "key_metrics" in report
+        assert "risks" in report
+        assert "recommendations" in report
+
+def test_collaboration_agent(mock_retriever):
+    with patch('backend.ai_engine.agents.collaboration_agent.Retriever', return_value=mock_retriever):
+        collaboration_agent = CollaborationAgent()
+        mock_retriever.get_project_context.return_value = {"name": "Test Project", "description": "A test project"}
+        mock_retriever.get_available_team_members.return_value = [
+            {"name": "Alice", "skills": ["Python", "JavaScript"]},
+            {"name": "Bob", "skills": ["Java", "C++"]}
+        ]
+        mock_retriever.get_similar_collaborations.return_value = [{"task": "Similar Task", "collaboration": "Previous collaboration info"}]
+        
+        task = {
+            "title": "Develop API",
+            "estimated_duration": 40,
+            "required_skills": ["Python", "RESTful API"]
+        }
+        collaboration_info = collaboration_agent.suggest_collaboration(task, project_id=1)
+        
+        assert "team_formation" in collaboration_info
+        assert "communication_plan" in collaboration_info
+
+def test_llm_registry_shares_clients_and_limits_concurrency():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from langchain_groq import ChatGroq
+
+    registry = LLMRegistry(api_key="test-key", concurrency={"model-a": 2})
+    first, second = registry.get("model-a"), registry.get("model-a")
+    assert first.client is second.client
+    assert registry.get("model-a", temperature=0.5).client is not first.client
+    assert registry.get("model-b").client.http_client is first.client.http_client
+
+    running, peak, lock = [0], [0], threading.Lock()
+    def fake_invoke(self, messages, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return messages
+
+    with patch.object(ChatGroq, "invoke", fake_invoke), ThreadPoolExecutor(6) as pool:
+        assert list(pool.map(first.invoke, range(6))) == list(range(6))
+    assert peak[0] == 2
+    assert registry.stats()["models"]["model-a"] == {"limit": 2, "active": 0, "calls": 6}
+
+    import asyncio
+    pool = registry._async_pool()
+    asyncio.run(registry.aclose())
+    assert pool.is_closed and registry._http_client is None
+
+def test_async_callers_wait_for_a_model_slot_without_a_thread():
+    import asyncio
+    import threading
+    from langchain_groq import ChatGroq
+
+    registry = LLMRegistry(api_key="test-key", concurrency={"model-a": 1})
+    chat = registry.get("model-a")
+    running, peak = [0], [0]
+    async def fake_ainvoke(self, messages, **kwargs):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return messages
+
+    async def run():
+        threads = threading.active_count()
+        calls = [asyncio.ensure_future(chat.ainvoke(n)) for n in range(5)]
+        await asyncio.sleep(0.005)
+        assert threading.active_count() == threads
+        # A cancelled waiter gives up its place without taking a slot.
+        calls[-1].cancel()
+        return await asyncio.gather(*calls[:-1])
+
+    with patch.object(ChatGroq, "ainvoke", fake_ainvoke):
+        assert asyncio.run(run()) == [0, 1, 2, 3]
+    assert peak[0] == 1
+    assert registry.stats()["models"]["model-a"] == {"limit": 1, "active": 0, "calls": 4}
+
+def test_llm_response_cache_serves_repeated_prompts(tmp_path):
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+    from langchain_groq import ChatGroq
+
+    path = str(tmp_path / "llm_cache.sqlite3")
+    calls = []
+    def fake_invoke(self, messages, **kwargs):
+        calls.append(messages)
+        return AIMessage(content=f"answer {len(calls)}")
+
+    with patch.object(ChatGroq, "invoke", fake_invoke):
+        registry = LLMRegistry(api_key="test-key", response_cache=ResponseCache(path, memory_size=8, ttl=60))
+        cached, uncached = registry.get("model-a", cache=True), registry.get("model-a")
+        prompt = [SystemMessage(content="Prioritize."), HumanMessage(content="Task:  Design a logo\n")]
+        assert cached.invoke(prompt).content == "answer 1"
+        assert cached.invoke([SystemMessage(content="Prioritize."), HumanMessage(content="Task: Design a logo")]).content == "answer 1"
+        assert uncached.invoke(prompt).content == "answer 2"
+        assert registry.get("model-a", temperature=0.5, cache=True).invoke(prompt).content == "answer 3"
+
+        restarted = LLMRegistry(api_key="test-key", response_cache=ResponseCache(path, memory_size=8, ttl=60))
+        assert restarted.get("model-a", cache=True).invoke(prompt).content == "answer 1"
+        assert restarted.stats()["response_cache"]["disk_hits"] == 1
+        expired = LLMRegistry(api_key="test-key", response_cache=ResponseCache(path, memory_size=8, ttl=0))
+        assert expired.get("model-a", cache=True).invoke(prompt).content == "answer 4"
+    assert len(calls) == 4
+    assert registry.stats()["response_cache"]["hit_rate"] == 1 / 3
+
+def test_async_response_cache_keeps_sqlite_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+    from langchain_core.messages import AIMessage
+    from langchain_groq import ChatGroq
+
+    cache = ResponseCache(str(tmp_path / "llm_cache.sqlite3"), memory_size=8, ttl=60)
+    disk_threads = []
+    for name in ("_load", "_store"):
+        method = getattr(cache, name)
+        def on_disk(*args, method=method):
+            disk_threads.append(threading.current_thread())
+            return method(*args)
+        setattr(cache, name, on_disk)
+
+    async def fake_ainvoke(self, messages, **kwargs):
+        return AIMessage(content="answer")
+
+    chat = LLMRegistry(api_key="test-key", response_cache=cache).get("model-a", cache=True)
+    with patch.object(ChatGroq, "ainvoke", fake_ainvoke):
+        assert asyncio.run(chat.ainvoke("Prioritize the logo")).content == "answer"
+        assert asyncio.run(chat.ainvoke("Prioritize the logo")).content == "answer"
+    assert len(disk_threads) == 2 and threading.main_thread() not in disk_threads
+    assert cache.stats()["memory_hits"] == 1
+
+def test_ai_assistant_reuses_answers_to_similar_questions(mock_retriever):
+    from langchain_core.messages import AIMessage
+    from backend.ai_engine.rag.embeddings import HashingEmbeddings
+    from backend.database.versioning import bump_project_version
+
+    mock_retriever.get_project_context.return_value = {"name": "Test Project"}
+    mock_retriever.get_related_information.return_value = []
+    cache = SemanticAnswerCache(HashingEmbeddings(256), threshold=0.8, max_entries_per_project=2)
+    assistant = AIAssistant(mock_retriever, answer_cache=cache)
+    answers = iter(["first", "second", "third", "fourth"])
+    assistant.llm = Mock(invoke=lambda messages: AIMessage(content=next(answers)))
+
+    assert assistant.answer_question(41, "Who is working on the login page?") == "first"
+    assert assistant.answer_question(41, "who is working on the login page") == "first"
+    assert assistant.answer_question(42, "Who is working on the login page?") == "second"
+    assert assistant.answer_question(41, "Who is working on the login page?", use_cache=False) == "third"
+    assert assistant.answer_question(41, "Who is working on the login page?") == "third"
+    bump_project_version(41)
+    assert assistant.answer_question(41, "Who is working on the login page?") == "fourth"
+    assert cache.stats()["hits"] == 2 and cache.stats()["entries"] == 2
+
+def test_semantic_answers_expire_and_follow_the_vector_store_revision():
+    import time
+    from backend.ai_engine.rag.embeddings import HashingEmbeddings
+
+    store = Mock()
+    store.store_revision.return_value = (1, 5)
+    cache = SemanticAnswerCache(HashingEmbeddings(256), threshold=0.8, ttl=60, vector_store=store)
+    vector = cache.embed("Who is working on the login page?")
+
+    # Given from the index before the indexer applied a write: never cached.
+    version = cache.version(43)
+    store.store_revision.return_value = (1, 6)
+    cache.store(43, vector, "stale", version)
+    assert cache.lookup(43, vector) is None
+
+    cache.store(43, vector, "fresh", cache.version(43))
+    assert cache.lookup(43, vector) == "fresh"
+    with patch("backend.ai_engine.llm.semantic_cache.time.time", return_value=time.time() + 61):
+        assert cache.lookup(43, vector) is None
+    store.store_revision.return_value = (1, 7)
+    assert cache.lookup(43, vector) is None
+
+def test_report_agent_streams_sections_as_they_complete(mock_retriever):
+    from langchain_core.messages import AIMessageChunk
+
+    mock_retriever.get_project_context.return_value = {"name": "Test Project"}
+    mock_retriever.get_project_metrics.return_value = {"total_tasks": 1, "completion_rate": 1.0}
+    mock_retriever.get_similar_projects.return_value = []
+    mock_retriever.get_skill_matcher.return_value = None
+    pieces = ['```json\n{"summary": "On ', 'track.", "key_metrics": {"completion_rate": 0.5}, ',
+              '"risks": ["Scope"], "recommendations": ', '["Ship"]}\n```']
+    agent = ReportAgent(mock_retriever)
+    agent.llm = Mock(stream=lambda messages: (AIMessageChunk(content=piece) for piece in pieces))
+
+    events = list(agent.stream_report([{"id": 1, "title": "Task 1", "status": "Completed", "project_id": 1}]))
+    kinds = [(event["type"], event.get("name")) for event in events]
+    assert kinds == [
+        ("token", None), ("token", None), ("section", "summary"),
+        ("token", None), ("section", "key_metrics"),
+        ("token", None), ("section", "risks"), ("section", "recommendations"), ("report", None),
+    ]
+    assert events[2]["value"] == "On track."
+    assert events[-1]["report"]["recommendations"] == ["Ship"]
+
+def test_priority_agent_runs_lookups_concurrently(mock_retriever):
+    import asyncio
+    import threading
+    from langchain_core.messages import AIMessage
+    from backend.ai_engine.rag.retriever import Retriever
+
+    # Each lookup waits for the other two, so this only finishes if all three run at once.
+    barrier = threading.Barrier(3, timeout=5)
+    mock_retriever.arun = lambda lookup, *args, **kwargs: Retriever.arun(mock_retriever, lookup, *args, **kwargs)
+    mock_retriever.get_project_context.side_effect = lambda project_id: barrier.wait() and {"name": "Test Project"}
+    mock_retriever.get_retrieval_bundle.side_effect = lambda *args, **kwargs: barrier.wait() and {"similar_tasks_priorities": []}
+    mock_retriever.get_team_skills.side_effect = lambda project_id: barrier.wait() and {}
+    agent = PriorityAgent(mock_retriever)
+
+    async def ainvoke(messages):
+        return AIMessage(content='{"priority": "High", "reasoning": "Blocks the release."}')
+    agent.llm = Mock(ainvoke=ainvoke)
+
+    task = {"id": 3, "title": "Fix login", "description": "Fix login", "estimated_duration": 4, "required_skills": ["Python"], "project_id": 1}
+    assert asyncio.run(agent.aassign_priority(task)) == {"priority": "High", "reasoning": "Blocks the release."}
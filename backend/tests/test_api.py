@@ -1,154 +1,239 @@
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from backend.database.database import Base
-from backend.main import app
-from backend.api.dependencies import get_db, get_current_active_user
-from backend.database import crud, schemas
-import pytest
-from unittest.mock import Mock
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-# Mock the current user for testing
-mock_user = schemas.User(id=1, username="testuser", email="test@example.com", is_active=True)
-app.dependency_overrides[get_current_active_user] = lambda: mock_user
-
-client = TestClient(app)
-
-@pytest.fixture(autouse=True)
-def setup_db():
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-def test_create_project():
-    response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert data["name"] == "Test Project"
-    assert "id" in data
-
-def test_read_projects():
-    # Create a few projects first
-    client.post("/api/v1/projects/", json={"name": "Project 1", "description": "Description 1"})
-    client.post("/api/v1/projects/", json={"name": "Project 2", "description": "Description 2"})
-
-    response = client.get("/api/v1/projects/")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) >= 2
-
-def test_read_project():
-    # First, create a project
-    create_response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    project_id = create_response.json()["id"]
-
-    # Then, read the project
-    read_response = client.get(f"/api/v1/projects/{project_id}")
-    assert read_response.status_code == 200
-    data = read_response.json()
-    assert data["name"] == "Test Project"
-    assert data["id"] == project_id
-
-def test_create_task():
-    # First, create a project
-    project_response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    project_id = project_response.json()["id"]
-
-    # Then, create a task
-    task_response = client.post(
-        f"/api/v1/projects/{project_id}/tasks/",
-        json={"description": "Test task description"}
-    )
-    assert task_response.status_code == 200
-    data = task_response.json()
-    assert "title" in data
-    assert data["project_id"] == project_id
-
-def test_read_tasks():
-    # First, create a project
-    project_response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    project_id = project_response.json()["id"]
-
-    # Create a few tasks
-    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 1"})
-    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 2"})
-
-    # Read tasks
-    response = client.get(f"/api/v1/projects/{project_id}/tasks/")
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-    assert len(data) >= 2
-
-def test_generate_project_report():
-    # First, create a project
-    project_response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    project_id = project_response.json()["id"]
-
-    # Create some tasks
-    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 1"})
-    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 2"})
-
-    # Generate report
-    response = client.post(f"/api/v1/projects/{project_id}/report/")
-    assert response.status_code == 200
-    data = response.json()
-    assert "summary" in data
-    assert "key_metrics" in data
-    assert "risks" in data
-    assert "recommendations" in data
-
-def test_nonexistent_project():
-    response = client.get("/api/v1/projects/9999")
-    assert response.status_code == 404
-
-def test_unauthorized_access():
-    # Create a project
-    project_response = client.post(
-        "/api/v1/projects/",
-        json={"name": "Test Project", "description": "A test project"}
-    )
-    project_id = project_response.json()["id"]
-
-    # Mock a different user
-    different_user = schemas.User(id=2, username="otheruser", email="other@example.com", is_active=True)
-    app.dependency_overrides[get_current_active_user] = lambda: different_user
-
-    # Try to access the project
-    response = client.get(f"/api/v1/projects/{project_id}")
-    assert response.status_code == 403
-
-    # Reset the mock
-    app.dependency_overrides[get_current_active_user] = lambda: mock_user
\ No newline at end of file
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.database.database import Base
+from backend.main import app
+from backend.api.dependencies import get_db, get_current_active_user
+from backend.database import crud, metrics, models, schemas
+import pytest
+from unittest.mock import Mock, patch
+import json
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base.metadata.create_all(bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+
+# Mock the current user for testing
+mock_user = schemas.User(id=1, username="testuser", email="test@example.com", is_active=True)
+app.dependency_overrides[get_current_active_user] = lambda: mock_user
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_create_project():
+    response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["name"] == "Test Project"
+    assert "id" in data
+
+def test_read_projects():
+    # Create a few projects first
+    client.post("/api/v1/projects/", json={"name": "Project 1", "description": "Description 1"})
+    client.post("/api/v1/projects/", json={"name": "Project 2", "description": "Description 2"})
+
+    response = client.get("/api/v1/projects/")
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) >= 2
+
+def test_read_project():
+    # First, create a project
+    create_response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    project_id = create_response.json()["id"]
+
+    # Then, read the project
+    read_response = client.get(f"/api/v1/projects/{project_id}")
+    assert read_response.status_code == 200
+    data = read_response.json()
+    assert data["name"] == "Test Project"
+    assert data["id"] == project_id
+
+def test_create_task():
+    # First, create a project
+    project_response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    project_id = project_response.json()["id"]
+
+    # Then, create a task
+    task_response = client.post(
+        f"/api/v1/projects/{project_id}/tasks/",
+        json={"description": "Test task description"}
+    )
+    assert task_response.status_code == 200
+    data = task_response.json()
+    assert "title" in data
+    assert data["project_id"] == project_id
+
+def test_read_tasks():
+    # First, create a project
+    project_response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    project_id = project_response.json()["id"]
+
+    # Create a few tasks
+    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 1"})
+    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 2"})
+
+    # Read tasks
+    response = client.get(f"/api/v1/projects/{project_id}/tasks/")
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) >= 2
+
+def test_generate_project_report():
+    # First, create a project
+    project_response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    project_id = project_response.json()["id"]
+
+    # Create some tasks
+    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 1"})
+    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"description": "Task 2"})
+
+    # Generate report
+    response = client.post(f"/api/v1/projects/{project_id}/report/")
+    assert response.status_code == 200
+    data = response.json()
+    assert "summary" in data
+    assert "key_metrics" in data
+    assert "risks" in data
+    assert "recommendations" in data
+
+def test_nonexistent_project():
+    response = client.get("/api/v1/projects/9999")
+    assert response.status_code == 404
+
+def test_unauthorized_access():
+    # Create a project
+    project_response = client.post(
+        "/api/v1/projects/",
+        json={"name": "Test Project", "description": "A test project"}
+    )
+    project_id = project_response.json()["id"]
+
+    # Mock a different user
+    different_user = schemas.User(id=2, username="otheruser", email="other@example.com", is_active=True)
+    app.dependency_overrides[get_current_active_user] = lambda: different_user
+
+    # Try to access the project
+    response = client.get(f"/api/v1/projects/{project_id}")
+    assert response.status_code == 403
+
+    # Reset the mock
+    app.dependency_overrides[get_current_active_user] = lambda: mock_user
+
+def test_project_metrics_are_aggregated_in_sql():
+    db = TestingSessionLocal()
+    try:
+        project = models.Project(name="Metrics", status="Active")
+        db.add(project)
+        db.flush()
+        db.add_all([
+            models.Task(title="A", status="Completed", estimated_duration=4, actual_duration=6, project_id=project.id),
+            models.Task(title="B", status="Completed", estimated_duration=2, project_id=project.id),
+            models.Task(title="C", status="New", project_id=project.id),
+        ])
+        db.commit()
+
+        result = metrics.project_metrics(db, project.id)
+        assert result["total_tasks"] == 3 and result["completed_tasks"] == 2
+        assert result["total_duration"] == 8 and result["average_task_duration"] == 8 / 3
+        assert metrics.team_performance(db, project.id)["task_completion_rate"] == 2 / 3
+        assert metrics.project_metrics(db, project.id + 1)["completion_rate"] == 0
+    finally:
+        db.close()
+
+def test_assign_tasks_balances_skill_fit_under_capacity():
+    project_id = client.post("/api/v1/projects/", json={"name": "Assign", "description": "Bulk assignment"}).json()["id"]
+    members = {}
+    for name, skills in [("Alice", ["Python"]), ("Bob", ["Design"])]:
+        member = client.post("/api/v1/team-members/", json={"name": name, "email": f"{name.lower()}.assign@example.com", "skills": skills}).json()
+        client.post(f"/api/v1/projects/{project_id}/team-members/{member['id']}")
+        members[member["id"]] = name
+    task_ids = {}
+    for title, skills in [("API", ["Python"]), ("Logo", ["Design"]), ("CLI", ["Python"]), ("Docs", None)]:
+        task_ids[title] = client.post(f"/api/v1/projects/{project_id}/tasks/",
+                                      json={"title": title, "estimated_duration": 5, "required_skills": skills}).json()["id"]
+
+    response = client.post(f"/api/v1/projects/{project_id}/assign-tasks/?capacity=10")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["assignments"]) == 4 and data["unassigned_task_ids"] == []
+    assert sorted(data["workloads"].values()) == [10, 10]
+    logo = next(a for a in data["assignments"] if a["task_id"] == task_ids["Logo"])
+    assert logo["team_member_name"] == "Bob" and logo["fit"] == 1
+
+    tasks = client.get(f"/api/v1/projects/{project_id}/tasks/").json()
+    assert all(task["assigned_to_id"] in members for task in tasks)
+    assert client.post(f"/api/v1/projects/{project_id}/assign-tasks/").json()["assignments"] == []
+
+def test_ai_chat_stream_sends_tokens_as_server_sent_events():
+    from langchain_core.messages import AIMessageChunk
+    from backend.ai_engine.llm.registry import PooledChat
+
+    project_id = client.post("/api/v1/projects/", json={"name": "Stream", "description": "Streaming chat"}).json()["id"]
+    async def chunks(self, messages, **kwargs):
+        for text in ["Three ", "tasks."]:
+            yield AIMessageChunk(content=text)
+    with patch.object(PooledChat, "astream", chunks):
+        response = client.post(f"/api/v1/projects/{project_id}/ai-chat/stream/?format=sse",
+                               json={"question": "How many tasks are open?"}, headers={"X-AI-Cache": "bypass"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert [frame.split("\n")[0] for frame in frames] == ["event: token", "event: token", "event: done"]
+    assert json.loads(frames[-1].split("data: ", 1)[1])["answer"] == "Three tasks."
+    assert client.post(f"/api/v1/projects/{project_id}/ai-chat/stream/?format=xml", json={"question": "?"}).status_code == 400
+
+def test_report_stream_ends_with_an_error_when_generation_fails():
+    from langchain_core.messages import AIMessageChunk
+    from backend.ai_engine.llm.registry import PooledChat
+    from backend.ai_engine.rag.retriever import Retriever
+
+    project_id = client.post("/api/v1/projects/", json={"name": "Broken stream", "description": "Failing model"}).json()["id"]
+    client.post(f"/api/v1/projects/{project_id}/tasks/", json={"title": "Write docs", "status": "New"})
+    async def failing(self, messages, **kwargs):
+        yield AIMessageChunk(content='```json\n{"summary": "Half')
+        raise RuntimeError("connection reset")
+
+    with patch.object(PooledChat, "astream", failing):
+        events = [json.loads(line) for line in client.post(f"/api/v1/projects/{project_id}/report/stream/").text.splitlines()]
+    assert [event["type"] for event in events][:2] == ["token", "error"]
+    assert events[-1]["type"] == "report" and events[-1]["report"]["summary"].startswith("An error occurred")
+
+    # Context is gathered before the response starts, so failures there are a plain error response.
+    with patch.object(PooledChat, "astream", failing), patch.object(Retriever, "get_skill_matcher", side_effect=RuntimeError("db down")):
+        response = client.post(f"/api/v1/projects/{project_id}/report/stream/?format=sse")
+    assert response.status_code == 500 and "db down" in response.json()["detail"]
@@ -1,92 +1,556 @@
-import pytest
-from unittest.mock import Mock, patch
-from backend.ai_engine.rag.vector_store import VectorStore
-from backend.ai_engine.rag.retriever import Retriever
-
-@pytest.fixture
-def mock_db():
-    return Mock()
-
-@pytest.fixture
-def mock_vector_store():
-    with patch('backend.ai_engine.rag.vector_store.FAISS') as mock_faiss:
-        mock_vs = VectorStore()
-        mock_vs.vector_store = Mock()
-        yield mock_vs
-
-def test_vector_store_creation(mock_vector_store):
-    texts = ["Test document 1", "Test document 2"]
-    metadatas = [{"source": "test1"}, {"source": "test2"}]
-    
-    mock_vector_store.create_vector_store(texts, metadatas)
-    
-    mock_vector_store.vector_store.from_documents.assert_called_once()
-
-def test_vector_store_similarity_search(mock_vector_store):
-    mock_vector_store.vector_store.similarity_search.return_value = [
-        Mock(page_content="Similar document 1", metadata={"source": "test1"}),
-        Mock(page_content="Similar document 2", metadata={"source": "test2"})
-    ]
-    
-    results = mock_vector_store.similarity_search("test query", k=2)
-    
-    assert len(results) == 2
-    assert results[0].page_content == "Similar document 1"
-    assert results[1].metadata["source"] == "test2"
-
-def test_retriever_get_similar_tasks(mock_db):
-    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
-        mock_vs.similarity_search.return_value = [
-            Mock(metadata={"title": "Similar Task 1"}, page_content="Description 1"),
-            Mock(metadata={"title": "Similar Task 2"}, page_content="Description 2")
-        ]
-        
-        retriever = Retriever(mock_db)
-        similar_tasks = retriever.get_similar_tasks("New task description", project_id=1, k=2)
-        
-        assert len(similar_tasks) == 2
-        assert similar_tasks[0]["title"] == "Similar Task 1"
-        assert similar_tasks[1]["description"] == "Description 2"
-
-def test_retriever_get_project_context(mock_db):
-    mock_db.query().filter().first.return_value = Mock(
-        name="Test Project",
-        description="A test project",
-        start_date="2023-01-01",
-        end_date="2023-12-31",
-        status="In Progress"
-    )
-    
-    retriever = Retriever(mock_db)
-    context = retriever.get_project_context(project_id=1)
-    
-    assert context["name"] == "Test Project"
-    assert context["status"] == "In Progress"
-
-def test_retriever_get_team_skills(mock_db):
-    mock_db.query().filter().all.return_value = [
-        Mock(name="Alice", skills=["Python", "JavaScript"]),
-        Mock(name="Bob", skills=["Java", "C++"])
-    ]
-    
-    retriever = Retriever(mock_db)
-    skills = retriever.get_team_skills(project_id=1)
-    
-    assert skills == {
-        "Alice": ["Python", "JavaScript"],
-        "Bob": ["Java", "C++"]
-    }
-
-def test_retriever_get_similar_projects(mock_db):
-    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
-        mock_vs.similarity_search.return_value = [
-            Mock(metadata={"name": "Similar Project 1"}, page_content="Description 1"),
-            Mock(metadata={"name": "Similar Project 2"}, page_content="Description 2")
-        ]
-        
-        retriever = Retriever(mock_db)
-        similar_projects = retriever.get_similar_projects(project_id=1, k=2)
-        
-        assert len(similar_projects) == 2
-        assert similar_projects[0]["name"] == "Similar Project 1"
-        assert similar_projects[1]["description"] == "Description 2"
+import asyncio
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from backend.ai_engine.rag.vector_store import VectorStore, InMemoryStore
+from backend.ai_engine.rag.retriever import Retriever, project_cache
+from backend.ai_engine.rag.indexer import BackgroundIndexer, EventSpool
+from backend.ai_engine.rag.neighbors import NeighborGraphs
+from backend.ai_engine.rag.skills import SkillMatcher, SkillVocabulary
+from backend.ai_engine.rag.embeddings import CachedEmbeddings, DynamicBatcher, HashingEmbeddings
+from backend.ai_engine.rag import ann
+from backend.ai_engine.rag.benchmark import run_benchmark, sample_queries, synthetic_vectors
+from backend.config import settings
+from backend.database.versioning import ProjectVersions, bump_project_version
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+@pytest.fixture
+def mock_db():
+    return Mock()
+
+@pytest.fixture
+def mock_vector_store():
+    with patch('backend.ai_engine.rag.vector_store.FAISS') as mock_faiss:
+        mock_vs = VectorStore()
+        mock_vs.vector_store = Mock()
+        yield mock_vs
+
+def test_vector_store_creation(mock_vector_store):
+    texts = ["Test document 1", "Test document 2"]
+    metadatas = [{"source": "test1"}, {"source": "test2"}]
+    
+    mock_vector_store.create_vector_store(texts, metadatas)
+    
+    mock_vector_store.vector_store.from_documents.assert_called_once()
+
+def test_vector_store_similarity_search(mock_vector_store):
+    mock_vector_store.vector_store.similarity_search.return_value = [
+        Mock(page_content="Similar document 1", metadata={"source": "test1"}),
+        Mock(page_content="Similar document 2", metadata={"source": "test2"})
+    ]
+    
+    results = mock_vector_store.similarity_search("test query", k=2)
+    
+    assert len(results) == 2
+    assert results[0].page_content == "Similar document 1"
+    assert results[1].metadata["source"] == "test2"
+
+def test_retriever_get_similar_tasks(mock_db):
+    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
+        mock_vs.similarity_search.return_value = [
+            Mock(metadata={"title": "Similar Task 1"}, page_content="Description 1"),
+            Mock(metadata={"title": "Similar Task 2"}, page_content="Description 2")
+        ]
+        
+        retriever = Retriever(mock_db)
+        similar_tasks = retriever.get_similar_tasks("New task description", project_id=1, k=2)
+        
+        assert len(similar_tasks) == 2
+        assert similar_tasks[0]["title"] == "Similar Task 1"
+        assert similar_tasks[1]["description"] == "Description 2"
+
+def test_retriever_get_project_context(mock_db):
+    mock_db.query().filter().first.return_value = Mock(
+        name="Test Project",
+        description="A test project",
+        start_date="2023-01-01",
+        end_date="2023-12-31",
+        status="In Progress"
+    )
+    
+    retriever = Retriever(mock_db)
+    context = retriever.get_project_context(project_id=1)
+    
+    assert context["name"] == "Test Project"
+    assert context["status"] == "In Progress"
+
+def test_retriever_get_team_skills(mock_db):
+    mock_db.query().filter().all.return_value = [
+        Mock(name="Alice", skills=["Python", "JavaScript"]),
+        Mock(name="Bob", skills=["Java", "C++"])
+    ]
+    
+    retriever = Retriever(mock_db)
+    skills = retriever.get_team_skills(project_id=1)
+    
+    assert skills == {
+        "Alice": ["Python", "JavaScript"],
+        "Bob": ["Java", "C++"]
+    }
+
+def test_retriever_get_similar_projects(mock_db):
+    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
+        mock_vs.similarity_search.return_value = [
+            Mock(metadata={"name": "Similar Project 1"}, page_content="Description 1"),
+            Mock(metadata={"name": "Similar Project 2"}, page_content="Description 2")
+        ]
+        
+        retriever = Retriever(mock_db)
+        similar_projects = retriever.get_similar_projects(project_id=1, k=2)
+        
+        assert len(similar_projects) == 2
+        assert similar_projects[0]["name"] == "Similar Project 1"
+        assert similar_projects[1]["description"] == "Description 2"
+
+def test_vector_store_snapshot_round_trip(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = VectorStore(embeddings=embeddings, snapshot_dir=str(tmp_path))
+    store.add_texts(["Design a new logo", "Write API documentation"], [{"title": "Logo"}, {"title": "Docs"}])
+    store.save_snapshot()
+
+    restored = VectorStore(embeddings=embeddings, snapshot_dir=str(tmp_path))
+    results = restored.similarity_search("Write API documentation", k=1)
+
+    assert restored.snapshot_version == 1
+    assert results[0].metadata["title"] == "Docs"
+
+    restored.add_texts(["Set up CI"], [{"title": "CI"}])
+    restored.save_snapshot()
+    assert restored.list_snapshots() == [1, 2]
+
+def test_background_indexer_batches_writes():
+    store = Mock()
+    indexer = BackgroundIndexer(store, batch_size=3, flush_interval=0.2)
+    for task_id in range(5):
+        indexer.enqueue_task(Mock(id=task_id, project_id=1, title=f"Task {task_id}", description=None, status="New", priority=None))
+    indexer.enqueue_task(Mock(id=4, project_id=1, title="Task 4 renamed", description=None, status="New", priority=None))
+    indexer.flush()
+    indexer.stop()
+
+    batches = [call.args[0] for call in store.add_texts.call_args_list]
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert batches[1] == ["Task 3", "Task 4 renamed"]
+
+def test_background_indexer_keeps_a_task_moved_back_in_one_batch():
+    store = Mock()
+    indexer = BackgroundIndexer(store, batch_size=10, flush_interval=0.2)
+    task = Mock(id=7, project_id=2, title="Logo", description=None, status="New", priority=None)
+    indexer.enqueue_task(task, previous_project_id=1)
+    task.project_id = 1
+    indexer.enqueue_task(task, previous_project_id=2)
+    indexer.flush()
+    indexer.stop()
+
+    assert [metadata["project_id"] for metadata in store.add_texts.call_args.args[1]] == [1]
+    assert [(call.args[0], call.kwargs["project_id"]) for call in store.delete.call_args_list] == [(["task:7"], 2)]
+
+def test_vector_store_partitions_by_project(tmp_path):
+    store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path), memory_budget_mb=0)
+    store.add_texts(
+        ["Design a new logo", "Write API documentation"],
+        [{"kind": "task", "project_id": 1, "title": "Logo"}, {"kind": "task", "project_id": 2, "title": "Docs"}]
+    )
+    assert list(store.partitions) == [2]
+
+    results = store.similarity_search("Write API documentation", k=3, project_id=1)
+    assert [doc.metadata["title"] for doc in results] == ["Logo"]
+    assert list(store.partitions) == [1]
+
+    results = store.similarity_search("Design a new logo", k=3, project_id=2)
+    assert [doc.metadata["title"] for doc in results] == ["Docs"]
+    assert store.similarity_search("Design a new logo", k=3, project_id=3) == []
+
+def test_cached_embeddings_only_embed_new_text(tmp_path):
+    base = Mock()
+    base.embed_documents.side_effect = lambda texts: [[float(len(text)), 1.0] for text in texts]
+    cache_path = str(tmp_path / "embeddings.sqlite3")
+
+    embeddings = CachedEmbeddings(base, "all-minilm", cache_path=cache_path)
+    first = embeddings.embed_documents(["Design logo", "Design  logo ", "Write docs"])
+    again = embeddings.embed_query("Write docs")
+
+    base.embed_documents.assert_called_once_with(["Design logo", "Write docs"])
+    assert first[0] == first[1]
+    assert again == first[2]
+
+    restarted = CachedEmbeddings(base, "all-minilm", cache_path=cache_path)
+    assert restarted.embed_documents(["Write docs"]) == [first[2]]
+    assert base.embed_documents.call_count == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+def test_vector_store_similarity_search_batch(tmp_path):
+    embeddings = Mock(wraps=DeterministicFakeEmbedding(size=16))
+    store = VectorStore(embeddings=embeddings, snapshot_dir=str(tmp_path))
+    store.add_texts(
+        ["Design a new logo", "Write API documentation"],
+        [{"kind": "task", "project_id": 1, "title": "Logo", "status": "Completed"},
+         {"kind": "task", "project_id": 1, "title": "Docs", "status": "New"}]
+    )
+    embeddings.embed_documents.reset_mock()
+
+    results = store.similarity_search_batch(
+        ["Write API documentation", "Write API documentation"],
+        k=1,
+        filter=[None, {"status": "Completed"}],
+        project_id=1,
+    )
+
+    embeddings.embed_documents.assert_called_once()
+    assert [[doc.metadata["title"] for doc in docs] for docs in results] == [["Docs"], ["Logo"]]
+
+def test_retriever_get_retrieval_bundle(mock_db):
+    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
+        task_doc = Mock(metadata={"title": "Similar Task", "priority": "High"}, page_content="Description")
+        mock_vs.similarity_search_batch.return_value = [[task_doc], [], [task_doc]]
+
+        retriever = Retriever(mock_db)
+        bundle = retriever.get_retrieval_bundle("New task description", project_id=1)
+        retriever.get_retrieval_bundle("New task description", project_id=1)
+
+        mock_vs.similarity_search_batch.assert_called_once()
+        assert bundle["similar_tasks_priorities"] == [{"title": "Similar Task", "priority": "High"}]
+        assert bundle["similar_completed_tasks"] == []
+        assert bundle["similar_collaborations"] == [{"task": "Similar Task", "collaboration": "Description"}]
+
+def test_in_memory_store_lexical_fallback():
+    store = InMemoryStore([])
+    store.add_texts(
+        ["Design a new logo", "Fix login bug in the auth service", "Write API documentation for auth"],
+        [{"title": "Logo"}, {"title": "Login", "status": "New"}, {"title": "Docs", "status": "Completed"}]
+    )
+
+    assert [doc.metadata["title"] for doc in store.similarity_search("auth login", k=2)] == ["Login", "Docs"]
+    assert [doc.metadata["title"] for doc in store.similarity_search("auth", k=2, filter={"status": "Completed"})] == ["Docs"]
+    assert store.similarity_search("kubernetes", k=2) == []
+
+def test_in_memory_store_vector_search_grows_matrix():
+    embeddings = DeterministicFakeEmbedding(size=8)
+    texts = [f"Task number {i}" for i in range(1500)]
+    store = InMemoryStore([], embeddings=embeddings)
+    store.add_texts(texts[:1000], [{"title": text} for text in texts[:1000]], vectors=embeddings.embed_documents(texts[:1000]))
+    store.add_texts(texts[1000:], [{"title": text} for text in texts[1000:]], vectors=embeddings.embed_documents(texts[1000:]))
+
+    assert store._matrix.shape[0] >= 1500
+    assert store.similarity_search("Task number 1234", k=1)[0].metadata["title"] == "Task number 1234"
+
+def test_vector_store_hybrid_search_promotes_exact_identifiers(tmp_path):
+    store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+    titles = ["Refactor billing", "AUTH-142 token refresh", "Update onboarding docs", "Tune database indexes"]
+    store.add_texts(
+        [f"{title} for the platform" for title in titles],
+        [{"kind": "task", "project_id": 1, "doc_id": f"task:{i}", "title": title} for i, title in enumerate(titles)]
+    )
+
+    results = store.hybrid_search("AUTH-142 is failing", k=4, project_id=1)
+
+    assert results.lexical[0].metadata["title"] == "AUTH-142 token refresh"
+    assert results.top(1)[0].metadata["title"] == "AUTH-142 token refresh"
+    assert len(results.vector) == 4
+
+def test_resident_partition_searches_only_take_the_read_lock(tmp_path):
+    store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+    store.add_texts(
+        ["Design a new logo", "Write API documentation"],
+        [{"kind": "task", "project_id": 1, "doc_id": f"task:{i}", "title": title} for i, title in enumerate(["Logo", "Docs"])]
+    )
+
+    with patch.object(store._lock, "write", side_effect=AssertionError("write lock taken")):
+        assert store.similarity_search("Design a new logo", k=1, project_id=1)[0].metadata["title"] == "Logo"
+        assert store.lexical_search("logo", k=1, project_id=1)[0].metadata["title"] == "Logo"
+        assert store.store_revision(1) is not None
+
+def test_retriever_hybrid_mode_reuses_candidates(mock_db):
+    with patch('backend.ai_engine.rag.retriever.vector_store') as mock_vs:
+        completed = Mock(metadata={"title": "Done Task", "status": "Completed", "kind": "task"}, page_content="Done")
+        open_task = Mock(metadata={"title": "Open Task", "status": "New", "kind": "task"}, page_content="Open")
+        mock_vs.hybrid_search.return_value.top.side_effect = lambda k, filter=None: [
+            doc for doc in [open_task, completed] if all(doc.metadata.get(key) == value for key, value in (filter or {}).items())
+        ][:k]
+
+        retriever = Retriever(mock_db, hybrid=True)
+        similar_tasks = retriever.get_similar_tasks("New task description", project_id=1)
+        completed_tasks = retriever.get_similar_completed_tasks("New task description", project_id=1)
+
+        mock_vs.hybrid_search.assert_called_once()
+        mock_vs.similarity_search.assert_not_called()
+        assert [task["title"] for task in similar_tasks] == ["Open Task", "Done Task"]
+        assert [task["title"] for task in completed_tasks] == ["Done Task"]
+
+def test_vector_store_upsert_delete_and_compaction(tmp_path):
+    store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+    store.compaction_threshold = 1.0
+    store.add_texts(
+        ["Design a new logo", "Write API documentation", "Set up CI"],
+        [{"doc_id": "task:1", "title": "Logo"}, {"doc_id": "task:2", "title": "Docs"}, {"doc_id": "task:3", "title": "CI"}]
+    )
+    store.add_texts(["Write the user guide"], [{"doc_id": "task:2", "title": "Guide"}])
+    store.delete(["task:3"])
+
+    titles = [doc.metadata["title"] for doc in store.similarity_search("Write API documentation", k=5)]
+    assert sorted(titles) == ["Guide", "Logo"]
+    assert store.similarity_search("Write the user guide", k=1)[0].metadata["title"] == "Guide"
+    assert store.lexical_search("CI", k=5) == []
+    assert store.vector_store.index.ntotal == 4
+
+    assert store.compact() == 2
+    assert store.vector_store.index.ntotal == 2
+    store.save_snapshot()
+    restored = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+    assert sorted(doc.metadata["title"] for doc in restored.similarity_search("logo", k=5)) == ["Guide", "Logo"]
+
+def test_vector_store_migrates_to_ivf_as_corpus_grows(tmp_path):
+    with patch.multiple(settings, ANN_IVF_MIN_VECTORS=200, ANN_HNSW_MIN_VECTORS=100000):
+        store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+        store.add_texts(["Seed task"], [{"doc_id": "task:0"}])
+        assert ann.index_kind(store.vector_store.index) == ann.FLAT
+
+        store.add_texts([f"Task {i}" for i in range(1, 300)], [{"doc_id": f"task:{i}"} for i in range(1, 300)])
+        store.compact()
+
+        assert ann.index_kind(store.vector_store.index) == ann.IVF
+        assert store.similarity_search("Task 42", k=1)[0].metadata["doc_id"] == "task:42"
+
+def test_benchmark_reports_recall_against_exact_search():
+    vectors = synthetic_vectors(500, 8)
+    rows = run_benchmark(vectors, sample_queries(vectors, 20), k=5, kinds=[ann.FLAT, ann.HNSW])
+
+    assert [row["index"] for row in rows] == [ann.FLAT, ann.HNSW]
+    assert rows[0]["recall"] == 1.0
+    assert 0 < rows[1]["recall"] <= 1.0 and rows[1]["p99_ms"] >= rows[1]["p50_ms"]
+
+def test_vector_store_compact_mode_quantizes_and_keeps_documents_on_disk(tmp_path):
+    with patch.multiple(settings, VECTOR_STORE_QUANTIZATION="sq8", ANN_QUANTIZE_MIN_VECTORS=100):
+        store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path), documents_on_disk=True)
+        store.add_texts([f"Task {i}" for i in range(150)], [{"doc_id": f"task:{i}", "title": f"Task {i}"} for i in range(150)])
+        store.compact()
+
+        assert ann.index_encoding(store.vector_store.index) == ann.SQ8
+        assert store.vector_store.docstore._dict == {}
+        assert store.similarity_search("Task 42", k=1)[0].metadata["title"] == "Task 42"
+        store.save_snapshot()
+        store.delete(["task:42"])
+
+        restored = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path), documents_on_disk=True)
+        assert restored.vector_store.tombstones
+        assert restored.similarity_search("Task 42", k=1)[0].metadata["title"] != "Task 42"
+        assert restored.lexical_search("43", k=1)[0].metadata["title"] == "Task 43"
+
+def test_quantized_store_with_documents_in_memory_rebuilds_from_exact_vectors(tmp_path):
+    with patch.multiple(settings, VECTOR_STORE_QUANTIZATION="sq8", ANN_QUANTIZE_MIN_VECTORS=100):
+        store = VectorStore(embeddings=DeterministicFakeEmbedding(size=16), snapshot_dir=str(tmp_path))
+        store.add_texts([f"Task {i}" for i in range(150)], [{"doc_id": f"task:{i}", "title": f"Task {i}"} for i in range(150)])
+
+        def recall():
+            return sum(store.similarity_search(f"Task {i}", k=1)[0].metadata["title"] == f"Task {i}" for i in range(5, 150, 5))
+
+        store.compact()
+        assert ann.index_encoding(store.vector_store.index) == ann.SQ8
+        first = recall()
+        store.delete(["task:0"])
+        store.compact()
+
+        assert recall() >= first
+        exact = store.vector_store.documents.vectors()
+        assert exact is not None and exact[0].dtype == np.float32 and len(exact[1]) == 149
+
+def test_importing_the_app_does_not_open_the_vector_store(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    code = ("import backend.main\n"
+            "from backend.ai_engine.rag import indexer, neighbors, vector_store\n"
+            "print(vector_store.vector_store.built, indexer.indexer.built, neighbors.neighbor_graphs.built)")
+    env = {**os.environ, "VECTOR_STORE_PATH": str(tmp_path / "vector_index")}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+    assert result.stdout.split()[-3:] == ["False", "False", "False"]
+    assert not (tmp_path / "vector_index").exists()
+
+def test_hashing_embeddings_are_deterministic_and_word_sensitive():
+    embeddings = HashingEmbeddings(size=64)
+    logo, logo_again, docs = embeddings.embed_documents(["Design a new logo", "design the logo", "Write API documentation"])
+
+    assert embeddings.embed_query("Design a new logo") == logo
+    assert np.dot(logo, logo_again) > np.dot(logo, docs)
+
+def test_dynamic_batcher_coalesces_concurrent_requests():
+    encode = Mock(side_effect=lambda texts: np.array([[float(len(text))] for text in texts]))
+    batcher = DynamicBatcher(encode, max_batch_size=64, max_wait=0.2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda text: batcher.submit([text]), ["a" * n for n in range(1, 9)]))
+
+    assert results == [[[float(n)]] for n in range(1, 9)]
+    assert encode.call_count < 8
+
+def test_vector_store_async_search_runs_alongside_indexing(tmp_path):
+    store = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path))
+    store.add_texts(["Design a new logo"], [{"doc_id": "task:1", "title": "Logo"}])
+
+    async def run():
+        searches = [store.asimilarity_search("logo", k=5) for _ in range(8)]
+        write = store.aadd_texts(
+            [f"Write chapter {n} of the guide" for n in range(50)],
+            [{"doc_id": f"task:{n + 2}", "title": f"Guide {n}"} for n in range(50)]
+        )
+        return await asyncio.gather(write, *searches)
+
+    _, *results = asyncio.run(run())
+    assert all(hits and hits[0].metadata["title"] == "Logo" for hits in results)
+    assert asyncio.run(store.asimilarity_search("Write chapter 7 of the guide", k=1))[0].metadata["title"] == "Guide 7"
+
+def test_reader_store_hot_swaps_generations_published_by_writer(tmp_path):
+    spool = EventSpool(str(tmp_path / "events.sqlite3"))
+    writer = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path), role="writer")
+    writer.add_texts(["Design a new logo"], [{"doc_id": "project:1", "title": "Logo"}])
+    writer.save_snapshot()
+    reader = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path), role="reader")
+    assert reader.similarity_search("logo", k=1)[0].metadata["title"] == "Logo"
+
+    reader_indexer = BackgroundIndexer(reader, flush_interval=0.05, spool=spool)
+    reader_indexer.enqueue("Write API documentation", {"doc_id": "project:2", "title": "Docs"})
+    reader_indexer.flush()
+    reader_indexer.stop()
+    with pytest.raises(RuntimeError):
+        reader.add_texts(["Set up CI"], [{"doc_id": "project:3"}])
+    assert not reader.refresh()
+
+    writer_indexer = BackgroundIndexer(writer, flush_interval=0.05, spool=spool, publish_interval=0)
+    writer_indexer._idle()
+    assert spool.claim(10) == (0, [])
+    assert reader.refresh()
+    assert reader.similarity_search("API documentation", k=1)[0].metadata["title"] == "Docs"
+
+def test_second_writer_process_falls_back_to_reader(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    # Another process holding the writer lock, as a second uvicorn worker would see it.
+    with open(tmp_path / "writer.lock", "a+b") as other_writer:
+        fcntl.flock(other_writer.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        store = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path))
+        assert store.read_only and store.role == "reader" and store.wal is None
+    writer = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path))
+    assert not writer.read_only
+    assert not VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path)).read_only
+
+def test_vector_store_replays_write_ahead_log_after_crash(tmp_path):
+    store = VectorStore(embeddings=HashingEmbeddings(size=64), snapshot_dir=str(tmp_path))
+    store.add_texts(["Design a new logo"], [{"doc_id": "project:1", "title": "Logo"}])
+    store.save_snapshot()
+    store.add_texts(["Write API documentation", "Set up CI"], [{"doc_id": "project:2", "title": "Docs"}, {"doc_id": "project:3", "title": "CI"}])
+    store.delete(["project:1"])
+    store.wal.close()
+    with open(tmp_path / "wal.log", "ab") as f:
+        f.write(b"\x10\x00\x00\x00torn")
+
+    embeddings = Mock(wraps=HashingEmbeddings(size=64))
+    recovered = VectorStore(embeddings=embeddings, snapshot_dir=str(tmp_path))
+    assert sorted(doc.metadata["title"] for doc in recovered.similarity_search("logo", k=5)) == ["CI", "Docs"]
+    embeddings.embed_documents.assert_not_called()
+
+    recovered.save_snapshot()
+    assert list(recovered.wal.records()) == []
+    recovered.add_texts(["Plan the launch"], [{"doc_id": "project:4", "title": "Launch"}])
+    assert [seq for seq, _ in recovered.wal.records()] == [4]
+
+def test_neighbor_graph_serves_stored_tasks_without_embedding(tmp_path):
+    embeddings = Mock(wraps=HashingEmbeddings(size=64))
+    store = VectorStore(embeddings=embeddings, snapshot_dir=str(tmp_path))
+    graphs = NeighborGraphs(store, k=2)
+    indexer = BackgroundIndexer(store, flush_interval=0.05, neighbors=graphs)
+    titles = ["Design a new logo", "Design the logo colours", "Write API documentation", "Write the API guide"]
+    for task_id, title in enumerate(titles, start=1):
+        indexer.enqueue_task(Mock(id=task_id, project_id=7, title=title, description=None, status="New", priority=None))
+    indexer.flush()
+    embeddings.reset_mock()
+
+    # The first lookup is answered from the store while the graph builds in the background.
+    assert graphs.neighbors(7, 1)[0][0] == 2
+    graphs.warm(7).result()
+    assert graphs.neighbors(7, 3)[0][0] == 4
+    graph = graphs._graphs[7]
+    assert graph.neighbors.dtype == np.int32 and graph.distances.dtype == np.float16
+    embeddings.embed_query.assert_not_called()
+    embeddings.embed_documents.assert_not_called()
+
+    indexer.enqueue_task_delete(2, 7)
+    indexer.enqueue_task(Mock(id=5, project_id=7, title="Design a logo", description=None, status="New", priority=None))
+    indexer.flush()
+    indexer.stop()
+    assert graphs.neighbors(7, 2) is None
+    assert graphs.neighbors(7, 1)[0][0] == 5
+    assert graphs._graphs[7] is graph
+
+def test_retriever_memoizes_lookups_until_invalidated(mock_db):
+    member = Mock(skills='["Python"]')
+    member.name = "Alice"
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = [member]
+    project = Mock(description="A test project", start_date="2023-01-01", end_date="2023-12-31", status="In Progress")
+    project.name = "Test Project"
+    mock_db.query.return_value.filter.return_value.first.return_value = project
+    project_cache.clear()
+
+    retriever = Retriever(mock_db)
+    for _ in range(3):
+        assert retriever.get_project_context(1)["team_members"] == ["Alice"]
+        assert retriever.get_team_skills(1) == {"Alice": ["Python"]}
+    assert mock_db.query.return_value.join.return_value.filter.return_value.all.call_count == 1
+    assert mock_db.query.return_value.filter.return_value.first.call_count == 1
+    assert retriever.stats()["hits"] == 5
+
+    retriever.invalidate(1)
+    retriever.get_team_skills(1)
+    assert mock_db.query.return_value.join.return_value.filter.return_value.all.call_count == 2
+
+def test_project_cache_is_shared_across_requests_until_a_write(mock_db):
+    member = Mock(skills='["Python"]')
+    member.name = "Alice"
+    roster = mock_db.query.return_value.join.return_value.filter.return_value.all
+    roster.return_value = [member]
+    project_cache.clear()
+
+    for _ in range(3):
+        assert Retriever(mock_db).get_team_skills(2) == {"Alice": ["Python"]}
+    assert roster.call_count == 1
+
+    bump_project_version(2)
+    member.skills = '["Python", "SQL"]'
+    assert Retriever(mock_db).get_team_skills(2) == {"Alice": ["Python", "SQL"]}
+    assert roster.call_count == 2
+
+def test_project_versions_are_shared_by_worker_processes(tmp_path):
+    path = str(tmp_path / "project_versions.sqlite3")
+    worker_a, worker_b = ProjectVersions(path), ProjectVersions(path)
+
+    assert worker_b.get(3) == 0
+    assert worker_a.bump(3) == 1 and worker_a.bump(None) == 1
+    assert worker_b.get(3) == 1
+    assert worker_b.bump(3) == 2 and worker_a.get(3) == 2
+
+def test_retriever_lookups_hold_plain_data_not_orm_rows(mock_db):
+    from backend.database import models
+
+    mock_db.query.return_value.filter.return_value.first.return_value = models.Project(id=4, name="Site", status="Active")
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = [
+        models.TeamMember(id=1, name="Alice", role="Designer", skills='["Figma"]')
+    ]
+    retriever = Retriever(mock_db)
+
+    assert retriever.get_project(4) == {"id": 4, "name": "Site", "description": None, "start_date": None, "end_date": None, "status": "Active"}
+    assert retriever.get_project_team_members(4) == [{"id": 1, "name": "Alice", "role": "Designer", "skills": '["Figma"]'}]
+
+def test_skill_matcher_ranks_members_by_skill_coverage():
+    vocab = SkillVocabulary()
+    matcher = SkillMatcher([
+        (1, "Alice", '["Python", "SQL"]'),
+        (2, "Bob", "java, python"),
+        (3, "Carol", None),
+    ], vocab=vocab)
+    assert len(vocab) == 3 and matcher.matrix.nnz == 4
+
+    ranked = matcher.rank([(10, ["python", "SQL"]), (11, '["Java", "Go"]'), (12, [])], k=2)
+    assert [(m["name"], m["fit"]) for m in ranked[10]] == [("Alice", 1.0), ("Bob", 0.5)]
+    assert [(m["name"], m["fit"]) for m in ranked[11]] == [("Bob", 0.5)]
+    assert ranked[12] == []
+    assert "go" not in vocab.ids
+    assert matcher.name_of(2) == "Bob" and matcher.name_of(99) is None